@@ -0,0 +1,17 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from attachments.uploads import discard_stale_uploads
+
+# Meant to run periodically (e.g. Heroku Scheduler) so abandoned uploads do not fill the disk
+class Command(BaseCommand):
+    help = 'Delete uploads that received no chunk for ATTACHMENT_UPLOAD_EXPIRY_HOURS, with their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS, help='Hours without a chunk before an upload is deleted')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(hours=options['hours'])
+        deleted = discard_stale_uploads(before)
+        self.stdout.write(f'Deleted {deleted} stale upload(s)')
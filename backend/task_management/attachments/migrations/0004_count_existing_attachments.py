@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_attachments(apps, schema_editor):
+    # Start Card.attachment_count from the attachments that already exist
+    Card = apps.get_model('cards', 'Card')
+    Attachment = apps.get_model('attachments', 'Attachment')
+    counts = Attachment.objects.filter(card=OuterRef('pk')).order_by().values('card').annotate(count=Count('id')).values('count')
+    Card.objects.update(attachment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0003_upload_sessions'),
+        ('cards', '0006_card_attachment_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_existing_attachments, migrations.RunPython.noop),
+    ]
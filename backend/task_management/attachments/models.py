@@ -1,10 +1,32 @@
+import uuid
 from django.db import models
 from cards.models import Card
+from authentication.models import CustomUser
 
 class Attachment(models.Model):
     card = models.ForeignKey(Card, related_name='attachments', on_delete=models.CASCADE)
     file = models.FileField(upload_to='attachments/')
+    name = models.CharField(max_length=255, blank=True) # Original file name, the stored one may differ
+    size = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)
+    uploaded_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Attachment {self.file.name} for {self.card.title}"
\ No newline at end of file
+        return f"Attachment {self.file.name} for {self.card.title}"
+
+# A resumable upload: chunks are appended to a part file until offset reaches size,
+# then the file is moved to storage as an Attachment and the session is deleted
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    card = models.ForeignKey(Card, related_name='upload_sessions', on_delete=models.CASCADE)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0) # Bytes received so far
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Upload of {self.name} ({self.offset}/{self.size})'
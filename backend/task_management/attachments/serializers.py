@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from .models import Attachment
+
+class AttachmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Attachment
+        fields = ['id', 'card', 'name', 'size', 'content_type', 'uploaded_by', 'uploaded_at']
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from cards.models import Card
+from .models import Attachment
+
+# Card.attachment_count lets card lists show the count without counting attachments per card
+@receiver(post_save, sender=Attachment)
+def count_added_attachment(sender, instance, created, **kwargs):
+    if created:
+        Card.objects.filter(id=instance.card_id).update(attachment_count=F('attachment_count') + 1)
+
+@receiver(post_delete, sender=Attachment)
+def count_deleted_attachment(sender, instance, **kwargs):
+    Card.objects.filter(id=instance.card_id).update(attachment_count=Greatest(F('attachment_count') - 1, 0))
+    # Deleting the row, directly or with its card, also removes the stored file once committed
+    if instance.file.name:
+        storage, name = instance.file.storage, instance.file.name
+        transaction.on_commit(lambda: storage.delete(name))
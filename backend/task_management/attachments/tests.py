@@ -1,3 +1,118 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from authentication.models import CustomUser
+from workspaces.models import Workspace
+from boards.models import Board
+from lists.models import List
+from cards.models import Card
+from attachments.models import Attachment, UploadSession
+from attachments.uploads import part_path
 
-# Create your tests here.
+MEDIA_ROOT = tempfile.mkdtemp()
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, ATTACHMENT_UPLOAD_DIR=f'{MEDIA_ROOT}/uploads', ATTACHMENT_CHUNK_SIZE=4, ATTACHMENT_MAX_UPLOAD_SIZE=16)
+class AttachmentUploadTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='user@example.com', password='password123')
+        self.token = self.client.post(reverse('login'), {'email': 'user@example.com', 'password': 'password123'}).json().get('access_token')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        board = Board.objects.create(title='Board', creator=self.user, workspace=workspace)
+        self.card = Card.objects.create(title='Card', position=1, rank='i', list=List.objects.create(title='List', position=1, board=board))
+
+    def start_upload(self, size):
+        response = self.client.post(reverse('attachment-upload-create'), {'card_id': self.card.id, 'name': 'notes.txt', 'size': size}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return reverse('attachment-upload', kwargs={'upload_id': response.data['upload_id']})
+
+    def put_chunk(self, url, offset, data):
+        return self.client.generic('PUT', url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunked_upload_resumes_and_counts(self):
+        url = self.start_upload(10)
+        self.assertEqual(self.put_chunk(url, 0, b'0123').data['offset'], 4)
+        # A retried or out of order chunk is refused with the offset to resume from
+        response = self.put_chunk(url, 0, b'0123')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Upload-Offset'], '4')
+        self.assertEqual(self.client.get(url).data['offset'], 4)
+
+        self.assertEqual(self.put_chunk(url, 4, b'4567').data['offset'], 8)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put_chunk(url, 8, b'89')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['size'], 10)
+        self.assertFalse(UploadSession.objects.exists())
+
+        attachment = Attachment.objects.get()
+        with attachment.file.open('rb') as file:
+            self.assertEqual(file.read(), b'0123456789')
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.attachment_count, 1)
+        self.assertEqual(self.card.list.board.version, 1)
+
+    def test_size_limits(self):
+        response = self.client.post(reverse('attachment-upload-create'), {'card_id': self.card.id, 'name': 'big.bin', 'size': 17}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        url = self.start_upload(8)
+        self.assertEqual(self.put_chunk(url, 0, b'012345').status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_ranged_download(self):
+        url = self.start_upload(8)
+        self.put_chunk(url, 0, b'abcd')
+        attachment_id = self.put_chunk(url, 4, b'efgh').data['id']
+        download = reverse('attachment-download', kwargs={'attachment_id': attachment_id})
+
+        response = self.client.get(download)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'abcdefgh')
+
+        response = self.client.get(download, HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/8')
+        self.assertEqual(b''.join(response.streaming_content), b'cde')
+
+        response = self.client.get(download, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'fgh')
+        self.assertEqual(self.client.get(download, HTTP_RANGE='bytes=9-').status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(reverse('attachment-delete', kwargs={'attachment_id': attachment_id})).status_code, status.HTTP_204_NO_CONTENT)
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.attachment_count, 0)
+
+    def test_outsiders_cannot_upload(self):
+        CustomUser.objects.create_user(email='outsider@example.com', password='password123')
+        token = self.client.post(reverse('login'), {'email': 'outsider@example.com', 'password': 'password123'}).json().get('access_token')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post(reverse('attachment-upload-create'), {'card_id': self.card.id, 'name': 'notes.txt', 'size': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stale_uploads_are_discarded(self):
+        stale_url = self.start_upload(10)
+        self.put_chunk(stale_url, 0, b'0123')
+        fresh_url = self.start_upload(10)
+        self.put_chunk(fresh_url, 0, b'0123')
+        stale = UploadSession.objects.get(id=stale_url.rstrip('/').split('/')[-1])
+        UploadSession.objects.filter(id=stale.id).update(updated_at=timezone.now() - timedelta(hours=25))
+
+        out = StringIO()
+        call_command('discard_stale_uploads', stdout=out)
+        self.assertIn('Deleted 1 stale upload(s)', out.getvalue())
+        self.assertEqual(list(UploadSession.objects.values_list('id', flat=True)), [UploadSession.objects.exclude(id=stale.id).get().id])
+        self.assertFalse(os.path.exists(part_path(stale)))
+        self.assertEqual(self.client.get(fresh_url).data['offset'], 4)
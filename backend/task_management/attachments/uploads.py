@@ -0,0 +1,109 @@
+import os
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from boards.events import board_event, broadcast_board_event
+from .models import Attachment, UploadSession
+from .serializers import AttachmentSerializer
+
+# Resumable uploads
+# Every chunk is streamed from the request to a part file on local disk, so neither the
+# request nor the file is ever held in memory. A client that loses its connection asks for
+# the session offset and resends from there. The finished file is handed to the storage
+# backend, which copies it in chunks as well. Uploads left unfinished for
+# ATTACHMENT_UPLOAD_EXPIRY_HOURS are deleted by the discard_stale_uploads command.
+
+class UploadError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+def part_path(session):
+    return os.path.join(settings.ATTACHMENT_UPLOAD_DIR, f'{session.id}.part')
+
+def append_chunk(session, offset, stream, length):
+    """
+    Append length bytes read from stream at offset and return the new offset.
+    Raises UploadError if the offset is not where the session stopped or the chunk is too large.
+    """
+    path = part_path(session)
+    written = os.path.getsize(path) if os.path.exists(path) else 0
+    if written < session.offset:
+        # The part file lost data (e.g. a new disk), the client has to resend from what is left
+        UploadSession.objects.filter(id=session.id).update(offset=written)
+        session.offset = written
+    if offset != session.offset:
+        raise UploadError('Offset does not match the upload', 409)
+    if length > settings.ATTACHMENT_CHUNK_SIZE:
+        raise UploadError('Chunk too large', 413)
+    if offset + length > session.size:
+        raise UploadError('Chunk goes past the declared size', 413)
+
+    os.makedirs(settings.ATTACHMENT_UPLOAD_DIR, exist_ok=True)
+    with open(path, 'ab') as part:
+        # Drop whatever an interrupted request wrote past the last acknowledged offset
+        part.truncate(offset)
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(remaining, settings.FILE_UPLOAD_MAX_MEMORY_SIZE))
+            if not data:
+                raise UploadError('Chunk is shorter than its Content-Length', 400)
+            part.write(data)
+            remaining -= len(data)
+
+    # update() skips auto_now, updated_at is what discard_stale_uploads looks at
+    UploadSession.objects.filter(id=session.id).update(offset=offset + length, updated_at=timezone.now())
+    session.offset = offset + length
+    return session.offset
+
+def finish_upload(session, board_id):
+    """Store the completed file as an attachment of the card and tell the board about it."""
+    path = part_path(session)
+    with transaction.atomic():
+        with open(path, 'rb') as part:
+            attachment = Attachment(
+                card_id=session.card_id, name=session.name, size=session.size,
+                content_type=session.content_type, uploaded_by_id=session.user_id,
+            )
+            attachment.file.save(session.name, File(part), save=False)
+            attachment.save()
+        session.delete()
+
+        broadcast_board_event(board_event(
+            board_id, 'attachment_added', card_id=session.card_id, attachment=AttachmentSerializer(attachment).data,
+        ))
+    os.remove(path)
+    return attachment
+
+def discard_upload(session):
+    # delete() clears the primary key the part file is named after
+    path = part_path(session)
+    session.delete()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def discard_stale_uploads(before):
+    """
+    Delete the upload sessions without a chunk since the datetime before, their part files,
+    and part files older than that with no session left. Returns how many sessions went.
+    """
+    stale = UploadSession.objects.filter(updated_at__lt=before)
+    count = 0
+    for session in stale.iterator():
+        discard_upload(session)
+        count += 1
+
+    # Part files whose session row is already gone, e.g. deleted with its card
+    if os.path.isdir(settings.ATTACHMENT_UPLOAD_DIR):
+        live = {f'{upload_id}.part' for upload_id in UploadSession.objects.values_list('id', flat=True)}
+        for entry in os.scandir(settings.ATTACHMENT_UPLOAD_DIR):
+            if entry.name.endswith('.part') and entry.name not in live and entry.stat().st_mtime < before.timestamp():
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+    return count
@@ -1,3 +1,175 @@
-from django.shortcuts import render
+import mimetypes
+import re
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, authentication_classes
+from authentication.jwt import CachedJWTAuthentication
+from boards.events import board_event, broadcast_board_event
+from boards.permissions import is_board_member, card_board_id
+from .models import Attachment, UploadSession
+from .serializers import AttachmentSerializer
+from .uploads import UploadError, append_chunk, finish_upload, discard_upload
 
-# Create your views here.
+OFFSET_HEADER = 'Upload-Offset'
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def upload_response(session, status_code=status.HTTP_200_OK):
+    return Response(
+        {'upload_id': str(session.id), 'offset': session.offset, 'size': session.size, 'chunk_size': settings.ATTACHMENT_CHUNK_SIZE},
+        status=status_code, headers={OFFSET_HEADER: str(session.offset)},
+    )
+
+# Start a resumable upload
+# Body: {card_id, name, size, content_type}, then PUT the file in chunks to api/attachments/uploads/<upload_id>
+@api_view(['POST'])
+@authentication_classes([CachedJWTAuthentication])
+def create_upload(request):
+    card_id = request.data.get('card_id')
+    name = request.data.get('name')
+    content_type = request.data.get('content_type') or mimetypes.guess_type(name or '')[0] or ''
+
+    if not card_id or not name:
+        return Response({'error': 'Card ID and file name are required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'size must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    if size < 1:
+        return Response({'error': 'The file is empty'}, status=status.HTTP_400_BAD_REQUEST)
+    if size > settings.ATTACHMENT_MAX_UPLOAD_SIZE:
+        return Response({'error': f'Files are limited to {settings.ATTACHMENT_MAX_UPLOAD_SIZE} bytes'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    board_id = card_board_id(card_id)
+    if board_id is None:
+        return Response({'error': 'Card not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_board_member(request.user.id, board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    session = UploadSession.objects.create(
+        card_id=card_id, user=request.user, name=name[:255], content_type=content_type[:100], size=size,
+    )
+    return upload_response(session, status.HTTP_201_CREATED)
+
+# GET: where to resume, PUT: append the request body at the Upload-Offset header, DELETE: cancel
+# The upload that brings the offset to the declared size answers with the new attachment
+@api_view(['GET', 'PUT', 'DELETE'])
+@authentication_classes([CachedJWTAuthentication])
+def upload_chunk(request, upload_id):
+    try:
+        session = UploadSession.objects.get(id=upload_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        return upload_response(session)
+    if request.method == 'DELETE':
+        discard_upload(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    try:
+        offset = int(request.headers.get(OFFSET_HEADER, ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return Response({'error': f'{OFFSET_HEADER} and Content-Length headers are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            # Locked so two requests for the same upload cannot interleave their writes
+            session = UploadSession.objects.select_for_update().get(id=session.id)
+            # The body is read straight from the socket, DRF never parses it
+            append_chunk(session, offset, request.stream, length)
+    except UploadError as e:
+        response = upload_response(session, e.status)
+        response.data['error'] = str(e)
+        return response
+
+    if session.offset < session.size:
+        return upload_response(session)
+
+    board_id = card_board_id(session.card_id)
+    if board_id is None:
+        discard_upload(session)
+        return Response({'error': 'Card not found'}, status=status.HTTP_404_NOT_FOUND)
+    attachment = finish_upload(session, board_id)
+    return Response(AttachmentSerializer(attachment).data, status=status.HTTP_201_CREATED)
+
+# Attachments of a card, newest first
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+def get_card_attachments(request, card_id):
+    board_id = card_board_id(card_id)
+    if board_id is None:
+        return Response({'error': 'Card not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_board_member(request.user.id, board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    attachments = Attachment.objects.filter(card_id=card_id).order_by('-uploaded_at', '-id')
+    return Response(AttachmentSerializer(attachments, many=True).data, status=status.HTTP_200_OK)
+
+def ranged_file(file, start, length):
+    # Stream the requested bytes in blocks, the whole range is never in memory
+    with file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(length, FileResponse.block_size))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+# Download an attachment
+# Whole files go through FileResponse, which lets the server use sendfile; a single
+# "Range: bytes=start-end" gets a 206 with just those bytes
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+def download_attachment(request, attachment_id):
+    attachment = Attachment.objects.filter(id=attachment_id).select_related('card__list').first()
+    if attachment is None:
+        return Response({'error': 'Attachment not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_board_member(request.user.id, attachment.card.list.board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    size = attachment.file.size
+    content_type = attachment.content_type or 'application/octet-stream'
+    match = RANGE_PATTERN.match(request.headers.get('Range', ''))
+    if not match or match.groups() == ('', ''):
+        response = FileResponse(attachment.file.open('rb'), as_attachment=True, filename=attachment.name, content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        # "bytes=-n" is the last n bytes
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        response = Response({'error': 'Range not satisfiable'}, status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    length = end - start + 1
+    response = StreamingHttpResponse(ranged_file(attachment.file.open('rb'), start, length), status=status.HTTP_206_PARTIAL_CONTENT, content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+# Delete an attachment, the stored file goes with it
+@api_view(['DELETE'])
+@authentication_classes([CachedJWTAuthentication])
+def delete_attachment(request, attachment_id):
+    attachment = Attachment.objects.filter(id=attachment_id).select_related('card__list').first()
+    if attachment is None:
+        return Response({'error': 'Attachment not found'}, status=status.HTTP_404_NOT_FOUND)
+    board_id = attachment.card.list.board_id
+    if not is_board_member(request.user.id, board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    with transaction.atomic():
+        attachment.delete()
+        broadcast_board_event(board_event(board_id, 'attachment_deleted', card_id=attachment.card_id, id=attachment_id))
+    return Response(status=status.HTTP_204_NO_CONTENT)
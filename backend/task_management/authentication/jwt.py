@@ -0,0 +1,96 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from task_management import metrics
+
+# Two-tier cache of authenticated users
+# Tier 1 is a bounded LRU in each worker process, tier 2 the shared Django cache.
+# Entries are dropped from both tiers when a user is saved or deleted (see authentication.signals);
+# other processes' LRUs only hold a user for AUTH_USER_CACHE_TTL seconds, which bounds how stale they can be
+class UserCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def shared_key(self, user_id):
+        return f'auth:user:{user_id}'
+
+    def get(self, user_id):
+        # Tokens may carry the id as a string, signals pass the integer primary key
+        user_id = str(user_id)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(user_id)
+                metrics.incr('auth.user_cache.local_hit')
+                # Each request gets its own copy, views may modify request.user
+                return copy.copy(entry[0])
+            if entry is not None:
+                del self.entries[user_id]
+
+        user = cache.get(self.shared_key(user_id))
+        if user is None:
+            metrics.incr('auth.user_cache.miss')
+            return None
+        metrics.incr('auth.user_cache.shared_hit')
+        self.set_local(user_id, user)
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        user_id = str(user_id)
+        self.set_local(user_id, user)
+        cache.set(self.shared_key(user_id), user, self.ttl)
+
+    def set_local(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (copy.copy(user), time.monotonic() + self.ttl)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                metrics.incr('auth.user_cache.evict')
+
+    def invalidate(self, user_id):
+        user_id = str(user_id)
+        with self.lock:
+            self.entries.pop(user_id, None)
+        cache.delete(self.shared_key(user_id))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+# JWTAuthentication without the per-request user query
+# The token is still verified on every request, only the user lookup is cached
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        user = user_cache.get(user_id)
+        if user is None:
+            # Loads the user and runs the same checks as below
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Trigram indexes for the icontains/istartswith filters of the profile search.
+# Django compares UPPER("col"::text) on PostgreSQL, so the indexes are built on that expression.
+# Other databases use the in-process index of authentication.search instead.
+FIELDS = ('email', 'name', 'nickname')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS authentication_userprofile_{field}_trgm '
+            f'ON authentication_userprofile USING gin ((UPPER({field}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS authentication_userprofile_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_customuser_board_favorite'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,138 @@
+import bisect
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from workspaces.models import Workspace
+from authentication.models import UserProfile
+from task_management import metrics
+
+# Profile search for the invite dialog
+# A profile matches when its email, name or nickname contains the query, case-insensitively.
+# On PostgreSQL the icontains filters are served by the trigram indexes of migration 0003.
+# Other databases (SQLite in development) have no such index, so they use ProfileIndex:
+# a sorted list of the suffixes of every field, where a field contains the query exactly
+# when one of its suffixes starts with it, found with bisect. Both give the same results.
+#
+# The invite dialog searches again for every character typed, so each user keeps the candidates
+# of their last search per workspace in the cache: a query that extends it is answered by
+# filtering those rows in memory. Entries are keyed by a generation that changes with any
+# profile or membership change, which invalidates all of them at once.
+
+SEARCH_FIELDS = ('email', 'name', 'nickname')
+RESULT_FIELDS = ('id', 'user_id', 'email', 'name', 'nickname', 'bio')
+GENERATION_KEY = 'search:profiles:generation'
+
+class ProfileIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = None  # sorted [(suffix, profile_id)], built on first use
+        self.generation = None  # value of GENERATION_KEY the entries were built at
+
+    def invalidate(self):
+        with self.lock:
+            self.entries = None
+
+    def build(self):
+        entries = set()
+        for profile_id, *values in UserProfile.objects.values_list('id', *SEARCH_FIELDS):
+            for value in values:
+                value = (value or '').lower()
+                entries.update((value[start:], profile_id) for start in range(len(value)))
+        return sorted(entries)
+
+    def search(self, query):
+        """Ids of the profiles with a field containing query."""
+        # Every worker process has its own index, the shared generation tells when another one changed a profile
+        generation = cache.get(GENERATION_KEY, 0)
+        with self.lock:
+            if self.entries is None or self.generation != generation:
+                self.entries = self.build()
+                self.generation = generation
+            entries = self.entries
+        query = query.lower()
+        start = bisect.bisect_left(entries, (query,))
+        ids = set()
+        for suffix, profile_id in entries[start:]:
+            if not suffix.startswith(query):
+                break
+            ids.add(profile_id)
+        return ids
+
+profile_index = ProfileIndex()
+
+def uses_trigram_index():
+    return connection.vendor == 'postgresql'
+
+def matches(row, query):
+    """Same test as the database query, for a row of a cached search."""
+    return any(query in (row[field] or '').lower() for field in SEARCH_FIELDS)
+
+def ranked(rows, query, limit):
+    # Profiles where a field starts with the query first, like the prefix_rank of the database query
+    def key(row):
+        prefix = any(row[field].lower().startswith(query) for field in SEARCH_FIELDS)
+        return (not prefix, row['name'], row['email'])
+    return sorted(rows, key=key)[:limit]
+
+def matching_profiles(query, workspace_id=None):
+    if uses_trigram_index():
+        matches = Q()
+        for field in SEARCH_FIELDS:
+            matches |= Q(**{f'{field}__icontains': query})
+        profiles = UserProfile.objects.filter(matches)
+    else:
+        profiles = UserProfile.objects.filter(id__in=profile_index.search(query))
+
+    if workspace_id:
+        members = Workspace.members.through.objects.filter(workspace_id=workspace_id).values('customuser_id')
+        profiles = profiles.exclude(user_id__in=members)
+    return profiles
+
+def search_profiles(query, workspace_id=None, limit=None):
+    """
+    Profiles matching query, the ones where a field starts with it first, at most limit of them.
+    Members of the workspace are excluded by a subquery.
+    """
+    limit = limit or settings.PROFILE_SEARCH_LIMIT
+    prefix = Q()
+    for field in SEARCH_FIELDS:
+        prefix |= Q(**{f'{field}__istartswith': query})
+    return matching_profiles(query, workspace_id).annotate(
+        prefix_rank=Case(When(prefix, then=Value(0)), default=Value(1), output_field=IntegerField())
+    ).order_by('prefix_rank', 'name', 'email')[:limit]
+
+def search_cache_key(user_id, workspace_id):
+    generation = cache.get(GENERATION_KEY, 0)
+    return f'search:profiles:{generation}:{user_id}:{workspace_id}'
+
+def invalidate_search_cache():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+def cached_search_profiles(user_id, query, workspace_id=None, limit=None):
+    """
+    search_profiles() for the typeahead of user_id, returned as dicts of RESULT_FIELDS.
+    Reuses the candidates of the user's previous search when query extends it.
+    """
+    limit = limit or settings.PROFILE_SEARCH_LIMIT
+    query = query.lower()
+    key = search_cache_key(user_id, workspace_id)
+
+    entry = cache.get(key)
+    if entry is not None and query.startswith(entry['query']):
+        metrics.incr('auth.profile_search.hit')
+        return ranked([row for row in entry['rows'] if matches(row, query)], query, limit)
+
+    # Only keep the candidates of queries narrow enough to hold them all
+    rows = list(matching_profiles(query, workspace_id).values(*RESULT_FIELDS)[:settings.PROFILE_SEARCH_CACHE_ROWS + 1])
+    if len(rows) > settings.PROFILE_SEARCH_CACHE_ROWS:
+        metrics.incr('auth.profile_search.uncached')
+        return list(search_profiles(query, workspace_id, limit).values(*RESULT_FIELDS))
+
+    metrics.incr('auth.profile_search.miss')
+    cache.set(key, {'query': query, 'rows': rows}, settings.PROFILE_SEARCH_CACHE_TTL)
+    return ranked(rows, query, limit)
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from .models import UserProfile
+from .jwt import user_cache
+from .search import profile_index, invalidate_search_cache
+from workspaces.models import Workspace
 
 User = get_user_model()
 
@@ -15,4 +18,24 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
             profile.email = instance.email
             profile.save()
         except UserProfile.DoesNotExist:
-            raise Exception('UserProfile does not exist')
\ No newline at end of file
+            raise Exception('UserProfile does not exist')
+
+# Drop cached copies of the user so the next request sees the change
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+# Rebuild the in-process search index and drop cached searches
+# Saving a user saves its profile too (create_or_update_user_profile), so this covers both
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_index(sender, instance, **kwargs):
+    profile_index.invalidate()
+    invalidate_search_cache()
+
+# Cached searches exclude the members of the workspace at the time of the search
+@receiver(m2m_changed, sender=Workspace.members.through)
+def invalidate_member_searches(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_search_cache()
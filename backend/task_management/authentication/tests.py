@@ -2,7 +2,14 @@ from django.urls import reverse
 from django.test import Client
 from rest_framework.test import APITestCase
 from rest_framework import status
+from django.db import connection
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
 from .models import CustomUser, UserProfile
+from .jwt import user_cache
+from .search import profile_index, invalidate_search_cache
+from task_management import metrics
+from workspaces.models import Workspace
 
 # Register User Tests
 class APITestRegisterUser(APITestCase):
@@ -214,4 +221,92 @@ class APITests(APITestCase):
 
         # Assert that the response contains the profiles matching the search query
         self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], 'John Doe')
\ No newline at end of file
+        self.assertEqual(response.data[0]['name'], 'John Doe')
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='cached@example.com', password='password123')
+        self.token = self.client.post(reverse('login'), {'email': 'cached@example.com', 'password': 'password123'}).json().get('access_token')
+        user_cache.clear()
+        metrics.reset()
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-profile-get'), HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query['sql'] for query in queries if 'FROM "authentication_customuser"' in query['sql']]
+
+    def test_user_is_loaded_once_per_token(self):
+        self.assertEqual(len(self.get_profile()), 1)
+        self.assertEqual(self.get_profile(), [])
+        self.assertEqual(metrics.snapshot('auth.user_cache'), {'auth.user_cache.local_hit': 1, 'auth.user_cache.miss': 1})
+
+    def test_changes_to_the_user_invalidate_the_cache(self):
+        self.get_profile()
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('user-profile-get'), HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.delete()
+        response = self.client.get(reverse('user-profile-get'), HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class ProfileSearchTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='owner@example.com', password='password123')
+        self.token = self.client.post(reverse('login'), {'email': 'owner@example.com', 'password': 'password123'}).json().get('access_token')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        self.workspace.members.add(self.user)
+        for email, name in [('zed@example.com', 'Anna Mars'), ('mars@example.com', 'Bob Stone'), ('marsha@example.com', 'Marsha Lane')]:
+            user = CustomUser.objects.create_user(email=email, password='password123')
+            UserProfile.objects.filter(user=user).update(name=name)
+        self.member = CustomUser.objects.create_user(email='marsden@example.com', password='password123')
+        self.workspace.members.add(self.member)
+        cache.clear()
+        metrics.reset()
+
+    def search(self, query, **params):
+        params.update(q=query, workspace_id=self.workspace.id)
+        response = self.client.get(reverse('search-profiles'), params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [profile['email'] for profile in response.data]
+
+    def test_prefix_matches_come_first_and_members_are_excluded(self):
+        # UserProfile.update() skips the signals, so the in-process index is rebuilt here
+        profile_index.invalidate()
+        self.assertEqual(self.search('mar'), ['mars@example.com', 'marsha@example.com', 'zed@example.com'])
+        self.assertEqual(self.search('mar', limit=2), ['mars@example.com', 'marsha@example.com'])
+        self.assertEqual(self.search('nobody'), [])
+
+    def test_index_follows_profile_changes(self):
+        self.assertEqual(self.search('jupiter'), [])
+        profile = UserProfile.objects.get(email='zed@example.com')
+        profile.nickname = 'Jupiter'
+        profile.save()
+        self.assertEqual(self.search('jupiter'), ['zed@example.com'])
+
+    def test_fields_match_anywhere_like_on_postgresql(self):
+        profile_index.invalidate()
+        self.assertEqual(self.search('arsh'), ['marsha@example.com'])
+        self.assertEqual(self.search('a mar'), ['zed@example.com'])
+
+    def test_index_follows_changes_made_by_other_workers(self):
+        self.assertEqual(self.search('jupiter'), [])
+        # Another process changed the profile: the signals ran there and only the shared generation moved here
+        UserProfile.objects.filter(email='zed@example.com').update(nickname='Jupiter')
+        invalidate_search_cache()
+        self.assertEqual(self.search('jupiter'), ['zed@example.com'])
+
+    def test_longer_queries_reuse_the_previous_candidates(self):
+        profile_index.invalidate()
+        self.assertEqual(self.search('ma'), ['mars@example.com', 'marsha@example.com', 'zed@example.com'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search('marsh'), ['marsha@example.com'])
+        self.assertFalse([query for query in queries if 'authentication_userprofile' in query['sql']])
+        self.assertEqual(metrics.snapshot('auth.profile_search'), {'auth.profile_search.hit': 1, 'auth.profile_search.miss': 1})
+
+        # New members are no longer offered
+        self.workspace.members.add(CustomUser.objects.get(email='marsha@example.com'))
+        self.assertEqual(self.search('mars'), ['mars@example.com', 'zed@example.com'])
+        self.assertEqual(metrics.snapshot('auth.profile_search.miss'), {'auth.profile_search.miss': 2})
@@ -11,12 +11,13 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, authentication_classes
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.jwt import CachedJWTAuthentication
 from rest_framework.exceptions import NotFound, APIException
 import secrets
 from authentication.models import CustomUser, UserProfile
 from workspaces.models import Workspace
 from authentication.serializers import UserProfileSerializer
+from authentication.search import cached_search_profiles
 
 # Signup function
 @api_view(['POST'])
@@ -123,7 +124,7 @@ def reset_password_confirm(request, user_id, reset_code=None):
     
 # Update user password
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def update_user_password(request):
     try:
         # Extract the email and user from the request
@@ -160,7 +161,7 @@ def update_user_password(request):
 
 # Change email function
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def update_user_email(request):
     try:
         # Get user credentials from request
@@ -202,7 +203,7 @@ def update_user_email(request):
         return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_profile(request):
     try:
         # Retrieve the UserProfile instance
@@ -221,10 +222,11 @@ def get_profile(request):
         raise APIException(str(e))
     
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def search_profiles(request):
     try:
-        search_query = request.GET.get('q', None) # Get the search query from the request query parameters
+        # Get the search query from the request query parameters, the invite dialog sends it as 'search'
+        search_query = request.GET.get('q') or request.GET.get('search')
         workspace_id = request.GET.get('workspace_id') # Get the workspace ID from the query parameters
 
         if not workspace_id:
@@ -233,21 +235,14 @@ def search_profiles(request):
         if not search_query:
             return Response([])
 
-        # Perform the search
-        profiles = UserProfile.objects.filter(
-            Q(email__icontains=search_query) |
-            Q(name__icontains=search_query) |
-            Q(nickname__icontains=search_query)
-        )
-
-        if not profiles:
-            return Response([])
+        try:
+            limit = min(int(request.GET.get('limit', settings.PROFILE_SEARCH_LIMIT)), settings.PROFILE_SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if workspace_id:
-            # Filter out users who are already members of the workspace
-            workspace = Workspace.objects.get(id=workspace_id)
-            members_of_workspace = workspace.members.all()
-            profiles = profiles.exclude(user__in=members_of_workspace)
+        # Perform the search, members of the workspace are filtered out in the same query
+        # Typing one more character reuses the candidates of the previous search
+        profiles = cached_search_profiles(request.user.id, search_query.strip(), workspace_id, max(limit, 1))
         
         # Serialize the profiles data
         serializer = UserProfileSerializer(profiles, many=True)
@@ -258,7 +253,7 @@ def search_profiles(request):
 
 # Update the user profile
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def update_profile(request, pk):
     try:
         # Access the authenticated user
@@ -283,13 +278,13 @@ def update_profile(request, pk):
 
 # Logout function
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def logout_user(request):
     logout(request)
     return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def delete_account(request):
     if request.method == 'DELETE':
         # Retrieve the user's email and password from the request
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from boards.models import Board
+
+# Cached board payloads for the REST board page
+# The latest version of each board lives in the cache, so an unchanged board is answered
+# with one cache lookup, and the serialized board is stored under its version: a new version
+# is a new key, nothing ever has to be invalidated except the version itself
+
+def version_key(board_id):
+    return f'board:{board_id}:version'
+
+def payload_key(board_id, version):
+    return f'board:{board_id}:payload:{version}'
+
+def board_etag(board_id, version):
+    return f'"board-{board_id}-{version}"'
+
+def get_cached_version(board_id):
+    version = cache.get(version_key(board_id))
+    if version is None:
+        version = Board.objects.filter(id=board_id).values_list('version', flat=True).first()
+        if version is None:
+            return None
+        # add() never overwrites a newer version stored by a commit in the meantime
+        cache.add(version_key(board_id), version, settings.BOARD_CACHE_TIMEOUT)
+    return version
+
+def remember_version(board_id, version):
+    # Publish the version only once the change is visible to other connections
+    def publish():
+        if (cache.get(version_key(board_id)) or 0) < version:
+            cache.set(version_key(board_id), version, settings.BOARD_CACHE_TIMEOUT)
+    transaction.on_commit(publish)
+
+def forget_board(board_id):
+    cache.delete(version_key(board_id))
+
+def get_cached_payload(board_id, version):
+    return cache.get(payload_key(board_id, version))
+
+def cache_payload(board_id, version, payload):
+    cache.set(payload_key(board_id, version), payload, settings.BOARD_CACHE_TIMEOUT)
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.conf import settings
+from boards.models import Board, BoardEvent
+from lists.serializers import ListSerializer
+from boards.queries import lists_with_cards
+from boards.cache import remember_version
+from notifications.push import send_to_groups
+
+# Channel-layer group every client with the board open is subscribed to
+def board_group_name(board_id):
+    return f'board_{board_id}'
+
+# Increment the board version, journal the change under it and return the new value
+# Must run inside the same transaction as the change it describes so versions stay in commit order
+# Changes without an event (board title, favorites, ...) are journaled as 'board_updated'
+def bump_board_version(board_id, event=None):
+    with transaction.atomic():
+        Board.objects.filter(id=board_id).update(version=F('version') + 1)
+        version = Board.objects.filter(id=board_id).values_list('version', flat=True).first()
+        if version is None:
+            return None
+        payload = dict(event or {'action': 'board_updated', 'board_id': board_id}, board_version=version)
+        BoardEvent.objects.create(board_id=board_id, seq=version, action=payload['action'], payload=payload)
+    remember_version(board_id, version)
+    return version
+
+# Build the small patch sent to clients after a list/card change
+def board_event(board_id, action, **data):
+    event = {'action': action, 'board_id': board_id}
+    event.update(data)
+    event['board_version'] = bump_board_version(board_id, event)
+    return event
+
+def get_events_since(board_id, since):
+    """
+    The journaled events of the board after version since, oldest first, or None if they cannot
+    bring a client at since up to date: some were compacted away, written without a journal
+    entry, or there are more than BOARD_REPLAY_LIMIT of them. The client then needs a snapshot.
+    """
+    version = get_board_version(board_id)
+    if version is None or since > version:
+        return None
+    missing = version - since
+    if missing > settings.BOARD_REPLAY_LIMIT:
+        return None
+    payloads = list(
+        BoardEvent.objects.filter(board_id=board_id, seq__gt=since, seq__lte=version)
+        .order_by('seq').values_list('payload', flat=True)
+    )
+    # Versions are consecutive, so a complete journal has exactly one row per missing version
+    if len(payloads) != missing:
+        return None
+    return payloads
+
+def compact_journal(board_id, keep, before=None):
+    """
+    Delete the journal of a board except its last keep versions, and anything created before
+    the datetime before, and return how many rows went. Clients further behind catch up with
+    a snapshot instead, which is always built fresh from the lists and cards tables.
+    """
+    version = get_board_version(board_id)
+    if version is None:
+        return 0
+    stale = Q(seq__lte=version - keep)
+    if before is not None:
+        stale |= Q(created_at__lt=before)
+    deleted, _ = BoardEvent.objects.filter(stale, board_id=board_id).delete()
+    return deleted
+
+# Send an event built by board_event() to the board group once the transaction commits
+# For changes made over REST, socket actions go through DispatcherConsumer.send_board_event
+def broadcast_board_event(event):
+    message = {'type': 'board.event', 'event': event}
+    transaction.on_commit(lambda: send_to_groups({board_group_name(event['board_id']): message}))
+
+def get_board_version(board_id):
+    return Board.objects.filter(id=board_id).values_list('version', flat=True).first()
+
+# Full board state, only sent when a client (re)subscribes or reports a version gap
+def get_board_snapshot(board_id):
+    # Read the version before the lists: if a change lands in between, the client
+    # gets a snapshot that already contains it and simply re-applies the next patch
+    version = get_board_version(board_id)
+    if version is None:
+        return None
+
+    lists = lists_with_cards().filter(board_id=board_id)
+    return {
+        'action': 'board_snapshot',
+        'board_id': board_id,
+        'board_version': version,
+        'list': ListSerializer(lists, many=True).data,
+    }
@@ -0,0 +1,26 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from boards.events import compact_journal
+from boards.models import BoardEvent
+
+class Command(BaseCommand):
+    help = 'Trim the board event journals to BOARD_JOURNAL_LENGTH versions and BOARD_JOURNAL_MAX_AGE_DAYS days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, help='Only compact this board')
+        parser.add_argument('--keep', type=int, default=settings.BOARD_JOURNAL_LENGTH, help='Versions to keep per board')
+        parser.add_argument('--days', type=int, default=settings.BOARD_JOURNAL_MAX_AGE_DAYS, help='Days of history to keep')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        if options['board']:
+            board_ids = [options['board']]
+        else:
+            board_ids = BoardEvent.objects.values_list('board_id', flat=True).distinct().order_by()
+
+        total = 0
+        for board_id in board_ids:
+            total += compact_journal(board_id, options['keep'], before)
+        self.stdout.write(f'Deleted {total} board events')
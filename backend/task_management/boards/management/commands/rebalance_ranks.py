@@ -0,0 +1,48 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+from boards.events import board_group_name
+from cards.models import Card
+from cards.views import rebalance_card_ranks
+from lists.models import List
+from lists.views import rebalance_list_ranks
+
+# Meant to run periodically (e.g. Heroku Scheduler) to respace boards and lists whose rank keys grew too long
+class Command(BaseCommand):
+    help = 'Rewrite list and card rank keys that grew longer than RANK_REBALANCE_LENGTH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-length', type=int, default=settings.RANK_REBALANCE_LENGTH)
+
+    def handle(self, *args, **options):
+        self.channel_layer = get_channel_layer()
+        max_length = options['max_length']
+
+        board_ids = list(
+            List.objects.annotate(rank_length=Length('rank'))
+            .filter(rank_length__gt=max_length)
+            .values_list('board_id', flat=True)
+            # Without the default (rank, id) ordering, which would make every row distinct
+            .order_by()
+            .distinct()
+        )
+        for board_id in board_ids:
+            self.broadcast(rebalance_list_ranks(board_id))
+
+        list_ids = list(
+            Card.objects.annotate(rank_length=Length('rank'))
+            .filter(rank_length__gt=max_length)
+            .values_list('list_id', flat=True)
+            .order_by()
+            .distinct()
+        )
+        for list_id in list_ids:
+            self.broadcast(rebalance_card_ranks(list_id))
+
+        self.stdout.write(f'Rebalanced {len(board_ids)} board(s) and {len(list_ids)} list(s)')
+
+    def broadcast(self, event):
+        if event and self.channel_layer is not None:
+            async_to_sync(self.channel_layer.group_send)(board_group_name(event['board_id']), {'type': 'board.event', 'event': event})
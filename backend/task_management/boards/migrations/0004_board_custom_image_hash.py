@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0003_board_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='custom_image_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
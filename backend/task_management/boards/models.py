@@ -1,4 +1,5 @@
 import random
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from authentication.models import CustomUser
 from workspaces.models import Workspace
@@ -9,10 +10,29 @@ class Board(models.Model):
     description = models.TextField(blank=True)
     creator = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     favorite = models.ManyToManyField(CustomUser, related_name='favorite_boards', blank=True)
-    custom_image = models.ImageField(upload_to='board_images/', blank=True, null=True) # Feature I will work on in the future
+    custom_image = models.ImageField(upload_to='board_images/', blank=True, null=True)
+    custom_image_hash = models.CharField(max_length=64, blank=True) # Names the thumbnails of custom_image once they exist, see images.thumbnails
     default_image = models.ForeignKey(Image, on_delete=models.SET_NULL, blank=True, null=True) 
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='boards', null=True, blank=True)
     members = models.ManyToManyField(CustomUser, related_name='boards', blank=True)
+    version = models.PositiveIntegerField(default=0) # Bumped on every list/card change, lets clients detect missed updates
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+# Append-only journal of board changes, one row per board version (see boards.events)
+# Clients that reconnect replay the rows after the version they have instead of reloading the board
+class BoardEvent(models.Model):
+    board = models.ForeignKey(Board, related_name='events', on_delete=models.CASCADE)
+    seq = models.PositiveIntegerField() # The board version the change produced
+    action = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder) # The event as it was sent to clients
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'seq'], name='unique_board_event_seq'),
+        ]
+
+    def __str__(self):
+        return f'{self.board_id}#{self.seq} {self.action}'
@@ -0,0 +1,27 @@
+from django.db.models import Q
+from boards.models import Board
+
+def get_board_access(user_id, board_id):
+    """
+    What a user may do on a board: {'member': ..., 'owner': ...}, or None if the board does not exist.
+    Members are the workspace owner and members, the board creator and board members;
+    owner means owner of the board's workspace.
+    """
+    board = Board.objects.filter(id=board_id).values('workspace_id', 'workspace__owner_id', 'creator_id').first()
+    if board is None:
+        return None
+
+    owner = board['workspace__owner_id'] == user_id
+    member = owner or board['creator_id'] == user_id or Board.objects.filter(
+        Q(workspace__members__id=user_id) | Q(members__id=user_id), id=board_id,
+    ).exists()
+    return {'member': member, 'owner': owner}
+
+def is_board_member(user_id, board_id):
+    access = get_board_access(user_id, board_id)
+    return access is not None and access['member']
+
+def card_board_id(card_id):
+    """Board of a card, or None if the card does not exist."""
+    from cards.models import Card
+    return Card.objects.filter(id=card_id).values_list('list__board_id', flat=True).first()
@@ -0,0 +1,22 @@
+from django.db.models import Prefetch
+from boards.models import Board
+from lists.models import List
+from cards.models import Card
+
+# Read paths for whole boards
+# Everything a board page shows is loaded up front, so the number of queries
+# stays the same however many lists and cards the board has
+
+def lists_with_cards():
+    return List.objects.order_by('rank', 'id').prefetch_related(
+        Prefetch('cards', queryset=Card.objects.order_by('rank', 'id'))
+    )
+
+def boards_for_display():
+    return Board.objects.select_related('workspace', 'default_image').prefetch_related('favorite', 'members')
+
+def board_with_lists(board_id):
+    """Board with its workspace, image, members, lists and cards, in a constant number of queries."""
+    return boards_for_display().prefetch_related(
+        Prefetch('lists', queryset=lists_with_cards())
+    ).get(id=board_id)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import Board, Workspace, Image, CustomUser
+from images.thumbnails import board_thumbnail
 
 class ImageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,12 +11,14 @@ class ImageSerializer(serializers.ModelSerializer):
 class BoardSerializer(serializers.ModelSerializer):
     workspace = serializers.PrimaryKeyRelatedField(queryset=Workspace.objects.all(), read_only=False)
     workspace_name = serializers.SerializerMethodField()
+    # Resized custom image for the size given in the context, e.g. 'small' for the boards grid
+    thumbnail = serializers.SerializerMethodField()
     default_image = serializers.PrimaryKeyRelatedField(queryset=Image.objects.all(), allow_null=True)
     creator = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False)
 
     class Meta:
         model = Board
-        fields = '__all__'
+        exclude = ['custom_image_hash']
 
     def get_fields(self):
         fields = super().get_fields()
@@ -26,6 +30,14 @@ class BoardSerializer(serializers.ModelSerializer):
     def get_workspace_name(self, obj):
         return obj.workspace.name if obj.workspace else None
 
+    def get_thumbnail(self, obj):
+        url = board_thumbnail(obj, self.context.get('thumbnail_size', settings.THUMBNAIL_DEFAULT_SIZE))
+        request = self.context.get('request')
+        if url and request is not None:
+            # The frontend is served from another host than the API
+            return request.build_absolute_uri(url)
+        return url
+
     def create(self, validated_data):
         board = Board.objects.create(**validated_data)
         return board
@@ -0,0 +1,37 @@
+from django.db.models import F
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from workspaces.models import Workspace
+from .models import Board
+from .cache import forget_board
+from images.thumbnails import schedule_thumbnails
+
+@receiver(post_delete, sender=Board)
+def forget_deleted_board(sender, instance, **kwargs):
+    # Otherwise a client holding the last ETag would keep getting 304 for a deleted board
+    forget_board(instance.id)
+
+@receiver(post_save, sender=Workspace)
+def bump_workspace_boards(sender, instance, created, **kwargs):
+    # Board payloads include the workspace name
+    if created:
+        return
+    board_ids = list(Board.objects.filter(workspace=instance).values_list('id', flat=True))
+    Board.objects.filter(id__in=board_ids).update(version=F('version') + 1)
+    for board_id in board_ids:
+        forget_board(board_id)
+
+@receiver(pre_save, sender=Board)
+def reset_custom_image_hash(sender, instance, **kwargs):
+    # A file that is not committed yet is a new upload, its thumbnails do not exist yet
+    if instance.custom_image and not instance.custom_image._committed:
+        instance.custom_image_hash = ''
+        instance._custom_image_uploaded = True
+
+@receiver(post_save, sender=Board)
+def resize_custom_image(sender, instance, **kwargs):
+    if getattr(instance, '_custom_image_uploaded', False):
+        instance._custom_image_uploaded = False
+        board_id, name = instance.id, instance.custom_image.name
+        transaction.on_commit(lambda: schedule_thumbnails(board_id, name))
@@ -1,13 +1,32 @@
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from workspaces.models import Workspace
 from boards.models import Board
 from authentication.models import CustomUser
+from lists.models import List
+from cards.models import Card
+from boards.events import board_event
+from authentication.jwt import user_cache
+import shutil
+import tempfile
+from io import BytesIO
+from PIL import Image as PILImage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from boards.serializers import BoardSerializer
+from boards.models import BoardEvent
+from django.core.management import call_command
+from io import StringIO
 
 class BoardAPITestCase(APITestCase):
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
 
         # Register and login a new user
         register_url = reverse('register')
@@ -193,4 +212,165 @@ class BoardAPITestCase(APITestCase):
         delete_data = {'board_id': board_id}
         delete_response = self.client.delete(delete_url, delete_data, HTTP_AUTHORIZATION=f'Bearer {self.token}')
         self.assertEqual(delete_response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(Board.objects.filter(id=board_id, title='Board').exists())
\ No newline at end of file
+        self.assertFalse(Board.objects.filter(id=board_id, title='Board').exists())
+
+    def test_get_board_query_count_is_flat(self):
+        workspace = Workspace.objects.create(name='Test', owner=self.user)
+        board = Board.objects.create(title='Board', creator=self.user, workspace=workspace)
+        board.members.add(self.user)
+        get_url = reverse('board-get', args=[board.id])
+
+        def add_lists(count, cards_per_list):
+            for _ in range(count):
+                list_instance = List.objects.create(title='List', position=1, rank='i', board=board)
+                for _ in range(cards_per_list):
+                    Card.objects.create(title='Card', position=1, rank='i', list=list_instance)
+
+        def count_queries():
+            # Start cold every time: no cached payload and no cached user
+            cache.clear()
+            user_cache.invalidate(self.user.id)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(get_url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries), response
+
+        add_lists(2, 2)
+        small, _ = count_queries()
+        add_lists(20, 10)
+        large, response = count_queries()
+        # The board, its lists and their cards are loaded with a fixed number of queries
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['lists']), 22)
+        self.assertEqual(sum(len(list_data['cards']) for list_data in response.data['lists']), 204)
+
+    def test_get_board_answers_304_while_unchanged(self):
+        workspace = Workspace.objects.create(name='Test', owner=self.user)
+        board = Board.objects.create(title='Board', creator=self.user, workspace=workspace)
+        List.objects.create(title='List', position=1, rank='i', board=board)
+        get_url = reverse('board-get', args=[board.id])
+
+        response = self.client.get(get_url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        # An unchanged board is answered from the cache, without touching boards, lists or cards
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(get_url, HTTP_AUTHORIZATION=f'Bearer {self.token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse([query for query in queries if 'boards_board' in query['sql'] or 'lists_list' in query['sql']])
+
+        # Any list/card change bumps the version and with it the ETag
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            List.objects.create(title='Second', position=2, rank='j', board=board)
+            board_event(board.id, 'list_created')
+        response = self.client.get(get_url, HTTP_AUTHORIZATION=f'Bearer {self.token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['lists']), 2)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class BoardThumbnailTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='user@example.com', password='password123')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+
+    def upload(self, color='red'):
+        output = BytesIO()
+        PILImage.new('RGB', (3200, 1800), color).save(output, 'PNG')
+        return SimpleUploadedFile('background.png', output.getvalue(), content_type='image/png')
+
+    def test_uploads_are_resized_once_per_content(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            board = Board.objects.create(title='Board', creator=self.user, workspace=self.workspace, custom_image=self.upload())
+        board.refresh_from_db()
+        self.assertEqual(len(board.custom_image_hash), 64)
+        self.assertEqual(board.version, 1)
+
+        data = BoardSerializer(board).data
+        self.assertNotIn('custom_image_hash', data)
+        self.assertEqual(data['thumbnail'], reverse('image-thumbnail', kwargs={'name': f'{board.custom_image_hash}_small.jpg'}))
+        response = self.client.get(data['thumbnail'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('immutable', response['Cache-Control'])
+        with PILImage.open(BytesIO(b''.join(response.streaming_content))) as thumbnail:
+            self.assertEqual(thumbnail.size, (400, 225))
+
+        # The same picture on another board reuses the derivatives
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Board.objects.create(title='Other', creator=self.user, workspace=self.workspace, custom_image=self.upload())
+        other.refresh_from_db()
+        self.assertEqual(other.custom_image_hash, board.custom_image_hash)
+        self.assertEqual(self.client.get(reverse('image-thumbnail', kwargs={'name': 'nope_small.jpg'})).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_replacing_the_image_forgets_the_old_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            board = Board.objects.create(title='Board', creator=self.user, workspace=self.workspace, custom_image=self.upload())
+        board.refresh_from_db()
+        old_hash = board.custom_image_hash
+
+        board.custom_image = self.upload('blue')
+        with self.captureOnCommitCallbacks(execute=False):
+            board.save()
+        # Until the new image is resized the original is shown
+        self.assertEqual(BoardSerializer(board).data['thumbnail'], board.custom_image.url)
+        board.refresh_from_db()
+        self.assertEqual(board.custom_image_hash, '')
+        self.assertNotEqual(old_hash, '')
+
+class BoardEventJournalTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='user@example.com', password='password123')
+        self.token = self.client.post(reverse('login'), {'email': 'user@example.com', 'password': 'password123'}).json().get('access_token')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        self.board = Board.objects.create(title='Board', creator=self.user, workspace=workspace)
+        self.list = List.objects.create(title='List', position=1, board=self.board)
+
+    def get_events(self, since):
+        return self.client.get(reverse('board-events', kwargs={'board_id': self.board.id}), {'since': since})
+
+    def test_events_are_journaled_with_the_change(self):
+        with transaction.atomic():
+            first = board_event(self.board.id, 'card_created', card={'id': 1})
+        self.client.put(reverse('board-update'), {'board_id': self.board.id, 'updated_data': {'title': 'Renamed'}}, format='json')
+        self.assertEqual(list(BoardEvent.objects.values_list('seq', 'action')), [(1, 'card_created'), (2, 'board_updated')])
+
+        response = self.get_events(0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['board_version'], 2)
+        self.assertEqual(response.data['events'][0], first)
+        self.assertEqual(self.get_events(2).data['events'], [])
+
+        # A change rolled back leaves neither a version nor a journal entry
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            board_event(self.board.id, 'card_deleted', id=1)
+            raise RuntimeError
+        self.assertEqual(BoardEvent.objects.count(), 2)
+
+    def test_compaction_forces_a_reload(self):
+        for index in range(5):
+            board_event(self.board.id, 'card_updated', card={'id': index})
+        out = StringIO()
+        call_command('compact_board_journal', keep=2, stdout=out)
+        self.assertIn('Deleted 3 board events', out.getvalue())
+
+        self.assertEqual(self.get_events(2).status_code, status.HTTP_410_GONE)
+        self.assertEqual([event['card']['id'] for event in self.get_events(3).data['events']], [3, 4])
+
+    def test_rebalance_ranks_respaces_each_container_once(self):
+        List.objects.filter(id=self.list.id).update(rank='a' * 10 + '1')
+        List.objects.create(title='Other', position=2, rank='a' * 10 + '2', board=self.board)
+        for index in range(1, 3):
+            Card.objects.create(title=f'Card {index}', position=index, rank='a' * 10 + str(index), list=self.list)
+        out = StringIO()
+        call_command('rebalance_ranks', max_length=4, stdout=out)
+        self.assertIn('Rebalanced 1 board(s) and 1 list(s)', out.getvalue())
+        self.assertEqual(list(BoardEvent.objects.order_by('seq').values_list('action', flat=True)), ['lists_rebalanced', 'cards_rebalanced'])
@@ -1,15 +1,20 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.jwt import CachedJWTAuthentication
 from django.db.models import Q
 from workspaces.models import Workspace
 from boards.models import Board
 from .serializers import BoardSerializer
+from .queries import boards_for_display, board_with_lists
+from .cache import get_cached_version, board_etag, get_cached_payload, cache_payload
+from .events import bump_board_version, get_events_since, get_board_version
+from .permissions import is_board_member
+from django.db import transaction
 
 # Get all the boards of a user
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_boards(request):
     # Access the authenticated user
     user = request.user
@@ -17,27 +22,63 @@ def get_boards(request):
     workspaces = Workspace.objects.filter(Q(owner=user) | Q(members=user))
     # Query the database for relevant boards
     # Include boards where the user is the creator or the workspace is in the user's workspaces
-    boards = Board.objects.filter(Q(creator=user) | Q(workspace__in=workspaces))
+    boards = boards_for_display().filter(Q(creator=user) | Q(workspace__in=workspaces))
     # Serialize the list of boards into JSON format, allowing multiple instances
     serializer = BoardSerializer(boards, many=True, context={'request': request})
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 # Get a single board and its lists
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_board_and_lists(request, board_id):
+    # The board version is the ETag: an unchanged board costs one cache lookup and a 304
+    version = get_cached_version(board_id)
+    if version is None:
+        return Response({'error': 'Board not found'}, status=status.HTTP_404_NOT_FOUND)
+    etag = board_etag(board_id, version)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    data = get_cached_payload(board_id, version)
+    if data is None:
+        try:
+            # Query the database for the board, its lists and their cards in one go
+            board = board_with_lists(board_id)
+        except Board.DoesNotExist:
+            return Response({'error': 'Board not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Serialize the board into a JSON format
+        # The version was read first, so the payload is at least as new as the key it is stored under
+        data = BoardSerializer(board, context={'include_lists': True, 'thumbnail_size': 'large', 'request': request}).data
+        cache_payload(board_id, version, data)
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+# Changes to a board after version since, oldest first, from the board event journal
+# 410 when the journal no longer covers them: the client reloads the board instead
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+def get_board_events(request, board_id):
     try:
-        # Query the database for the board
-        board = Board.objects.get(id=board_id)
-    except Board.DoesNotExist:
+        since = int(request.query_params.get('since', ''))
+    except ValueError:
+        return Response({'error': 'since must be a board version'}, status=status.HTTP_400_BAD_REQUEST)
+
+    version = get_board_version(board_id)
+    if version is None:
         return Response({'error': 'Board not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_board_member(request.user.id, board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
-    # Serialize the board into a JSON format
-    serializer = BoardSerializer(board, context={'include_lists': True})
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    events = get_events_since(board_id, since)
+    if events is None:
+        return Response({'error': f'Changes since version {since} are no longer available', 'board_version': version}, status=status.HTTP_410_GONE)
+    return Response({'board_id': board_id, 'board_version': events[-1]['board_version'] if events else since, 'events': events}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def create_board(request):
     # Access the authenticated user
     user = request.user
@@ -93,7 +134,7 @@ def create_board(request):
 
 # Update board
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def update_board(request):
     # Retrieve the data from the request
     board_id = request.data.get('board_id')
@@ -104,13 +145,16 @@ def update_board(request):
         return Response({'error': 'Board ID is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Retrieve the board object
-        board = Board.objects.get(id=board_id)
-        # Update board fields with new data
-        for key, value in updated_data.items():
-            setattr(board, key, value)
-        # Save updated board
-        board.save()
+        with transaction.atomic():
+            # Retrieve the board object, locked so saving it cannot overwrite a concurrent version bump
+            board = Board.objects.select_for_update().get(id=board_id)
+            # Update board fields with new data
+            for key, value in updated_data.items():
+                if key != 'version':
+                    setattr(board, key, value)
+            # Save updated board, the new version makes cached copies of it stale
+            board.save()
+            board.version = bump_board_version(board.id)
         # Serialize and return the updated board
         serializer = BoardSerializer(board)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -119,7 +163,7 @@ def update_board(request):
 
 # Add board to favorites
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def toggle_favorite_board(request):
     # Retrieve the board ID from the query parameters
     board_id = request.query_params.get('board_id')
@@ -140,6 +184,8 @@ def toggle_favorite_board(request):
             # If the board is not in favorites, add it
             board.favorite.add(request.user)
             action = 'added to'
+        # Favorites are part of the board payload
+        bump_board_version(board.id)
         
         return Response({'message': f'Board {action} favorites successfully'}, status=status.HTTP_200_OK)
     except Board.DoesNotExist:
@@ -147,7 +193,7 @@ def toggle_favorite_board(request):
     
 # Delete board
 @api_view(['DELETE'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def delete_board(request):
     # Retrieve the user from the request
     user = request.user
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0003_card_label'),
+        ('lists', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='card',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='rank',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['list', 'rank'], name='cards_card_list_id_feb7b0_idx'),
+        ),
+    ]
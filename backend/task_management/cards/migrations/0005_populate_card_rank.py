@@ -0,0 +1,25 @@
+from django.db import migrations
+from task_management.ranking import evenly_spaced_ranks
+
+
+def populate_card_ranks(apps, schema_editor):
+    Card = apps.get_model('cards', 'Card')
+    # Clear the default (rank, id) ordering, otherwise DISTINCT returns one row per card
+    list_ids = Card.objects.order_by().values_list('list_id', flat=True).distinct()
+    for list_id in list_ids:
+        # Keep the order the integer positions described
+        cards = list(Card.objects.filter(list_id=list_id).order_by('position', 'id'))
+        for card, rank in zip(cards, evenly_spaced_ranks(len(cards))):
+            card.rank = rank
+        Card.objects.bulk_update(cards, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0004_card_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_card_ranks, migrations.RunPython.noop),
+    ]
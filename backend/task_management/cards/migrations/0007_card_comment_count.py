@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0006_card_attachment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
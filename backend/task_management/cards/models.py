@@ -5,10 +5,19 @@ class Card(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     position = models.PositiveIntegerField()
+    rank = models.CharField(max_length=255, default='') # Sort key within the list, see task_management.ranking
     due_date = models.DateTimeField(null=True, blank=True)
     attachment = models.URLField(blank=True)
     list = models.ForeignKey(List, related_name='cards', on_delete=models.CASCADE)
     label = models.CharField(max_length=7, blank=True)
+    attachment_count = models.PositiveIntegerField(default=0) # Kept up to date by attachments.signals
+    comment_count = models.PositiveIntegerField(default=0) # Kept up to date by comments.signals
+
+    class Meta:
+        ordering = ['rank', 'id']
+        indexes = [
+            models.Index(fields=['list', 'rank']),
+        ]
 
     def __str__(self):
         return self.title
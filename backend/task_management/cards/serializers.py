@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import Card
+from task_management.serializers import PositionedListSerializer
 
 class CardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Card
-        fields = ['id', 'title', 'description', 'position', 'due_date', 'attachment', 'list']
\ No newline at end of file
+        fields = ['id', 'title', 'description', 'position', 'due_date', 'attachment', 'list', 'label', 'rank', 'attachment_count', 'comment_count']
+        read_only_fields = ['attachment_count', 'comment_count']
+        list_serializer_class = PositionedListSerializer
\ No newline at end of file
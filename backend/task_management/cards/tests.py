@@ -1,3 +1,315 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TransactionTestCase, override_settings
+import asyncio
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from task_management.testing import WebsocketCommunicator
+from authentication.models import CustomUser
+from workspaces.models import Workspace
+from boards.models import Board
+from lists.models import List
+from cards.models import Card
+from cards.views import rebalance_card_ranks
+from task_management.ranking import evenly_spaced_ranks
+from task_management.ordering import reorder
+from task_management.consumers import DispatcherConsumer
+from boards import permissions
+from boards.events import compact_journal
+from task_management.middleware import JWTAuthMiddleware
+from task_management import metrics
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+class CardConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='user@test.com', password='test123')
+        self.workspace = Workspace.objects.create(name='Test Workspace', owner=self.user)
+        self.board = Board.objects.create(title='Board', creator=self.user, workspace=self.workspace)
+        self.token = str(AccessToken.for_user(self.user))
+        self.todo = List.objects.create(title='To do', position=1, board=self.board)
+        self.done = List.objects.create(title='Done', position=2, board=self.board)
+        self.card = Card.objects.create(title='Card', position=1, rank='i', list=self.todo)
+
+    @async_to_sync
+    async def send_actions(self, *messages):
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        responses = []
+        for message in messages:
+            await communicator.send_json_to(message)
+            responses.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        return responses
+
+    def test_move_card_sends_patch(self):
+        [response] = self.send_actions({
+            'action': 'move_card', 'board_id': self.board.id, 'card_id': self.card.id,
+            'new_list_id': self.done.id, 'new_position': 1,
+        })
+        # Only the moved card is described, not the whole board
+        self.assertEqual(response['action'], 'card_moved')
+        self.assertEqual(response['id'], self.card.id)
+        self.assertEqual(response['from_list'], self.todo.id)
+        self.assertEqual(response['to_list'], self.done.id)
+        self.assertEqual(response['board_version'], 1)
+        self.assertNotIn('list', response)
+        self.assertEqual(Card.objects.get(id=self.card.id).list_id, self.done.id)
+
+    def test_sync_board_replays_missed_events(self):
+        created, in_sync, replay = self.send_actions(
+            {'action': 'create_card', 'board_id': self.board.id, 'list_id': self.todo.id, 'title': 'New card'},
+            {'action': 'sync_board', 'board_id': self.board.id, 'board_version': 1},
+            {'action': 'sync_board', 'board_id': self.board.id, 'board_version': 0},
+        )
+        self.assertEqual(created['action'], 'card_created')
+        self.assertEqual(created['card']['title'], 'New card')
+        self.assertEqual(in_sync['action'], 'board_in_sync')
+        # Only the missed patch is sent, exactly as it was broadcast
+        self.assertEqual(replay['action'], 'board_events')
+        self.assertEqual(replay['board_version'], 1)
+        self.assertEqual(replay['events'], [created])
+
+    def test_sync_board_rejects_a_malformed_version(self):
+        [response] = self.send_actions({'action': 'sync_board', 'board_id': self.board.id, 'board_version': 'latest'})
+        self.assertEqual(response, {'error': 'board_version must be a board version'})
+
+    def test_sync_board_sends_snapshot_when_the_journal_was_compacted(self):
+        [created] = self.send_actions({'action': 'create_card', 'board_id': self.board.id, 'list_id': self.todo.id, 'title': 'New card'})
+        self.assertEqual(compact_journal(self.board.id, keep=0), 1)
+        [snapshot] = self.send_actions({'action': 'sync_board', 'board_id': self.board.id, 'board_version': 0})
+        self.assertEqual(snapshot['action'], 'board_snapshot')
+        self.assertEqual(snapshot['board_version'], 1)
+        self.assertEqual([len(list_data['cards']) for list_data in snapshot['list']], [2, 0])
+
+    @async_to_sync
+    async def test_move_card_reaches_every_subscriber(self):
+        sender = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+        collaborator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+        for communicator in (sender, collaborator):
+            await communicator.connect()
+            await communicator.send_json_to({'action': 'subscribe', 'board_id': self.board.id})
+            snapshot = await communicator.receive_json_from()
+            self.assertEqual(snapshot['action'], 'board_snapshot')
+
+        await sender.send_json_to({
+            'action': 'move_card', 'board_id': self.board.id, 'card_id': self.card.id,
+            'new_list_id': self.done.id, 'new_position': 1,
+        })
+        for communicator in (sender, collaborator):
+            response = await communicator.receive_json_from()
+            self.assertEqual(response['action'], 'card_moved')
+            self.assertEqual(response['board_version'], 1)
+        # The sender is in the group, so it gets the patch exactly once
+        self.assertTrue(await sender.receive_nothing())
+
+        for communicator in (sender, collaborator):
+            await communicator.disconnect()
+
+    def test_move_card_only_rewrites_the_moved_card(self):
+        cards = [
+            Card.objects.create(title=f'Card {index}', position=index, rank=rank, list=self.done)
+            for index, rank in enumerate(evenly_spaced_ranks(5), start=1)
+        ]
+        ranks_before = dict(Card.objects.filter(list=self.done).values_list('id', 'rank'))
+
+        [response] = self.send_actions({
+            'action': 'move_card', 'board_id': self.board.id, 'card_id': cards[4].id,
+            'new_list_id': self.done.id, 'new_position': 1,
+        })
+        self.assertEqual(response['position'], 1)
+        ranks_after = dict(Card.objects.filter(list=self.done).values_list('id', 'rank'))
+        changed = [card_id for card_id in ranks_after if ranks_after[card_id] != ranks_before[card_id]]
+        self.assertEqual(changed, [cards[4].id])
+        ordered = list(Card.objects.filter(list=self.done).values_list('id', flat=True))
+        self.assertEqual(ordered, [cards[4].id] + [card.id for card in cards[:4]])
+
+    def test_move_that_respaces_the_list_sends_the_new_keys(self):
+        # Concurrent inserts left two cards on the same key, nothing sorts between them
+        first = Card.objects.create(title='First', position=1, rank='m', list=self.done)
+        second = Card.objects.create(title='Second', position=2, rank='m', list=self.done)
+        [response] = self.send_actions({
+            'action': 'move_card', 'board_id': self.board.id, 'card_id': self.card.id,
+            'new_list_id': self.done.id, 'new_position': 2,
+        })
+        ranks = dict(Card.objects.filter(list=self.done).values_list('id', 'rank'))
+        self.assertEqual(response['ranks'], {str(first.id): ranks[first.id], str(second.id): ranks[second.id]})
+        self.assertTrue(ranks[first.id] < response['rank'] < ranks[second.id])
+
+    def test_rebalance_respaces_long_keys(self):
+        Card.objects.create(title='Long', position=2, rank='i' + 'z' * 40, list=self.todo)
+        event = rebalance_card_ranks(self.todo.id)
+        self.assertEqual(event['action'], 'cards_rebalanced')
+        ranks = list(Card.objects.filter(list=self.todo).values_list('title', 'rank'))
+        self.assertEqual([title for title, _ in ranks], ['Card', 'Long'])
+        self.assertTrue(all(len(rank) <= 2 for _, rank in ranks))
+
+    def test_reorder_rewrites_a_list_in_one_statement(self):
+        cards = [self.card] + [
+            Card.objects.create(title=f'Card {index}', position=index, rank=rank, list=self.todo)
+            for index, rank in enumerate(['j', 'k', 'l'], start=2)
+        ]
+        ids = [card.id for card in reversed(cards)]
+        with self.assertNumQueries(2):
+            reorder(Card.objects.filter(list=self.todo), ids)
+        rows = list(Card.objects.filter(list=self.todo).values_list('id', 'position'))
+        self.assertEqual(rows, [(card_id, position) for position, card_id in enumerate(ids, start=1)])
+
+        # Every card of the list must be named exactly once
+        with self.assertRaises(ValueError):
+            reorder(Card.objects.filter(list=self.todo), ids[1:])
+
+    def test_reorder_cards_action(self):
+        other = Card.objects.create(title='Other', position=2, rank='j', list=self.todo)
+        [response] = self.send_actions({
+            'action': 'reorder_cards', 'list_id': self.todo.id, 'card_ids': [other.id, self.card.id],
+        })
+        self.assertEqual(response['action'], 'cards_reordered')
+        self.assertEqual(response['card_ids'], [other.id, self.card.id])
+        self.assertEqual(list(Card.objects.filter(list=self.todo).values_list('id', flat=True)), [other.id, self.card.id])
+
+    @override_settings(BOARD_DENSE_POSITIONS=True)
+    def test_dense_positions_stay_contiguous(self):
+        second = Card.objects.create(title='Second', position=2, rank='j', list=self.todo)
+        third = Card.objects.create(title='Third', position=3, rank='k', list=self.todo)
+        Card.objects.create(title='Done', position=1, rank='i', list=self.done)
+
+        self.send_actions(
+            {'action': 'move_card', 'board_id': self.board.id, 'card_id': self.card.id, 'new_list_id': self.done.id, 'new_position': 1},
+            {'action': 'delete_card', 'card_id': second.id},
+        )
+        self.assertEqual(list(Card.objects.filter(list=self.todo).values_list('id', 'position')), [(third.id, 1)])
+        self.assertEqual(sorted(Card.objects.filter(list=self.done).values_list('position', flat=True)), [1, 2])
+
+    def test_board_permissions_are_resolved_once_per_connection(self):
+        with mock.patch('task_management.consumers.get_board_access', wraps=permissions.get_board_access) as get_board_access:
+            responses = self.send_actions(*[
+                {'action': 'update_card', 'card_id': self.card.id, 'title': f'Title {index}'}
+                for index in range(3)
+            ])
+        self.assertEqual([response['action'] for response in responses], ['card_updated'] * 3)
+        get_board_access.assert_called_once_with(self.user.id, self.board.id)
+
+    def test_outsiders_cannot_change_the_board(self):
+        outsider = CustomUser.objects.create_user(email='outsider@test.com', password='test123')
+        self.token = str(AccessToken.for_user(outsider))
+        [response] = self.send_actions({'action': 'update_card', 'card_id': self.card.id, 'title': 'Hacked'})
+        self.assertEqual(response, {'error': 'Permission denied'})
+        self.assertEqual(Card.objects.get(id=self.card.id).title, 'Card')
+
+    @async_to_sync
+    async def test_sockets_without_a_token_are_rejected(self):
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), '/ws/board/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        closed = await communicator.receive_output()
+        self.assertEqual((closed['type'], closed['code']), ('websocket.close', 4401))
+
+    def test_rapid_moves_of_a_card_are_coalesced(self):
+        metrics.reset()
+        moves = [
+            {'action': 'move_card', 'board_id': self.board.id, 'card_id': self.card.id, 'new_list_id': list_id, 'new_position': 1}
+            for list_id in (self.done.id, self.todo.id, self.done.id)
+        ]
+        [moved, updated] = self.send_actions_at_once(*moves, {'action': 'update_card', 'board_id': self.board.id, 'card_id': self.card.id, 'title': 'Dropped'})
+        # One write and one patch for the last move, applied before the update that followed it
+        self.assertEqual(moved['action'], 'card_moved')
+        self.assertEqual(moved['to_list'], self.done.id)
+        self.assertEqual(moved['board_version'], 1)
+        self.assertEqual(updated['action'], 'card_updated')
+        self.assertEqual(updated['board_version'], 2)
+        self.assertEqual(metrics.snapshot('board.moves'), {
+            'board.moves.coalesced': 2, 'board.moves.received': 3, 'board.moves.written': 1,
+        })
+
+    @override_settings(BOARD_MOVE_COALESCE_WINDOW=10)
+    def test_pending_moves_are_saved_on_disconnect(self):
+        self.send_actions_at_once({'action': 'move_card', 'board_id': self.board.id, 'card_id': self.card.id, 'new_list_id': self.done.id, 'new_position': 1})
+        self.assertEqual(Card.objects.get(id=self.card.id).list_id, self.done.id)
+
+    @async_to_sync
+    async def send_actions_at_once(self, *messages):
+        # Sends everything before reading, then collects whatever comes back
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+        await communicator.connect()
+        for message in messages:
+            await communicator.send_json_to(message)
+        responses = []
+        while not await communicator.receive_nothing(timeout=0.3):
+            responses.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        return responses
+
+    @override_settings(BOARD_SOCKET_QUEUE_SIZE=1)
+    def test_full_queue_answers_busy(self):
+        responses = self.send_actions_at_once(*[
+            {'action': 'update_card', 'board_id': self.board.id, 'card_id': self.card.id, 'title': f'Title {index}'}
+            for index in range(3)
+        ])
+        self.assertEqual(sorted(response['action'] for response in responses), ['busy', 'busy', 'card_updated'])
+        self.assertEqual(Card.objects.get(id=self.card.id).title, 'Title 0')
+
+    @async_to_sync
+    async def test_a_slow_board_does_not_hold_up_another(self):
+        other = await database_sync_to_async(Board.objects.create)(title='Other', creator=self.user, workspace=self.workspace)
+        release = asyncio.Event()
+        sync_board = DispatcherConsumer.sync_board
+
+        async def slow_sync_board(consumer, content):
+            # Stands in for a slow query on the first board
+            if content['board_id'] == self.board.id:
+                await release.wait()
+            await sync_board(consumer, content)
+
+        with mock.patch.object(DispatcherConsumer, 'sync_board', slow_sync_board):
+            communicator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+            await communicator.connect()
+            for board_id in (self.board.id, other.id):
+                await communicator.send_json_to({'action': 'sync_board', 'board_id': board_id, 'board_version': 0})
+            first = await communicator.receive_json_from()
+            release.set()
+            second = await communicator.receive_json_from()
+            await communicator.disconnect()
+        self.assertEqual([first['board_id'], second['board_id']], [other.id, self.board.id])
+        self.assertEqual({first['action'], second['action']}, {'board_in_sync'})
+
+    def test_socket_orm_calls_report_their_wait(self):
+        metrics.reset()
+        [updated] = self.send_actions({'action': 'update_card', 'board_id': self.board.id, 'card_id': self.card.id, 'title': 'Renamed'})
+        self.assertEqual(updated['action'], 'card_updated')
+        orm = metrics.snapshot('orm.')
+        self.assertGreaterEqual(orm['orm.calls'], 2)
+        self.assertIn('orm.wait_ms', orm)
+        self.assertEqual(orm['orm.queue_depth'], 0)
+
+    @override_settings(REALTIME_DB_SHED_WAIT=1)
+    def test_actions_are_refused_while_the_database_is_overloaded(self):
+        metrics.reset()
+        with mock.patch('task_management.db.oldest_wait', return_value=5):
+            [response] = self.send_actions({'action': 'update_card', 'board_id': self.board.id, 'card_id': self.card.id, 'title': 'Renamed'})
+        self.assertEqual(response, {'action': 'busy', 'rejected_action': 'update_card', 'board_id': self.board.id})
+        self.assertEqual(Card.objects.get(id=self.card.id).title, 'Card')
+        self.assertEqual(metrics.snapshot('orm.shed'), {'orm.shed': 1})
+
+    @async_to_sync
+    async def test_moving_a_card_to_another_board_updates_both_boards(self):
+        other = await database_sync_to_async(Board.objects.create)(title='Other', creator=self.user, workspace=self.workspace)
+        target = await database_sync_to_async(List.objects.create)(title='Elsewhere', position=1, board=other)
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+        await communicator.connect()
+        await communicator.send_json_to({'action': 'subscribe', 'board_id': self.board.id, 'board_version': 0})
+        self.assertEqual((await communicator.receive_json_from())['action'], 'board_in_sync')
+
+        await communicator.send_json_to({'action': 'move_card', 'board_id': other.id, 'card_id': self.card.id, 'new_list_id': target.id, 'new_position': 1})
+        events = {}
+        for _ in range(2):
+            event = await communicator.receive_json_from()
+            events[event['board_id']] = event
+        await communicator.disconnect()
+
+        # Subscribers of the old board see the card leave, and its version moves on
+        self.assertEqual(events[self.board.id]['action'], 'card_moved')
+        self.assertEqual(events[self.board.id]['to_list'], target.id)
+        self.assertEqual(events[other.id]['action'], 'card_moved')
+        self.assertEqual(events[other.id]['card']['title'], 'Card')
+        versions = await database_sync_to_async(lambda: dict(Board.objects.values_list('id', 'version')))()
+        self.assertEqual(versions, {self.board.id: 1, other.id: 1})
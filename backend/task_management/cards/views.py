@@ -1,29 +1,24 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.jwt import CachedJWTAuthentication
 from boards.models import Board
 from lists.models import List
 from .serializers import CardSerializer
-from boards.models import Board
 from authentication.models import CustomUser
-from lists.models import List
 from lists.serializers import ListSerializer
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.core.exceptions import ObjectDoesNotExist
-from channels.db import database_sync_to_async
+from task_management.db import database_sync_to_async
 from django.db import transaction
 from django.core.serializers.json import DjangoJSONEncoder
 from django.forms.models import model_to_dict
 from cards.models import Card
-import datetime
-import json
-
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        return super(DateTimeEncoder, self).default(obj)
+from boards.events import board_event, broadcast_board_event
+from django.conf import settings
+from task_management.ranking import rank_between, needs_rebalance
+from task_management.ordering import place_at_position, rebalance, reorder, close_gap, open_gap, shift_between
+import asyncio
 
 class CardConsumer(AsyncJsonWebsocketConsumer):
     def __init__(self, dispatcher):
@@ -36,11 +31,7 @@ class CardConsumer(AsyncJsonWebsocketConsumer):
         pass
 
     async def receive_json(self, content):
-        print('receive_json function called')
         action = content.get('action').strip().lower()
-        print(f'Received action: {action}')  # Print the received action
-        print(f'Type of action: {type(action)}')
-        print(f'ASCII values of action: {[ord(c) for c in action]}')
         if action == 'move_card':
             await self.card_moved(content)
         elif action == 'create_card':
@@ -49,36 +40,17 @@ class CardConsumer(AsyncJsonWebsocketConsumer):
             await self.delete_card(content)
         elif action == 'update_card':
             await self.update_card(content)
-
-    # Include the lists in the response
-    @database_sync_to_async
-    def get_all_lists_with_cards(self, board_id):
-        lists = List.objects.filter(board_id=board_id).prefetch_related('cards')
-        all_lists_with_cards = []
-        encoder = DateTimeEncoder()
-        for list_obj in lists:
-            list_dict = model_to_dict(list_obj)  # Convert the list model to a dictionary
-            cards = list_obj.cards.all()
-            list_dict['cards'] = [json.loads(encoder.encode(model_to_dict(card))) for card in cards]
-            all_lists_with_cards.append(list_dict)
-        return all_lists_with_cards
+        elif action == 'reorder_cards':
+            await self.reorder_cards(content)
 
     async def create_card(self, content):
         list_id = content.get('list_id')
         card_title = content.get('title')
-        board_id = content.get('board_id')
 
-        card_data = await self.create_new_card(list_id, card_title)
-        if 'error' in card_data:
-            await self.dispatcher.send_json({
-                'error': card_data['error']
-            })
-        else:
-            all_lists = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'card_created',
-                'list': all_lists,
-            })
+        event = await self.create_new_card(list_id, card_title)
+        await self.dispatcher.send_board_event(event)
+        if 'card' in event:
+            self.schedule_rebalance(event['card']['list'], event['card']['rank'])
 
     @database_sync_to_async
     def create_new_card(self, list_id, card_title):
@@ -87,71 +59,83 @@ class CardConsumer(AsyncJsonWebsocketConsumer):
         except List.DoesNotExist:
             return {'error': 'List not found'}
 
+        error = self.dispatcher.permission_error(list_instance.board_id)
+        if error:
+            return error
+
         try:
-            position = Card.objects.filter(list=list_instance).count() + 1
-            card = Card.objects.create(title=card_title, position=position, list=list_instance)
-            serializer = CardSerializer(card)
-            return serializer.data
+            with transaction.atomic():
+                # Lock the list so concurrent inserts do not pick the same rank
+                List.objects.select_for_update().get(id=list_instance.id)
+                cards_in_list = Card.objects.filter(list=list_instance)
+                position = cards_in_list.count() + 1
+                last_rank = cards_in_list.order_by('-rank').values_list('rank', flat=True).first()
+                card = Card.objects.create(title=card_title, position=position, rank=rank_between(last_rank, None), list=list_instance)
+                serializer = CardSerializer(card)
+                return board_event(list_instance.board_id, 'card_created', card=serializer.data)
         except Exception as e:
             return {'error': str(e)}
         
     async def card_moved(self, content):
         card_id = content.get('card_id')
         new_position = content.get('new_position')
-        board_id = content.get('board_id')
         new_list_id = content.get('new_list_id')
 
-        card_data = await self.update_card_position(card_id, new_position, new_list_id)
-        if 'error' in card_data:
-            await self.dispatcher.send_json({
-                'error': card_data['error']
-            })
-        else:
-            all_lists = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'card_moved',
-                'list': all_lists,
-            })
+        event = await self.update_card_position(card_id, new_position, new_list_id)
+        await self.dispatcher.send_board_event(event)
+        if 'rank' in event:
+            self.schedule_rebalance(event['to_list'], event['rank'])
 
     @database_sync_to_async
     def update_card_position(self, card_id, new_position, new_list_id):
         try:
             with transaction.atomic():
                 try:
-                    card = Card.objects.get(id=card_id)
+                    card = Card.objects.select_related('list').get(id=card_id)
                 except Card.DoesNotExist:
                     return {'error': 'Card not found'}
 
                 # Ensure the new position is an integer
                 new_position = int(new_position)
+                old_list_id = card.list_id
+                old_board_id = card.list.board_id
+                # Lock the target list so concurrent moves into it do not pick the same rank
+                new_list = List.objects.select_for_update().get(id=new_list_id)
 
-                # If the card is moving to a different list
-                if card.list_id != new_list_id:
-                    # Decrement the positions of cards in the old list that are after the card
-                    cards_in_old_list = Card.objects.filter(list_id=card.list_id, position__gt=card.position)
-                    for card_item in cards_in_old_list:
-                        card_item.position -= 1
-                        card_item.save()
-
-                    # Update the list of the card
-                    card.list_id = new_list_id
+                # The user needs access to both boards when a card changes board
+                error = self.dispatcher.permission_error(old_board_id) or self.dispatcher.permission_error(new_list.board_id)
+                if error:
+                    return error
 
                 # Ensure the new position is within expected range
-                max_position = List.objects.get(id=new_list_id).cards.count() + 1
+                siblings = Card.objects.filter(list_id=new_list.id).exclude(id=card.id)
+                max_position = siblings.count() + 1
                 new_position = max(1, min(new_position, max_position))
 
-                # Increment the positions of cards in the new list that are after the new position
-                cards_in_new_list = Card.objects.filter(list_id=new_list_id, position__gte=new_position).exclude(id=card_id)
-                for card_item in cards_in_new_list:
-                    card_item.position += 1
-                    card_item.save()
+                if settings.BOARD_DENSE_POSITIONS:
+                    # Keep the integer positions contiguous, one UPDATE per affected list
+                    if old_list_id != new_list.id:
+                        close_gap(Card.objects.filter(list_id=old_list_id).exclude(id=card.id), card.position)
+                        open_gap(siblings, new_position)
+                    else:
+                        shift_between(siblings, card.position, new_position)
 
-                # Update the position of the moved card
+                # Only the moved card gets a new rank: it sorts between its new neighbours
+                card.rank, respaced = place_at_position(siblings, new_position)
+                card.list_id = new_list.id
                 card.position = new_position
-                card.save()
+                card.save(update_fields=['rank', 'list', 'position'])
 
-                serializer = CardSerializer(card)
-                return serializer.data
+                moved = dict(id=card.id, from_list=old_list_id, to_list=card.list_id, position=card.position, rank=card.rank)
+                if respaced:
+                    # The other cards of the target list got new keys to make room
+                    moved['ranks'] = respaced
+                if old_board_id != new_list.board_id:
+                    # The card left the other board: its version, cached payload and subscribers must see that too
+                    broadcast_board_event(board_event(old_board_id, 'card_moved', **moved))
+                    # Clients of the new board have never seen the card
+                    return board_event(new_list.board_id, 'card_moved', card=CardSerializer(card).data, **moved)
+                return board_event(new_list.board_id, 'card_moved', **moved)
         except ObjectDoesNotExist:
             if card is None:
                 return {'error': 'List not found'}
@@ -166,28 +150,20 @@ class CardConsumer(AsyncJsonWebsocketConsumer):
         due_date = content.get('due_date')
         label = content.get('label')
 
-        print(f'update_card called with card_id: {card_id}, title: {title}, board_id: {board_id}, description: {description}, due_date: {due_date}, label: {label}')
-
-        card_data = await self.update_card_details(card_id, title, description, due_date, label)
-        if 'error' in card_data:
-            await self.dispatcher.send_json({
-                'error': card_data['error']
-            })
-        else:
-            all_lists = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'card_updated',
-                'list': all_lists,
-                'card': card_data
-            })
+        event = await self.update_card_details(card_id, title, description, due_date, label)
+        await self.dispatcher.send_board_event(event)
 
     @database_sync_to_async
     def update_card_details(self, card_id, title, description, due_date, label):
         try:
-            card = Card.objects.get(id=card_id)
+            card = Card.objects.select_related('list').get(id=card_id)
         except Card.DoesNotExist:
             return {'error': 'Card not found'}
 
+        error = self.dispatcher.permission_error(card.list.board_id)
+        if error:
+            return error
+
         if title is not None:
             card.title = title
         if description is not None:
@@ -200,45 +176,82 @@ class CardConsumer(AsyncJsonWebsocketConsumer):
             card.label = label
 
         try:
-            card.save()
+            with transaction.atomic():
+                # Leave the attachment and comment counts alone, they are updated concurrently
+                card.save(update_fields=['title', 'description', 'due_date', 'label'])
+                serializer = CardSerializer(card)
+                return board_event(card.list.board_id, 'card_updated', card=serializer.data)
         except Exception as e:
             return {'error': str(e)}
-
-        serializer = CardSerializer(card)
-        print(f'Updated card: {serializer.data}')
-        return serializer.data
     
     async def delete_card(self,content):
         card_id = content.get('card_id')
-        board_id = content.get('board_id')
 
-        card_data = await self.delete_card_from_list(card_id)
-        if 'error' in card_data:
-            await self.dispatcher.send_json({
-                'error': card_data['error']
-            })
-        else:
-            all_lists = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'card_deleted',
-                'list': all_lists,
-            })
+        event = await self.delete_card_from_list(card_id)
+        await self.dispatcher.send_board_event(event)
 
     @database_sync_to_async
     def delete_card_from_list(self, card_id):
         try:
-            card = Card.objects.get(id=card_id)
+            card = Card.objects.select_related('list').get(id=card_id)
         except Card.DoesNotExist:
             return {'error': 'Card not found'}
 
+        error = self.dispatcher.permission_error(card.list.board_id)
+        if error:
+            return error
+
         list_id = card.list_id
-        position = card.position
 
-        # Decrement the positions of cards in the list that are after the card
-        cards_in_list = Card.objects.filter(list_id=list_id, position__gt=position)
-        for card_item in cards_in_list:
-            card_item.position -= 1
-            card_item.save()
+        # Ranks of the remaining cards stay valid, only dense positions need closing the gap
+        with transaction.atomic():
+            card.delete()
+            if settings.BOARD_DENSE_POSITIONS:
+                close_gap(Card.objects.filter(list_id=list_id), card.position)
+            return board_event(card.list.board_id, 'card_deleted', id=card_id, list_id=list_id)
+
+    # Put every card of a list in the given order, e.g. after sorting a list by due date
+    async def reorder_cards(self, content):
+        list_id = content.get('list_id')
+        card_ids = content.get('card_ids', [])
+
+        event = await database_sync_to_async(reorder_list_cards)(list_id, card_ids, check=self.dispatcher.permission_error)
+        await self.dispatcher.send_board_event(event)
+
+    # Respace a list in the background once its keys get too long
+    def schedule_rebalance(self, list_id, rank):
+        if needs_rebalance(rank):
+            asyncio.ensure_future(self.rebalance_list(list_id))
 
-        card.delete()
-        return {}
\ No newline at end of file
+    async def rebalance_list(self, list_id):
+        event = await database_sync_to_async(rebalance_card_ranks)(list_id)
+        if event:
+            await self.dispatcher.send_board_event(event)
+
+# Respace the rank keys of every card in a list, returns the board event describing the new keys
+def rebalance_card_ranks(list_id):
+    with transaction.atomic():
+        try:
+            list_instance = List.objects.select_for_update().get(id=list_id)
+        except List.DoesNotExist:
+            return None
+        # Order is unchanged, clients only need the new keys
+        ranks = rebalance(Card.objects.filter(list_id=list_id))
+        return board_event(list_instance.board_id, 'cards_rebalanced', list_id=list_instance.id, ranks=ranks)
+
+# Rewrite the positions and ranks of a whole list in one statement
+# check(board_id) returns an error event when the caller may not change the board
+def reorder_list_cards(list_id, card_ids, check=None):
+    with transaction.atomic():
+        try:
+            list_instance = List.objects.select_for_update().get(id=list_id)
+        except List.DoesNotExist:
+            return {'error': 'List not found'}
+        error = check and check(list_instance.board_id)
+        if error:
+            return error
+        try:
+            ranks = reorder(Card.objects.filter(list_id=list_id), card_ids)
+        except (TypeError, ValueError) as e:
+            return {'error': str(e)}
+        return board_event(list_instance.board_id, 'cards_reordered', list_id=list_instance.id, card_ids=list(ranks), ranks=ranks)
\ No newline at end of file
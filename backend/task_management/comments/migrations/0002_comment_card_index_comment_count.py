@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_comments(apps, schema_editor):
+    # Start Card.comment_count from the comments that already exist
+    Card = apps.get_model('cards', 'Card')
+    Comment = apps.get_model('comments', 'Comment')
+    counts = Comment.objects.filter(card=OuterRef('pk')).order_by().values('card').annotate(count=Count('id')).values('count')
+    Card.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0007_card_comment_count'),
+        ('comments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['card', '-created_at', '-id'], name='comments_co_card_id_18990f_idx'),
+        ),
+        migrations.RunPython(count_existing_comments, migrations.RunPython.noop),
+    ]
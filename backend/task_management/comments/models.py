@@ -8,5 +8,11 @@ class Comment(models.Model):
     card = models.ForeignKey(Card, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Newest-first comments of a card, paginated by (created_at, id)
+            models.Index(fields=['card', '-created_at', '-id']),
+        ]
+
     def __str__(self):
-        return f"Comment by {self.author} on {self.card.title}"
\ No newline at end of file
+        return f"Comment by {self.author} on {self.card.title}"
@@ -0,0 +1,18 @@
+from rest_framework import serializers
+from .models import Comment
+
+class CommentSerializer(serializers.ModelSerializer):
+    author_name = serializers.SerializerMethodField()
+    author_nickname = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'card', 'text', 'author', 'author_name', 'author_nickname', 'created_at']
+        read_only_fields = ['card', 'author', 'created_at']
+
+    # Comments are loaded with select_related('author__userprofile'), see comments.views
+    def get_author_name(self, obj):
+        return obj.author.userprofile.name or obj.author.email
+
+    def get_author_nickname(self, obj):
+        return obj.author.userprofile.nickname
@@ -0,0 +1,16 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from cards.models import Card
+from .models import Comment
+
+# Card.comment_count lets boards show comment badges without counting comments per card
+@receiver(post_save, sender=Comment)
+def count_added_comment(sender, instance, created, **kwargs):
+    if created:
+        Card.objects.filter(id=instance.card_id).update(comment_count=F('comment_count') + 1)
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    Card.objects.filter(id=instance.card_id).update(comment_count=Greatest(F('comment_count') - 1, 0))
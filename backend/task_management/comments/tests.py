@@ -1,3 +1,64 @@
-from django.test import TestCase
+from unittest import mock
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from authentication.models import CustomUser
+from authentication.jwt import user_cache
+from workspaces.models import Workspace
+from boards.models import Board
+from lists.models import List
+from cards.models import Card
+from comments.models import Comment
+from boards import events
 
-# Create your tests here.
+class CommentAPITests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='user@example.com', password='password123')
+        self.token = self.client.post(reverse('login'), {'email': 'user@example.com', 'password': 'password123'}).json().get('access_token')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        self.board = Board.objects.create(title='Board', creator=self.user, workspace=workspace)
+        self.card = Card.objects.create(title='Card', position=1, rank='i', list=List.objects.create(title='List', position=1, board=self.board))
+
+    def get_comments(self, **params):
+        user_cache.invalidate(self.user.id)
+        response = self.client.get(reverse('card-comments', kwargs={'card_id': self.card.id}), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_comment_is_pushed_to_the_board(self):
+        with mock.patch('boards.events.send_to_groups') as send_to_groups, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('comment-create'), {'card_id': self.card.id, 'text': 'Looks good'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['author_name'], 'user@example.com')
+
+        [messages], _ = send_to_groups.call_args
+        event = messages[events.board_group_name(self.board.id)]['event']
+        self.assertEqual(event['action'], 'comment_added')
+        self.assertEqual(event['comment']['text'], 'Looks good')
+        self.assertEqual(event['comment_count'], 1)
+        self.assertEqual(event['board_version'], 1)
+
+    def test_comments_are_paginated_with_their_authors(self):
+        others = [CustomUser.objects.create_user(email=f'other{index}@example.com', password='password123') for index in range(3)]
+        comments = [Comment.objects.create(card=self.card, author=author, text=f'Comment {index}') for index, author in enumerate(others * 2)]
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.comment_count, 6)
+
+        # Same number of queries whatever the number of authors on the page
+        with self.assertNumQueries(4):
+            first = self.get_comments(limit=4)
+        self.assertEqual([comment['id'] for comment in first.data], [comment.id for comment in reversed(comments)][:4])
+        second = self.get_comments(limit=4, before=first['X-Next-Cursor'])
+        self.assertEqual([comment['id'] for comment in second.data], [comments[1].id, comments[0].id])
+        self.assertFalse(second.has_header('X-Next-Cursor'))
+
+    def test_only_the_author_can_delete(self):
+        comment = Comment.objects.create(card=self.card, author=CustomUser.objects.create_user(email='other@example.com', password='password123'), text='Mine')
+        url = reverse('comment-update', kwargs={'comment_id': comment.id})
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        own = self.client.post(reverse('comment-create'), {'card_id': self.card.id, 'text': 'Own'}, format='json').data
+        self.assertEqual(self.client.delete(reverse('comment-update', kwargs={'comment_id': own['id']})).status_code, status.HTTP_204_NO_CONTENT)
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.comment_count, 1)
@@ -1,3 +1,88 @@
-from django.shortcuts import render
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, authentication_classes
+from authentication.jwt import CachedJWTAuthentication
+from boards.events import board_event, broadcast_board_event
+from boards.permissions import is_board_member, card_board_id
+from cards.models import Card
+from task_management.pagination import keyset_page, NEXT_CURSOR_HEADER
+from .models import Comment
+from .serializers import CommentSerializer
 
-# Create your views here.
+def comments_with_authors():
+    # The author and their profile come in the same query as the comments
+    return Comment.objects.select_related('author__userprofile')
+
+def comment_count(card_id):
+    return Card.objects.filter(id=card_id).values_list('comment_count', flat=True).first()
+
+# Comments of a card, newest first
+# ?before=<cursor>&limit=<n>, the cursor of the next page is in the X-Next-Cursor header
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+def get_comments(request, card_id):
+    board_id = card_board_id(card_id)
+    if board_id is None:
+        return Response({'error': 'Card not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_board_member(request.user.id, board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        page, next_cursor = keyset_page(comments_with_authors().filter(card_id=card_id), request.query_params.get('before'), request.query_params.get('limit'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = CommentSerializer(page, many=True)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(serializer.data, status=status.HTTP_200_OK, headers=headers)
+
+# Comment on a card, everyone with the board open gets the comment
+@api_view(['POST'])
+@authentication_classes([CachedJWTAuthentication])
+def create_comment(request):
+    card_id = request.data.get('card_id')
+    text = (request.data.get('text') or '').strip()
+
+    if not card_id or not text:
+        return Response({'error': 'Card ID and text are required'}, status=status.HTTP_400_BAD_REQUEST)
+    board_id = card_board_id(card_id)
+    if board_id is None:
+        return Response({'error': 'Card not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not is_board_member(request.user.id, board_id):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    with transaction.atomic():
+        comment = Comment.objects.create(card_id=card_id, author=request.user, text=text)
+        comment = comments_with_authors().get(id=comment.id)
+        data = CommentSerializer(comment).data
+        broadcast_board_event(board_event(board_id, 'comment_added', card_id=comment.card_id, comment=data, comment_count=comment_count(card_id)))
+    return Response(data, status=status.HTTP_201_CREATED)
+
+# Edit or delete a comment, only its author can
+@api_view(['PUT', 'DELETE'])
+@authentication_classes([CachedJWTAuthentication])
+def update_comment(request, comment_id):
+    try:
+        comment = comments_with_authors().select_related('card__list').get(id=comment_id)
+    except Comment.DoesNotExist:
+        return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
+    if comment.author_id != request.user.id:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    board_id = comment.card.list.board_id
+
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            comment.delete()
+            broadcast_board_event(board_event(board_id, 'comment_deleted', card_id=comment.card_id, id=comment_id, comment_count=comment_count(comment.card_id)))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    text = (request.data.get('text') or '').strip()
+    if not text:
+        return Response({'error': 'Text is required'}, status=status.HTTP_400_BAD_REQUEST)
+    with transaction.atomic():
+        comment.text = text
+        comment.save(update_fields=['text'])
+        data = CommentSerializer(comment).data
+        broadcast_board_event(board_event(board_id, 'comment_updated', card_id=comment.card_id, comment=data))
+    return Response(data, status=status.HTTP_200_OK)
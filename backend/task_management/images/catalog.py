@@ -0,0 +1,63 @@
+import bisect
+import threading
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from images.models import Image
+from boards.serializers import ImageSerializer
+from task_management.pagination import get_page_size
+
+# The image catalog barely changes, so every process keeps it serialized in memory.
+# The shared cache holds a random token naming the current catalog: one cache lookup tells a process
+# whether its copy is still current, and invalidate() changes the token for all of them at once.
+# The token is also the ETag of the image endpoints.
+VERSION_KEY = 'images:catalog:version'
+
+class Catalog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.images = []  # serialized images, ordered by id
+        self.ids = []
+
+    def current_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # add() keeps a token another process stored in the meantime
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def get(self):
+        """Return (version, images), reloading the images if another version was published."""
+        version = self.current_version()
+        with self.lock:
+            if self.version != version:
+                self.images = ImageSerializer(Image.objects.order_by('id'), many=True).data
+                self.ids = [image['id'] for image in self.images]
+                self.version = version
+            return self.version, self.images, self.ids
+
+    def invalidate(self):
+        # Publish once the change is committed, or a process could reload the old rows under the new token
+        transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+catalog = Catalog()
+
+def catalog_etag(version):
+    return f'"images-{version}"'
+
+def catalog_page(images, ids, after=None, limit=None):
+    """
+    Return (images, next_cursor) for the page of the catalog following the image id after.
+    next_cursor is None on the last page. Raises ValueError for a malformed cursor or limit.
+    """
+    size = get_page_size(limit)
+    try:
+        start = bisect.bisect_right(ids, int(after)) if after else 0
+    except ValueError as e:
+        raise ValueError('Invalid cursor') from e
+    page = images[start:start + size]
+    if start + size >= len(images):
+        return page, None
+    return page, str(page[-1]['id'])
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='image',
+            options={'ordering': ['id']},
+        ),
+    ]
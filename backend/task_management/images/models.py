@@ -5,5 +5,9 @@ class Image(models.Model):
     owner = models.CharField(max_length=100)
     alt = models.TextField()
 
+    class Meta:
+        # Pages of the catalog are read in primary key order
+        ordering = ['id']
+
     def __str__(self):
         return str(self.url)
\ No newline at end of file
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Image
+from .catalog import catalog
+
+# create_image and changes made in the admin both publish a new catalog
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog.invalidate()
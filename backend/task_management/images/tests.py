@@ -1,3 +1,45 @@
-from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from rest_framework import status
+from authentication.models import CustomUser
+from images.models import Image
 
-# Create your tests here.
+class ImageCatalogTests(APITestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(email='user@example.com', password='password123')
+        self.token = self.client.post(reverse('login'), {'email': 'user@example.com', 'password': 'password123'}).json().get('access_token')
+        self.images = [Image.objects.create(url=f'https://example.com/{index}.jpg', owner='Owner', alt=f'Image {index}') for index in range(5)]
+        cache.clear()
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name), params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_all_images_are_paginated_by_id(self):
+        response = self.get('image-all', limit=2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [image['id'] for image in response.data['images']]
+        while response.has_header('X-Next-Cursor'):
+            response = self.get('image-all', limit=2, after=response['X-Next-Cursor'])
+            ids += [image['id'] for image in response.data['images']]
+        self.assertEqual(ids, [image.id for image in self.images])
+
+        response = self.get('image-all', after='nope')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_catalog_is_cached_until_an_image_is_created(self):
+        response = self.get('image-sample')
+        self.assertEqual(len(response.data['images']), 5)
+        self.assertIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('image-sample'), HTTP_AUTHORIZATION=f'Bearer {self.token}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('image-create'), {'url': 'https://example.com/new.jpg', 'owner': 'Owner', 'alt': 'New'}, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.get('image-all', limit=10)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['images']), 6)
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.urls import reverse
+from PIL import Image as PILImage, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Board background uploads are resized into the THUMBNAIL_SIZES boxes by a small worker pool,
+# after the request that uploaded them has been answered.
+# Derivatives are named after the SHA-256 of the original, so the same picture used by several
+# boards is resized once, a file that exists is never written again, and URLs can be cached forever.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def thumbnail_name(digest, size):
+    return f'thumbnails/{digest[:2]}/{digest}_{size}.jpg'
+
+def thumbnail_url(digest, size):
+    return reverse('image-thumbnail', kwargs={'name': f'{digest}_{size}.jpg'})
+
+def file_digest(file):
+    sha = hashlib.sha256()
+    for chunk in file.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+def render_thumbnail(original, box):
+    image = ImageOps.exif_transpose(original)
+    # Only ever shrink, and keep the aspect ratio inside the box
+    image.thumbnail(box, PILImage.LANCZOS)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=settings.THUMBNAIL_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+def generate_thumbnails(board_id, name):
+    """Write the derivatives of the board image stored as name and record their digest on the board."""
+    from boards.models import Board
+    from boards.events import bump_board_version
+
+    with default_storage.open(name, 'rb') as file:
+        digest = file_digest(file)
+        missing = {size: box for size, box in settings.THUMBNAIL_SIZES.items() if not default_storage.exists(thumbnail_name(digest, size))}
+        if missing:
+            file.seek(0)
+            with PILImage.open(file) as original:
+                original.load()
+                for size, box in missing.items():
+                    default_storage.save(thumbnail_name(digest, size), ContentFile(render_thumbnail(original, box)))
+
+    # The board may have a new image by now, its own job will record that one
+    if Board.objects.filter(id=board_id, custom_image=name).update(custom_image_hash=digest):
+        # Cached board payloads still point at the original
+        bump_board_version(board_id)
+    return digest
+
+def run_job(board_id, name):
+    # Pool threads keep their own database connections, which may have timed out between jobs
+    close_old_connections()
+    try:
+        return generate_thumbnails(board_id, name)
+    except Exception:
+        logger.exception('Could not generate thumbnails of %s for board %s', name, board_id)
+    finally:
+        close_old_connections()
+
+def schedule_thumbnails(board_id, name):
+    """Generate the derivatives in the worker pool, or right away when THUMBNAIL_WORKERS is 0."""
+    global _pool
+    if not settings.THUMBNAIL_WORKERS:
+        return run_job(board_id, name)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+    return _pool.submit(run_job, board_id, name)
+
+def board_thumbnail(board, size):
+    """URL of the best picture of board to show at size, or None if it only has a default image."""
+    if not board.custom_image:
+        return None
+    if board.custom_image_hash and size in settings.THUMBNAIL_SIZES:
+        return thumbnail_url(board.custom_image_hash, size)
+    # Not resized yet
+    return board.custom_image.url
@@ -1,13 +1,23 @@
+import re
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.jwt import CachedJWTAuthentication
 from images.models import Image
 from boards.serializers import ImageSerializer
+from images.catalog import catalog, catalog_etag, catalog_page
+from images.thumbnails import thumbnail_name
+from task_management.pagination import NEXT_CURSOR_HEADER
+
+SAMPLE_SIZE = 8
+THUMBNAIL_PATTERN = re.compile(r'^([0-9a-f]{64})_(\w+)\.jpg$')
 
 # Create image
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def create_image(request):
     # Get the data from the request
     url = request.data.get('url')
@@ -22,21 +32,49 @@ def create_image(request):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-# Get the first 8 images images
+def catalog_response(request, build):
+    # Answer from the in-memory catalog, or with a 304 if the client already has this version
+    version, images, ids = catalog.get()
+    etag = catalog_etag(version)
+    headers = {'ETag': etag, 'Cache-Control': f'private, max-age={settings.IMAGE_CATALOG_MAX_AGE}'}
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        page, next_cursor = build(images, ids)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response({'images': page}, status=status.HTTP_200_OK, headers=headers)
+
+# Get the first 8 images
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_sample_images(request):
-    # Get the first 8 images
-    images = Image.objects.all()[:8]
+    return catalog_response(request, lambda images, ids: (images[:SAMPLE_SIZE], None))
 
-    # Serialize the images
-    serializer = ImageSerializer(images, many=True)
-    return Response({'images': serializer.data}, status=status.HTTP_200_OK)
-
-# Get all images
+# Get all images, one page at a time
+# ?after=<image id>&limit=<n>, the cursor of the next page is in the X-Next-Cursor header
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_all_images(request):
-    images = Image.objects.all()
-    serializer = ImageSerializer(images, many=True)
-    return Response({'images': serializer.data}, status=status.HTTP_200_OK)
\ No newline at end of file
+    after = request.query_params.get('after')
+    limit = request.query_params.get('limit')
+    return catalog_response(request, lambda images, ids: catalog_page(images, ids, after, limit))
+
+# Serve a board image thumbnail
+# Plain Django view so <img> tags can load it: the name is the SHA-256 of the original,
+# which cannot be guessed, and a given name never changes content
+def get_thumbnail(request, name):
+    match = THUMBNAIL_PATTERN.match(name)
+    if not match or match.group(2) not in settings.THUMBNAIL_SIZES:
+        raise Http404('Thumbnail not found')
+    path = thumbnail_name(*match.groups())
+    if not default_storage.exists(path):
+        raise Http404('Thumbnail not found')
+    response = FileResponse(default_storage.open(path, 'rb'), content_type='image/jpeg')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
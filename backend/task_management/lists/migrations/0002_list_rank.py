@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0003_board_version'),
+        ('lists', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='list',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='rank',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['board', 'rank'], name='lists_list_board_i_9a9160_idx'),
+        ),
+    ]
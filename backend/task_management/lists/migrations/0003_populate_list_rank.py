@@ -0,0 +1,25 @@
+from django.db import migrations
+from task_management.ranking import evenly_spaced_ranks
+
+
+def populate_list_ranks(apps, schema_editor):
+    List = apps.get_model('lists', 'List')
+    # Clear the default (rank, id) ordering, otherwise DISTINCT returns one row per list
+    board_ids = List.objects.order_by().values_list('board_id', flat=True).distinct()
+    for board_id in board_ids:
+        # Keep the order the integer positions described
+        lists = list(List.objects.filter(board_id=board_id).order_by('position', 'id'))
+        for list_instance, rank in zip(lists, evenly_spaced_ranks(len(lists))):
+            list_instance.rank = rank
+        List.objects.bulk_update(lists, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0002_list_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_list_ranks, migrations.RunPython.noop),
+    ]
@@ -5,11 +5,18 @@ from authentication.models import CustomUser
 class List(models.Model):
     title = models.CharField(max_length=50)
     position = models.PositiveIntegerField()
+    rank = models.CharField(max_length=255, default='') # Sort key within the board, see task_management.ranking
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     board = models.ForeignKey(Board, related_name='lists', on_delete=models.CASCADE)
     created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True)
 
+    class Meta:
+        ordering = ['rank', 'id']
+        indexes = [
+            models.Index(fields=['board', 'rank']),
+        ]
+
     def __str__(self):
         return self.title
\ No newline at end of file
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from lists.models import List
+from task_management.serializers import PositionedListSerializer
 
 class ListSerializer(serializers.ModelSerializer):
     cards = serializers.SerializerMethodField()
@@ -8,7 +9,8 @@ class ListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = List
-        fields = ['id', 'title', 'position', 'description', 'created_at', 'updated_at', 'board', 'cards']
+        fields = ['id', 'title', 'position', 'rank', 'description', 'created_at', 'updated_at', 'board', 'cards']
+        list_serializer_class = PositionedListSerializer
 
     def get_cards(self, obj):
         from cards.serializers import CardSerializer
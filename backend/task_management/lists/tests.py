@@ -1,3 +1,59 @@
-from django.test import TestCase
+from django.test import TransactionTestCase
+from asgiref.sync import async_to_sync
+from task_management.testing import WebsocketCommunicator
+from task_management.ranking import evenly_spaced_ranks
+from authentication.models import CustomUser
+from workspaces.models import Workspace
+from boards.models import Board
+from lists.models import List
+from task_management.consumers import DispatcherConsumer
+from task_management.middleware import JWTAuthMiddleware
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+class ListConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='user@test.com', password='test123')
+        self.workspace = Workspace.objects.create(name='Test Workspace', owner=self.user)
+        self.board = Board.objects.create(title='Board', creator=self.user, workspace=self.workspace)
+        self.token = str(AccessToken.for_user(self.user))
+        self.other_board = Board.objects.create(title='Other Board', creator=self.user, workspace=self.workspace)
+        ranks = evenly_spaced_ranks(4)
+        self.lists = [
+            List.objects.create(title=f'List {index}', position=index, rank=rank, board=self.board)
+            for index, rank in enumerate(ranks, start=1)
+        ]
+        self.other_lists = [
+            List.objects.create(title=f'Other {index}', position=index, rank=rank, board=self.other_board)
+            for index, rank in enumerate(ranks, start=1)
+        ]
+
+    @async_to_sync
+    async def send_action(self, message):
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(DispatcherConsumer.as_asgi()), f'/ws/board/?token={self.token}')
+        await communicator.connect()
+        await communicator.send_json_to(message)
+        response = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return response
+
+    def test_list_moved_only_touches_the_moved_list(self):
+        other_ranks = dict(List.objects.filter(board=self.other_board).values_list('id', 'rank'))
+        ranks_before = dict(List.objects.filter(board=self.board).values_list('id', 'rank'))
+
+        # Positions past the end are clamped to this board's lists, not the whole table
+        response = self.send_action({'action': 'list_moved', 'listId': self.lists[0].id, 'newPosition': 99})
+        self.assertEqual(response['action'], 'list_moved')
+        self.assertEqual(response['position'], 4)
+
+        ranks_after = dict(List.objects.filter(board=self.board).values_list('id', 'rank'))
+        changed = [list_id for list_id in ranks_after if ranks_after[list_id] != ranks_before[list_id]]
+        self.assertEqual(changed, [self.lists[0].id])
+        ordered = list(List.objects.filter(board=self.board).values_list('id', flat=True))
+        self.assertEqual(ordered, [list_instance.id for list_instance in self.lists[1:] + self.lists[:1]])
+        self.assertEqual(dict(List.objects.filter(board=self.other_board).values_list('id', 'rank')), other_ranks)
+
+    def test_create_list_appends_to_board(self):
+        response = self.send_action({'action': 'create_list', 'board_id': self.board.id, 'list_name': 'New', 'user_id': self.user.id})
+        self.assertEqual(response['action'], 'list_created')
+        self.assertEqual(response['list']['position'], 5)
+        self.assertEqual(List.objects.filter(board=self.board).last().title, 'New')
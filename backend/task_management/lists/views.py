@@ -1,22 +1,15 @@
 from boards.models import Board
-from authentication.models import CustomUser
 from lists.models import List
 from lists.serializers import ListSerializer
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.core.exceptions import ObjectDoesNotExist
-from channels.db import database_sync_to_async
+from task_management.db import database_sync_to_async
 from django.db import transaction
-from django.core.serializers.json import DjangoJSONEncoder
-from django.forms.models import model_to_dict
-import datetime
-import json
-from cards.views import DateTimeEncoder
-
-class DateTimeEncoder(DjangoJSONEncoder):
-    def default(set, obj):
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        return super().default(obj)
+from boards.events import board_event
+from django.conf import settings
+from task_management.ranking import rank_between, needs_rebalance
+from task_management.ordering import place_at_position, rebalance, reorder, close_gap, shift_between
+import asyncio
 
 # Websocket consumer for handling list operations
 class ListConsumer(AsyncJsonWebsocketConsumer):
@@ -39,75 +32,57 @@ class ListConsumer(AsyncJsonWebsocketConsumer):
             await self.update_list(content)
         elif action == 'list_moved':
             await self.list_moved(content)
+        elif action == 'reorder_lists':
+            await self.reorder_lists(content)
     
-    # Include the lists in the response
-    @database_sync_to_async
-    def get_all_lists_with_cards(self, board_id):
-        lists = List.objects.filter(board_id=board_id).prefetch_related('cards')
-        all_lists_with_cards = []
-        encoder = DateTimeEncoder()
-        for list_obj in lists:
-            list_dict = model_to_dict(list_obj)  # Convert the list model to a dictionary
-            cards = list_obj.cards.all()
-            list_dict['cards'] = [json.loads(encoder.encode(model_to_dict(card))) for card in cards]
-            all_lists_with_cards.append(list_dict)
-        return all_lists_with_cards
-    
-    @database_sync_to_async
-    def get_list_instance(self, list_id):
-        return List.objects.get(id=list_id)
-
-
     # CREATE LIST
     async def create_list(self, content):
         board_id = content.get('board_id')
         list_name = content.get('list_name')
-        user_id = content.get('user_id')
 
         # Use database_sync_to_async to run the synchronous ORM code
-        list_data = await self.create_new_list(board_id, list_name, user_id)
-        if 'error' in list_data:
+        event = await self.create_new_list(board_id, list_name)
+        if 'error' in event:
             await self.dispatcher.send_json({
                 'error': 'List could not be created'
             })
         else:
-            all_lists = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'list_created',
-                'list': all_lists,
-            })
+            await self.dispatcher.send_board_event(event)
+            self.schedule_rebalance(event['board_id'], event['list']['rank'])
 
     @database_sync_to_async
-    def create_new_list(self, board_id, list_name, user_id):
+    def create_new_list(self, board_id, list_name):
+        # The socket's user, authenticated at connect time
+        error = self.dispatcher.permission_error(board_id)
+        if error:
+            return error
+        user = self.dispatcher.user
         try:
             board = Board.objects.get(id=board_id)
-            user = CustomUser.objects.get(id=user_id)
         except ObjectDoesNotExist:
-            return {'error': 'board or user not found'}
+            return {'error': 'board not found'}
 
         try:
-            position = List.objects.filter(board=board).count() + 1
-            list_instance = List.objects.create(board=board, title=list_name, position=position, created_by=user)
+            with transaction.atomic():
+                # Lock the board so concurrent inserts do not pick the same rank
+                Board.objects.select_for_update().get(id=board.id)
+                lists_in_board = List.objects.filter(board=board)
+                position = lists_in_board.count() + 1
+                last_rank = lists_in_board.order_by('-rank').values_list('rank', flat=True).first()
+                list_instance = List.objects.create(board=board, title=list_name, position=position, rank=rank_between(last_rank, None), created_by=user)
+                serializer = ListSerializer(list_instance)
+                return board_event(board.id, 'list_created', list=serializer.data)
         except Exception as e:
             return {'error': f'error creating list: {str(e)}'}
-
-        serializer = ListSerializer(list_instance)
-        return serializer.data
     
 
     # DELETE LIST
     async def handle_delete_list(self, content):
         list_id = content.get('list_id')
-        user_id = content.get('user_id')
-        board_id = content.get('board_id')
 
-        list_data = await self.delete_list(list_id, user_id)
-        if list_data and 'status' in list_data:
-            all_lists_data = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'list_deleted',
-                'list': all_lists_data,
-            })
+        list_data = await self.delete_list(list_id)
+        if list_data and 'action' in list_data:
+            await self.dispatcher.send_board_event(list_data)
         elif list_data:
             await self.dispatcher.send_json({
                 'error': list_data['error']
@@ -118,13 +93,7 @@ class ListConsumer(AsyncJsonWebsocketConsumer):
             })
 
     @database_sync_to_async
-    def delete_list(self, list_id, user_id):
-        try:
-            # Retrieve the user from the user_id
-            user = CustomUser.objects.get(id=user_id)
-        except CustomUser.DoesNotExist:
-            return {'error': 'Invalid user ID'}
-
+    def delete_list(self, list_id):
         try:
             # Retrieve the list instance
             list_instance = List.objects.get(id=list_id)
@@ -134,24 +103,19 @@ class ListConsumer(AsyncJsonWebsocketConsumer):
         try:
             # Retrieve the board instance
             board = list_instance.board
-            # Retrieve the workspace instance
-            workspace = board.workspace
 
             # Check if the user is the owner of the workspace
-            if workspace.owner != user:
-                return {'error': 'Permission denied'}
+            error = self.dispatcher.permission_error(board.id, owner=True)
+            if error:
+                return error
                 
             # If the user is authorized, delete the list
-            deleted_list_position = list_instance.position
-            list_instance.delete()
-
-            # Update the positions of the lists that come after the deleted list
-            lists_after_deleted = List.objects.filter(board=board, position__gt=deleted_list_position)
-            for list_obj in lists_after_deleted:
-                list_obj.position -= 1
-                list_obj.save()
-
-            return {'status': 'List deleted successfully'}  # Return a status message when the list is deleted successfully
+            # Ranks of the remaining lists stay valid, only dense positions need closing the gap
+            with transaction.atomic():
+                list_instance.delete()
+                if settings.BOARD_DENSE_POSITIONS:
+                    close_gap(List.objects.filter(board=board), list_instance.position)
+                return board_event(board.id, 'list_deleted', id=int(list_id))
         except Exception as e:
             return {'error': str(e)}
 
@@ -160,37 +124,28 @@ class ListConsumer(AsyncJsonWebsocketConsumer):
     async def update_list(self, content):
         updated_data = content.get('updated_data')
         list_id = content.get('list_id')
-        user_id = content.get('user_id')
-        board_id = content.get('board_id')
 
-        list_data = await self.update_new_list(updated_data, list_id, user_id)
-        if 'error' in list_data:
-            await self.dispatcher.send_json({
-                'error': list_data['error']
-            })
-        else:
-            all_lists_data = await self.get_all_lists_with_cards(board_id)
-            await self.dispatcher.send_json({
-                'action': 'list_updated',
-                'list': all_lists_data,
-            })
+        event = await self.update_new_list(updated_data, list_id)
+        await self.dispatcher.send_board_event(event)
 
     @database_sync_to_async
-    def update_new_list(self, updated_data, list_id, user_id):
+    def update_new_list(self, updated_data, list_id):
         try:
             list_instance = List.objects.get(id=list_id)
-            workspace = list_instance.board.workspace
-            user = CustomUser.objects.get(id=user_id)
 
-            if workspace.owner != user:
-                return {'error': f'Permission denied for user {user_id} on workspace {workspace.id}'}
+            # Check if the user is the owner of the workspace
+            error = self.dispatcher.permission_error(list_instance.board_id, owner=True)
+            if error:
+                return error
                 
             for field, value in updated_data.items():
                 if hasattr(list_instance, field):
                     setattr(list_instance, field, value)
 
-            list_instance.save()
-            return model_to_dict(list_instance)  # Return the updated list data
+            with transaction.atomic():
+                list_instance.save()
+                serializer = ListSerializer(list_instance)
+                return board_event(list_instance.board_id, 'list_updated', list=serializer.data)
         except List.DoesNotExist:
             return {'error': f'List with id {list_id} not found'}
         except Exception as e:
@@ -204,28 +159,12 @@ class ListConsumer(AsyncJsonWebsocketConsumer):
         new_position = content.get('newPosition')
 
         # Use database_sync_to_async to run the synchronous ORM code
-        list_data = await self.update_list_position(list_id, new_position)
-        if 'error' in list_data:
-            await self.dispatcher.send_json({
-                'error': 'List not found'
-            })
+        event = await self.update_list_position(list_id, new_position)
+        if 'error' in event:
+            await self.dispatcher.send_json(event)
         else:
-            # Fetch the list instance and get its board_id
-            list_instance = await self.get_list_instance(list_id)
-            board_id = list_instance.board_id
-
-            all_lists_data = await self.get_all_lists_with_cards(board_id)
-            if isinstance(all_lists_data, list):
-                all_lists_data_encoded = [{k: v.isoformat() if isinstance(v, datetime.datetime) else v for k, v in list_data.items()} for list_data in all_lists_data]
-
-                await self.dispatcher.send_json({
-                    'action': 'list_moved',
-                    'list': all_lists_data_encoded,
-                })
-            else:
-                await self.dispatcher.send_json({
-                    'error': 'No lists found for the given board_id'
-                })
+            await self.dispatcher.send_board_event(event)
+            self.schedule_rebalance(event['board_id'], event['rank'])
 
     @database_sync_to_async
     def update_list_position(self, list_id, new_position):
@@ -237,35 +176,76 @@ class ListConsumer(AsyncJsonWebsocketConsumer):
                 except List.DoesNotExist:
                     return {'error': 'list not found'}
 
+                error = self.dispatcher.permission_error(list_instance.board_id)
+                if error:
+                    return error
+
                 # Ensure new_position is an integer
                 new_position = int(new_position)
 
-                # Ensure new_position is within the expected range
-                max_position = List.objects.count()
+                # Lock the board so concurrent moves do not pick the same rank
+                Board.objects.select_for_update().get(id=list_instance.board_id)
+
+                # Ensure new_position is within the lists of this board
+                siblings = List.objects.filter(board_id=list_instance.board_id).exclude(id=list_instance.id)
+                max_position = siblings.count() + 1
                 new_position = max(1, min(new_position, max_position))
 
-                # If the new position is greater than the current position, increment the positions of lists in between
-                if new_position > list_instance.position:
-                    lists_in_between = List.objects.filter(position__gt=list_instance.position, position__lte=new_position)
-                    for list_item in lists_in_between:
-                        list_item.position -= 1
-                        list_item.save()
-
-                # If the new position is less than the current position, decrement the positions of lists in between
-                elif new_position < list_instance.position:
-                    lists_in_between = List.objects.filter(position__lt=list_instance.position, position__gte=new_position)
-                    for list_item in lists_in_between:
-                        list_item.position += 1
-                        list_item.save()
-
-                # Update the position of the moved list
+                if settings.BOARD_DENSE_POSITIONS:
+                    # Keep the integer positions contiguous with one UPDATE
+                    shift_between(siblings, list_instance.position, new_position)
+
+                # Only the moved list gets a new rank: its rank sorts between its new neighbours
+                list_instance.rank, respaced = place_at_position(siblings, new_position)
                 list_instance.position = new_position
-                list_instance.save()
+                list_instance.save(update_fields=['rank', 'position', 'updated_at'])
 
-            serializer = ListSerializer(list_instance)
-            return serializer.data
+                moved = dict(id=list_instance.id, position=new_position, rank=list_instance.rank)
+                if respaced:
+                    # The other lists of the board got new keys to make room
+                    moved['ranks'] = respaced
+                return board_event(list_instance.board_id, 'list_moved', **moved)
         except ObjectDoesNotExist:
             if list_instance is None:
                 return {'error': 'List not found'}
             else:
-                return {'error': 'List instance is not None but there is a problem'}
\ No newline at end of file
+                return {'error': 'List instance is not None but there is a problem'}
+
+    # Put every list of a board in the given order
+    async def reorder_lists(self, content):
+        board_id = content.get('board_id')
+        list_ids = content.get('list_ids', [])
+
+        error = await database_sync_to_async(self.dispatcher.permission_error)(board_id)
+        event = error or await database_sync_to_async(reorder_board_lists)(board_id, list_ids)
+        await self.dispatcher.send_board_event(event)
+
+    # Respace a board's lists in the background once their keys get too long
+    def schedule_rebalance(self, board_id, rank):
+        if needs_rebalance(rank):
+            asyncio.ensure_future(self.rebalance_board(board_id))
+
+    async def rebalance_board(self, board_id):
+        event = await database_sync_to_async(rebalance_list_ranks)(board_id)
+        if event:
+            await self.dispatcher.send_board_event(event)
+
+# Respace the rank keys of every list in a board, returns the board event describing the new keys
+def rebalance_list_ranks(board_id):
+    with transaction.atomic():
+        if not Board.objects.select_for_update().filter(id=board_id).exists():
+            return None
+        # Order is unchanged, clients only need the new keys
+        ranks = rebalance(List.objects.filter(board_id=board_id))
+        return board_event(board_id, 'lists_rebalanced', ranks=ranks)
+
+# Rewrite the positions and ranks of every list in a board in one statement
+def reorder_board_lists(board_id, list_ids):
+    with transaction.atomic():
+        if not Board.objects.select_for_update().filter(id=board_id).exists():
+            return {'error': 'Board not found'}
+        try:
+            ranks = reorder(List.objects.filter(board_id=board_id), list_ids)
+        except (TypeError, ValueError) as e:
+            return {'error': str(e)}
+        return board_event(board_id, 'lists_reordered', list_ids=list(ranks), ranks=ranks)
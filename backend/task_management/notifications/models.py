@@ -1,7 +1,39 @@
-from django.db import models
+from collections import Counter, defaultdict
+from django.db import models, transaction, IntegrityError
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
 from authentication.models import CustomUser
 from workspaces.models import Workspace, Invitation
 
+# Every write that changes how many unread notifications a user has goes through these
+# methods (or the signals in notifications.signals), so UnreadCounter stays in sync
+class NotificationsQuerySet(models.QuerySet):
+    def unread(self):
+        return self.filter(read=False)
+
+    def mark_read(self):
+        """Mark the notifications as read, one UPDATE per recipient, and return how many changed."""
+        total = 0
+        with transaction.atomic():
+            recipient_ids = set(self.unread().values_list('recipient_id', flat=True))
+            for recipient_id in recipient_ids:
+                # The UPDATE row count is exact even if another request marks some of them concurrently
+                updated = self.unread().filter(recipient_id=recipient_id).update(read=True)
+                UnreadCounter.add(recipient_id, -updated)
+                total += updated
+        return total
+
+class NotificationsManager(models.Manager.from_queryset(NotificationsQuerySet)):
+    def bulk_notify(self, notifications):
+        """Insert many notifications with one INSERT and one counter update per recipient."""
+        with transaction.atomic():
+            created = self.bulk_create(notifications)
+            UnreadCounter.add_many(Counter(notification.recipient_id for notification in created if not notification.read))
+        return created
+
+    def mark_all_read(self, user):
+        return self.filter(recipient=user).mark_read()
+
 class Notifications(models.Model):
     # Define choices for notification types
     NOTIFICATION_TYPES = [
@@ -17,5 +49,76 @@ class Notifications(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    objects = NotificationsManager()
+
+    class Meta:
+        indexes = [
+            # Newest-first feed, paginated by (created_at, id)
+            models.Index(fields=['recipient', '-created_at', '-id']),
+            # Unread feed and counter recounts
+            models.Index(fields=['recipient', 'read', 'created_at']),
+        ]
+
     def __str__(self):
-        return f'{self.recipient.email} - {self.notification_type}'
\ No newline at end of file
+        return f'{self.recipient.email} - {self.notification_type}'
+
+# Number of unread notifications of a user, so the badge in the header is one primary key lookup
+class UnreadCounter(models.Model):
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.count}'
+
+    @classmethod
+    def add(cls, user_id, delta, create=True):
+        if not delta:
+            return
+        updated = cls.objects.filter(user_id=user_id).update(count=Greatest(F('count') + delta, 0))
+        if not updated and create:
+            # First change for this user: start from the rows, which already include this change
+            cls.recount(user_id)
+
+    @classmethod
+    def add_many(cls, deltas):
+        """Apply {user_id: delta} with one UPDATE per distinct delta, however many users there are."""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        existing = set(cls.objects.filter(user_id__in=deltas).values_list('user_id', flat=True))
+
+        by_delta = defaultdict(list)
+        for user_id in existing:
+            by_delta[deltas[user_id]].append(user_id)
+        for delta, user_ids in by_delta.items():
+            cls.objects.filter(user_id__in=user_ids).update(count=Greatest(F('count') + delta, 0))
+
+        # Users without a counter yet start from their rows, which already include this change
+        missing = [user_id for user_id in deltas if user_id not in existing]
+        if missing:
+            counts = dict(
+                Notifications.objects.filter(recipient_id__in=missing).unread()
+                .values_list('recipient_id').annotate(count=Count('id'))
+            )
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, count=counts.get(user_id, 0)) for user_id in missing],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def recount(cls, user_id):
+        count = Notifications.objects.filter(recipient_id=user_id).unread().count()
+        try:
+            with transaction.atomic():
+                cls.objects.update_or_create(user_id=user_id, defaults={'count': count})
+        except IntegrityError:
+            # A concurrent request created the row first, it counted the same rows
+            pass
+        return count
+
+    @classmethod
+    def get_count(cls, user_id):
+        count = cls.objects.filter(user_id=user_id).values_list('count', flat=True).first()
+        if count is None:
+            return cls.recount(user_id)
+        return count
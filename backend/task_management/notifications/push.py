@@ -0,0 +1,53 @@
+import asyncio
+from collections import defaultdict
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from notifications.models import Notifications
+from notifications.serializers import NotificationsSerializer
+
+# Largest number of notifications sent back for one catch-up request
+CATCH_UP_LIMIT = 100
+
+# Channel-layer group of every socket a user has open
+def user_group_name(user_id):
+    return f'user_{user_id}'
+
+def push_notifications(notifications):
+    """
+    Push newly created notifications to their recipients' open sockets once the
+    current transaction commits. Each recipient gets one message, whatever the count.
+    """
+    by_recipient = defaultdict(list)
+    for notification in notifications:
+        by_recipient[notification.recipient_id].append(notification)
+    if not by_recipient:
+        return
+
+    messages = {
+        user_group_name(recipient_id): {
+            'type': 'notification.push',
+            'notifications': NotificationsSerializer(items, many=True).data,
+        }
+        for recipient_id, items in by_recipient.items()
+    }
+    transaction.on_commit(lambda: send_to_groups(messages))
+
+def send_to_groups(messages):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    # One event loop for every group, so batched layers only wait their window once
+    async def send_all():
+        await asyncio.gather(*[channel_layer.group_send(group, message) for group, message in messages.items()])
+    async_to_sync(send_all)()
+
+def get_missed_notifications(user_id, last_id):
+    """Notifications created after last_id, oldest first, and whether more are left."""
+    notifications = list(
+        Notifications.objects.filter(recipient_id=user_id, id__gt=last_id)
+        .select_related('workspace').order_by('id')[:CATCH_UP_LIMIT + 1]
+    )
+    has_more = len(notifications) > CATCH_UP_LIMIT
+    return NotificationsSerializer(notifications[:CATCH_UP_LIMIT], many=True).data, has_more
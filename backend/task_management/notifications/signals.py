@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Notifications, UnreadCounter
+
+# Single saves and deletes (including cascades from invitations, workspaces and users)
+# keep the unread counter in sync, bulk writes update it in NotificationsManager
+
+@receiver(post_save, sender=Notifications)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and not instance.read:
+        UnreadCounter.add(instance.recipient_id, 1)
+
+@receiver(post_delete, sender=Notifications)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.read:
+        # Never create a counter here, the recipient may be the one being deleted
+        UnreadCounter.add(instance.recipient_id, -1, create=False)
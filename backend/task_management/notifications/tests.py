@@ -1,8 +1,18 @@
 from rest_framework.test import APITestCase
+from django.test import TransactionTestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from rest_framework_simplejwt.tokens import AccessToken
+from task_management.testing import WebsocketCommunicator
+from task_management.consumers import NotificationConsumer
+from task_management.middleware import JWTAuthMiddleware
+from notifications.push import push_notifications
 from django.urls import reverse
 from rest_framework import status
 from authentication.models import CustomUser
-from notifications.models import Notifications
+from notifications.models import Notifications, UnreadCounter
 from workspaces.models import Workspace
 
 class NotificationsTests(APITestCase):
@@ -52,4 +62,118 @@ class NotificationsTests(APITestCase):
         put_response = self.client.put(reverse('notification-read'), {'notification_id': notification_id}, headers={'Authorization': f'Bearer {self.token2}'}, format='json')
         self.assertEqual(put_response.status_code, status.HTTP_200_OK)
         self.assertEqual(put_response.data['message'], 'Notification read')
-        self.assertEqual(Notifications.objects.get(id=notification_id).read, True)
\ No newline at end of file
+        self.assertEqual(Notifications.objects.get(id=notification_id).read, True)
+
+    def test_send_notification_to_whole_workspace(self):
+        workspace = Workspace.objects.create(owner=self.user1, name='Test Workspace')
+        members = [CustomUser.objects.create_user(email=f'member{index}@test.com', password='test123') for index in range(20)]
+        workspace.members.add(self.user2, *members)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('notification-send'), {'target': 'workspace', 'workspace_id': workspace.id, 'content': 'Hello team'}, headers={'Authorization': f'Bearer {self.token1}'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 15)
+        # Everybody but the sender
+        self.assertEqual(sorted(item['recipient'] for item in response.data), sorted([self.user2.id] + [member.id for member in members]))
+        self.assertEqual(UnreadCounter.objects.get(user=self.user2).count, 1)
+
+        # Outsiders cannot broadcast to the workspace
+        outsider = CustomUser.objects.create_user(email='outsider@test.com', password='test123')
+        token = self.client.post(reverse('login'), {'email': 'outsider@test.com', 'password': 'test123'}).json().get('access_token')
+        response = self.client.post(reverse('notification-send'), {'target': 'workspace', 'workspace_id': workspace.id, 'content': 'Spam'}, headers={'Authorization': f'Bearer {token}'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_send_notification_skips_unknown_recipients(self):
+        workspace = Workspace.objects.create(owner=self.user1, name='Test Workspace')
+        response = self.client.post(reverse('notification-send'), {'recipient_ids': [self.user2.id, 999999, self.user2.id], 'workspace_id': workspace.id, 'content': 'Hi'}, headers={'Authorization': f'Bearer {self.token1}'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['recipient'] for item in response.data], [self.user2.id])
+
+    def create_notifications(self, count):
+        workspace = Workspace.objects.create(owner=self.user1, name='Test Workspace')
+        return Notifications.objects.bulk_notify([
+            Notifications(recipient=self.user2, sender=self.user1, workspace=workspace, content=f'Notification {index}')
+            for index in range(count)
+        ])
+
+    def test_get_notifications_is_paginated_newest_first(self):
+        notifications = self.create_notifications(5)
+        url = reverse('notifications')
+        headers = {'Authorization': f'Bearer {self.token2}'}
+
+        first = self.client.get(url, {'limit': 2}, headers=headers)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in first.data], [notifications[4].id, notifications[3].id])
+        self.assertEqual(first.data[0]['workspace_name'], 'Test Workspace')
+
+        # Follow the cursors to the end of the feed
+        ids = [item['id'] for item in first.data]
+        cursor = first['X-Next-Cursor']
+        while cursor:
+            page = self.client.get(url, {'limit': 2, 'before': cursor}, headers=headers)
+            ids += [item['id'] for item in page.data]
+            cursor = page.headers.get('X-Next-Cursor')
+        self.assertEqual(ids, [notification.id for notification in reversed(notifications)])
+
+        bad_cursor = self.client.get(url, {'before': 'not-a-cursor'}, headers=headers)
+        self.assertEqual(bad_cursor.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unread_count_follows_reads_and_deletes(self):
+        notifications = self.create_notifications(3)
+        headers = {'Authorization': f'Bearer {self.token2}'}
+        self.assertEqual(self.client.get(reverse('notification-unread-count'), headers=headers).data['unread_count'], 3)
+
+        self.client.put(reverse('notification-read'), {'notification_id': notifications[0].id}, headers=headers, format='json')
+        notifications[1].delete()
+        self.assertEqual(UnreadCounter.objects.get(user=self.user2).count, 1)
+
+        response = self.client.put(reverse('notification-read-all'), headers=headers, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertFalse(Notifications.objects.filter(recipient=self.user2, read=False).exists())
+        self.assertEqual(self.client.get(reverse('notification-unread-count'), headers=headers).data['unread_count'], 0)
+
+class NotificationConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(email='sender@test.com', password='test123')
+        self.user = CustomUser.objects.create_user(email='user@test.com', password='test123')
+        self.workspace = Workspace.objects.create(owner=self.sender, name='Test Workspace')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def notify(self, content):
+        notification = Notifications.objects.create(recipient=self.user, sender=self.sender, workspace=self.workspace, content=content)
+        push_notifications([notification])
+        return notification
+
+    @async_to_sync
+    async def test_rejects_sockets_without_a_valid_token(self):
+        for path in ['/ws/notifications/', '/ws/notifications/?token=invalid']:
+            communicator = WebsocketCommunicator(JWTAuthMiddleware(NotificationConsumer.as_asgi()), path)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            closed = await communicator.receive_output()
+            self.assertEqual((closed['type'], closed['code']), ('websocket.close', 4401))
+
+    @async_to_sync
+    async def test_new_notifications_are_pushed(self):
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(NotificationConsumer.as_asgi()), f'/ws/notifications/?token={self.token}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        notification = await database_sync_to_async(self.notify)('Pushed')
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['action'], 'notifications')
+        self.assertEqual([item['id'] for item in message['notifications']], [notification.id])
+        await communicator.disconnect()
+
+    @async_to_sync
+    async def test_catch_up_sends_notifications_missed_while_offline(self):
+        seen = await database_sync_to_async(self.notify)('Seen')
+        missed = [await database_sync_to_async(self.notify)(f'Missed {index}') for index in range(2)]
+
+        communicator = WebsocketCommunicator(JWTAuthMiddleware(NotificationConsumer.as_asgi()), f'/ws/notifications/?token={self.token}')
+        await communicator.connect()
+        await communicator.send_json_to({'action': 'catch_up', 'last_id': seen.id})
+        message = await communicator.receive_json_from()
+        self.assertEqual([item['id'] for item in message['notifications']], [notification.id for notification in missed])
+        self.assertFalse(message['has_more'])
+        await communicator.disconnect()
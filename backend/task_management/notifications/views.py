@@ -1,23 +1,32 @@
 from rest_framework.decorators import api_view, authentication_classes
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from notifications.models import Notifications
+from authentication.jwt import CachedJWTAuthentication
+from notifications.models import Notifications, UnreadCounter
 from notifications.serializers import NotificationsSerializer
+from notifications.push import push_notifications
 from authentication.models import CustomUser
 from workspaces.models import Workspace
+from task_management.pagination import keyset_page, NEXT_CURSOR_HEADER
 
 # Send notification
+# Recipients are either listed in recipient_ids or, with "target": "workspace", every member
+# of the workspace (owner included, sender excluded). All of them are resolved in one query,
+# inserted with one bulk_create and pushed to their sockets in one batch
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def send_notification(request):
     # Get the data from the request
     recipient_ids = request.data.get('recipient_ids')
+    target = request.data.get('target')
     content = request.data.get('content')
     workspace_id = request.data.get('workspace_id')
     user = request.user
 
-    if not recipient_ids or not isinstance(recipient_ids, list):
+    if target not in (None, 'workspace'):
+        return Response({'error': 'Unknown target'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if target is None and (not recipient_ids or not isinstance(recipient_ids, list)):
         return Response({'error': 'Recipient IDs required'}, status=status.HTTP_400_BAD_REQUEST)
 
     if not workspace_id:
@@ -29,22 +38,31 @@ def send_notification(request):
     except Workspace.DoesNotExist:
         return Response({'error': 'Workspace not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    notifications = []
-    for recipient_id in recipient_ids:
+    if target == 'workspace':
+        # Only people in the workspace may broadcast to it
+        member_ids = set(workspace.members.values_list('id', flat=True))
+        member_ids.add(workspace.owner_id)
+        if user.id not in member_ids:
+            return Response({'error': 'You are not a member of this workspace'}, status=status.HTTP_403_FORBIDDEN)
+        member_ids.discard(user.id)
+        found_ids = sorted(member_ids)
+    else:
         try:
-            # Get the recipient user instance
-            recipient = CustomUser.objects.get(id=recipient_id)
-        except CustomUser.DoesNotExist:
-            continue  # Skip this recipient if not found
-
-        # Create a new notification object
-        notification = Notifications(recipient=recipient, content=content, sender=user, workspace=workspace)
-
-        # Save the notification to the database
-        notification.save()
-
-        # Add the notification to the list
-        notifications.append(notification)
+            requested_ids = list(dict.fromkeys(int(recipient_id) for recipient_id in recipient_ids))
+        except (TypeError, ValueError):
+            return Response({'error': 'Recipient IDs must be user IDs'}, status=status.HTTP_400_BAD_REQUEST)
+        # Unknown recipients are skipped
+        found = set(CustomUser.objects.filter(id__in=requested_ids).values_list('id', flat=True))
+        found_ids = [recipient_id for recipient_id in requested_ids if recipient_id in found]
+
+    # Insert every notification at once
+    notifications = Notifications.objects.bulk_notify([
+        Notifications(recipient_id=recipient_id, content=content, sender=user, workspace=workspace)
+        for recipient_id in found_ids
+    ])
+
+    # Push them to the recipients' open sockets
+    push_notifications(notifications)
 
     # Serialize the notification data
     serializer = NotificationsSerializer(notifications, many=True)
@@ -53,42 +71,56 @@ def send_notification(request):
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 # Get notifications
+# Newest first, one page at a time: ?before=<cursor>&limit=<n>, add &unread=true for unread ones only
+# The cursor of the next page is in the X-Next-Cursor header, absent on the last page
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_notifications(request):
     # Extract the user ID from the authenticated user
     user_id = request.user.id
 
+    # Query notifications for the user, with their workspace for workspace_name
+    notifications = Notifications.objects.filter(recipient_id=user_id).select_related('workspace')
+    if request.query_params.get('unread') == 'true':
+        notifications = notifications.unread()
+
     try:
-        # Query notifications for the user
-        notifications = Notifications.objects.filter(recipient_id=user_id)
+        page, next_cursor = keyset_page(notifications, request.query_params.get('before'), request.query_params.get('limit'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Serialize notifications data
-        serializer =  NotificationsSerializer(notifications, many=True)
+    # Serialize notifications data
+    serializer = NotificationsSerializer(page, many=True)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(serializer.data, status=status.HTTP_200_OK, headers=headers)
 
-        # Return serialized notifications as response
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    except Exception as e:
-        # Return an error response
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+# Number of unread notifications, served from the user's counter
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+def get_unread_count(request):
+    return Response({'unread_count': UnreadCounter.get_count(request.user.id)}, status=status.HTTP_200_OK)
     
 # Read notification
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def read_notification(request):
     # Extract the notification ID from the request
     notification_id = request.data.get('notification_id')
 
     try:
-        # Get the Notification instance
-        notification = Notifications.objects.get(id=notification_id)
-
         # Turn the notification from unread to read
-        notification.read = True
-        notification.save()
+        notifications = Notifications.objects.filter(id=notification_id)
+        if not notifications.exists():
+            return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
+        notifications.mark_read()
 
         return Response({'message': 'Notification read'}, status=status.HTTP_200_OK)
-    except Notifications.DoesNotExist:
-        return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Read every notification of the user with a single UPDATE
+@api_view(['PUT'])
+@authentication_classes([CachedJWTAuthentication])
+def read_all_notifications(request):
+    updated = Notifications.objects.mark_all_read(request.user)
+    return Response({'message': 'Notifications read', 'updated': updated}, status=status.HTTP_200_OK)
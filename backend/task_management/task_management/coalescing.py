@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from task_management import metrics
+
+logger = logging.getLogger(__name__)
+
+# Dragging a card sends move_card for every slot it passes over. The moves of a board are held
+# for a short window, and a newer move of the same card replaces the one still waiting, so only
+# the card's final position is written and broadcast. Used by DispatcherConsumer, one per board and socket.
+class MoveCoalescer:
+    def __init__(self, handler, window):
+        self.handler = handler  # async callable running one move
+        self.window = window
+        self.pending = {}  # card_id -> latest move, in the order they must be applied
+        self.timer = None
+        self.lock = asyncio.Lock()
+
+    async def submit(self, card_id, content):
+        metrics.incr('board.moves.received')
+        if self.window <= 0:
+            await self.run(content)
+            return
+        if card_id in self.pending:
+            metrics.incr('board.moves.coalesced')
+            # Move it to the end: it now comes after the moves received since the one it replaces
+            del self.pending[card_id]
+        self.pending[card_id] = content
+        if self.timer is None:
+            self.timer = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.window)
+        self.timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Run the waiting moves now, e.g. before another action that must see them applied."""
+        if self.timer is not None and self.timer is not asyncio.current_task():
+            self.timer.cancel()
+            self.timer = None
+        async with self.lock:
+            pending, self.pending = self.pending, {}
+            for content in pending.values():
+                await self.run(content)
+
+    async def run(self, content):
+        metrics.incr('board.moves.written')
+        try:
+            await self.handler(content)
+        except Exception:
+            # The timer task has no caller to report to
+            logger.exception('Could not move card %s', content.get('card_id'))
@@ -1,18 +1,236 @@
+import logging
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 from lists.views import ListConsumer
 from cards.views import CardConsumer
+from boards.events import board_group_name, get_board_version, get_board_snapshot, get_events_since
+from boards.permissions import get_board_access
+from notifications.push import user_group_name, get_missed_notifications
+from task_management.coalescing import MoveCoalescer
+from task_management.work_queue import BoardWorkQueue
+from task_management.db import database_sync_to_async, DatabaseOverloaded
 
+logger = logging.getLogger(__name__)
+
+# Close code of sockets without a valid access token, the client refreshes it before reconnecting
+# Sent after accepting: a close before accept rejects the handshake, which browsers only report as 1006
+UNAUTHORIZED = 4401
+
+LIST_ACTIONS = ('create_list', 'delete_list', 'update_list', 'list_moved', 'reorder_lists')
+CARD_ACTIONS = ('create_card', 'delete_card', 'update_card', 'reorder_cards')
+
+# Board socket at ws/board/, authenticated by JWTAuthMiddleware
 class DispatcherConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.accept()
+            await self.close(code=UNAUTHORIZED)
+            return
+        # Board groups this socket has joined
+        self.board_groups = set()
+        # What the user may do on each board it touched, resolved once per board and connection
+        self.board_permissions = {}
+        # Card moves waiting to be coalesced, per board
+        self.move_coalescers = {}
+        # Handlers are created once per socket, not once per message
+        self.lists, self.cards = ListConsumer(self), CardConsumer(self)
+        self.handlers = {action: self.lists.receive_json for action in LIST_ACTIONS}
+        self.handlers.update({action: self.cards.receive_json for action in CARD_ACTIONS})
+        self.handlers.update({
+            'move_card': self.coalesce_move,
+            'subscribe': self.subscribe,
+            'unsubscribe': self.unsubscribe,
+            'sync_board': self.sync_board,
+        })
+        self.work_queue = BoardWorkQueue(self.handle, settings.BOARD_SOCKET_QUEUE_SIZE)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'work_queue'):
+            await self.work_queue.close()
+        # Save the final position of cards dropped just before the socket closed
+        for coalescer in list(getattr(self, 'move_coalescers', {}).values()):
+            await coalescer.flush()
+        for group in getattr(self, 'board_groups', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        getattr(self, 'board_groups', set()).clear()
+
+    # Only queues the action, so a slow write never delays reading the next frames
+    # Actions are ordered per board_id; the client sends it with every action
     async def receive_json(self, content):
         action = content.get('action')
 
         if not action:
-            print("Error: No action in message")
+            logger.debug('Board socket message without an action')
+            return
+        if action not in self.handlers:
+            logger.debug('Unknown board socket action %r', action)
             return
 
-        if action in ['create_list', 'delete_list', 'update_list', 'list_moved']:
-            await ListConsumer(self).receive_json(content)
-        elif action in ['create_card', 'delete_card', 'update_card', 'move_card']:
-            await CardConsumer(self).receive_json(content)
+        board_id = content.get('board_id')
+        if not self.work_queue.submit(board_id, content):
+            await self.send_busy(content)
+
+    # The action was not applied, the client may send it again later
+    async def send_busy(self, content):
+        await self.send_json({'action': 'busy', 'rejected_action': content.get('action'), 'board_id': content.get('board_id')})
+
+    async def handle(self, content):
+        if content['action'] != 'move_card':
+            # Every other action sees the moves sent before it applied
+            await self.flush_moves(content.get('board_id'))
+        try:
+            await self.handlers[content['action']](content)
+        except DatabaseOverloaded:
+            await self.send_busy(content)
+
+    async def coalesce_move(self, content):
+        board_id = content.get('board_id')
+        coalescer = self.move_coalescers.get(board_id)
+        if coalescer is None:
+            coalescer = self.move_coalescers[board_id] = MoveCoalescer(self.run_move, settings.BOARD_MOVE_COALESCE_WINDOW)
+        await coalescer.submit(content.get('card_id'), content)
+
+    async def run_move(self, content):
+        try:
+            await self.cards.card_moved(content)
+        except DatabaseOverloaded:
+            await self.send_busy(content)
+
+    async def flush_moves(self, board_id):
+        coalescer = self.move_coalescers.get(board_id)
+        if coalescer is not None:
+            await coalescer.flush()
+
+    # Board permissions, called from the ORM code of the list/card handlers
+    # Only the first action on a board queries them, every later one is a dict lookup
+    def board_access(self, board_id):
+        board_id = int(board_id)
+        if board_id not in self.board_permissions:
+            self.board_permissions[board_id] = get_board_access(self.user.id, board_id)
+        return self.board_permissions[board_id]
+
+    def permission_error(self, board_id, owner=False):
+        """Return the error event for an action the user may not run on the board, or None."""
+        try:
+            access = self.board_access(board_id)
+        except (TypeError, ValueError):
+            return {'error': 'Board ID required'}
+        if access is None:
+            return {'error': 'Board not found'}
+        if not access['member'] or (owner and not access['owner']):
+            return {'error': 'Permission denied'}
+        return None
+
+    # Join the board group so changes made by other collaborators are pushed to this socket
+    async def subscribe(self, content):
+        board_id = content.get('board_id')
+        error = await database_sync_to_async(self.permission_error)(board_id)
+        if error:
+            await self.send_json(error)
+            return
+
+        group = board_group_name(board_id)
+        if group not in self.board_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.board_groups.add(group)
+        await self.sync_board(content)
+
+    async def unsubscribe(self, content):
+        group = board_group_name(content.get('board_id'))
+        if group in self.board_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            self.board_groups.discard(group)
+        await self.send_json({'action': 'unsubscribed', 'board_id': content.get('board_id')})
+
+    # Clients send their last known board_version on reconnect or when they notice a gap
+    # in the patches they received. When they are behind, the patches they missed are replayed
+    # from the journal, and a full snapshot is only sent when the journal cannot cover the gap
+    async def sync_board(self, content):
+        board_id = content.get('board_id')
+        client_version = content.get('board_version', content.get('since'))
+        if client_version is not None:
+            try:
+                client_version = int(client_version)
+            except (TypeError, ValueError):
+                await self.send_json({'error': 'board_version must be a board version'})
+                return
+
+        error = await database_sync_to_async(self.permission_error)(board_id)
+        if error:
+            await self.send_json(error)
+            return
+
+        version = await database_sync_to_async(get_board_version)(board_id)
+        if version is None:
+            await self.send_json({'error': 'Board not found'})
+        elif client_version == version:
+            await self.send_json({'action': 'board_in_sync', 'board_id': board_id, 'board_version': version})
+        else:
+            events = None
+            if client_version is not None:
+                events = await database_sync_to_async(get_events_since)(board_id, client_version)
+            if events:
+                await self.send_json({'action': 'board_events', 'board_id': board_id, 'board_version': events[-1]['board_version'], 'events': events})
+            else:
+                snapshot = await database_sync_to_async(get_board_snapshot)(board_id)
+                await self.send_json(snapshot)
+
+    # Errors only go back to the socket that sent the action, patches fan out once to the whole board group
+    async def send_board_event(self, event):
+        if 'error' in event:
+            await self.send_json(event)
+            return
+
+        group = board_group_name(event['board_id'])
+        if group not in self.board_groups:
+            # The sender has not subscribed, still let it see the result of its own action
+            await self.send_json(event)
+        await self.channel_layer.group_send(group, {'type': 'board.event', 'event': event})
+
+    # Handler for messages sent to a board group
+    async def board_event(self, message):
+        await self.send_json(message['event'])
+
+# Per-user socket at ws/notifications/, new notifications are pushed to it as they are created
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        # Authenticated once by JWTAuthMiddleware
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.accept()
+            await self.close(code=UNAUTHORIZED)
+            return
+        self.group = user_group_name(self.user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'group', None):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content):
+        action = content.get('action')
+        if action == 'catch_up':
+            await self.catch_up(content)
         else:
-            print(f"Error: Unknown action {action}")
\ No newline at end of file
+            await self.send_json({'error': f'Unknown action {action}'})
+
+    # On reconnect the client sends the last notification id it saw and gets everything newer
+    async def catch_up(self, content):
+        try:
+            last_id = int(content.get('last_id') or 0)
+        except (TypeError, ValueError):
+            await self.send_json({'error': 'last_id must be a notification id'})
+            return
+        try:
+            notifications, has_more = await database_sync_to_async(get_missed_notifications)(self.user.id, last_id)
+        except DatabaseOverloaded:
+            await self.send_json({'action': 'busy', 'rejected_action': 'catch_up'})
+            return
+        await self.send_json({'action': 'notifications', 'notifications': notifications, 'has_more': has_more})
+
+    # Handler for messages sent to the user group
+    async def notification_push(self, message):
+        await self.send_json({'action': 'notifications', 'notifications': message['notifications'], 'has_more': False})
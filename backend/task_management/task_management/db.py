@@ -0,0 +1,84 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from channels.db import DatabaseSyncToAsync
+from django.conf import settings
+from task_management import metrics
+
+# ORM calls of the WebSocket consumers run in their own pool of REALTIME_DB_POOL_SIZE threads.
+# Each thread holds at most one database connection, so sockets can never open more than the
+# pool size, however many messages arrive at once; the rest of the connection budget stays
+# free for HTTP requests. When calls wait longer than REALTIME_DB_SHED_WAIT seconds for a
+# thread, new ones are refused with DatabaseOverloaded instead of making the queue longer.
+
+class DatabaseOverloaded(Exception):
+    pass
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Calls submitted to the pool and not started yet, token -> time they were submitted
+_waiting = {}
+_waiting_lock = threading.Lock()
+_call_token = contextvars.ContextVar('orm_call_token')
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.REALTIME_DB_POOL_SIZE, thread_name_prefix='orm')
+        return _executor
+
+def oldest_wait():
+    """Seconds the longest waiting call has been queued, 0 when a thread is free for every call."""
+    with _waiting_lock:
+        if not _waiting:
+            return 0.0
+        return time.monotonic() - min(_waiting.values())
+
+def _enqueue(token):
+    with _waiting_lock:
+        _waiting[token] = time.monotonic()
+        metrics.gauge('orm.queue_depth', len(_waiting))
+
+def _start(token):
+    with _waiting_lock:
+        enqueued_at = _waiting.pop(token, None)
+        metrics.gauge('orm.queue_depth', len(_waiting))
+    if enqueued_at is not None:
+        metrics.incr('orm.calls')
+        metrics.incr('orm.wait_ms', round((time.monotonic() - enqueued_at) * 1000))
+
+class RealtimeDatabaseSyncToAsync(DatabaseSyncToAsync):
+    # shed=False for calls that must not fail, they still wait for a thread of the pool
+    def __init__(self, func, shed=True):
+        super().__init__(func, thread_sensitive=False, executor=get_executor())
+        self.shed = shed
+        wrapped = self.func
+
+        # Runs in the pool thread, inside the context copied from the caller
+        def timed(*args, **kwargs):
+            _start(_call_token.get(None))
+            return wrapped(*args, **kwargs)
+        self.func = timed
+
+    async def __call__(self, *args, **kwargs):
+        threshold = settings.REALTIME_DB_SHED_WAIT
+        if self.shed and threshold and oldest_wait() > threshold:
+            metrics.incr('orm.shed')
+            raise DatabaseOverloaded('The database is busy, try again')
+
+        token = object()
+        _call_token.set(token)
+        _enqueue(token)
+        try:
+            return await super().__call__(*args, **kwargs)
+        finally:
+            # Still there if the call was cancelled before a thread picked it up
+            with _waiting_lock:
+                if _waiting.pop(token, None) is not None:
+                    metrics.gauge('orm.queue_depth', len(_waiting))
+
+# Drop-in replacement for channels.db.database_sync_to_async
+database_sync_to_async = RealtimeDatabaseSyncToAsync
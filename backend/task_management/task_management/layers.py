@@ -0,0 +1,101 @@
+import asyncio
+from collections import defaultdict, deque
+from channels.layers import InMemoryChannelLayer
+
+try:
+    from channels_redis.core import RedisChannelLayer
+except ImportError:  # channels_redis is only needed when REDIS_URL is configured
+    RedisChannelLayer = None
+
+BATCH_MESSAGE_TYPE = 'layer.batch'
+
+# Buffers group_send calls and delivers everything sent to a group within batch_window
+# seconds as a single message, which receive() unpacks again on the consumer side.
+# A burst of board patches then costs one round trip to the layer per group instead of one per patch.
+class GroupSendBatchingMixin:
+    def __init__(self, *args, batch_window=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_window = batch_window
+        self.pending_batches = {}
+        self.unpacked_messages = defaultdict(deque)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+
+        # Batches are per event loop: sync code reaches the layer through short-lived
+        # async_to_sync loops, so the sender that opens a batch waits and flushes it itself
+        key = (asyncio.get_running_loop(), group)
+        batch = self.pending_batches.get(key)
+        if batch is not None:
+            batch.append(message)
+            return
+
+        batch = self.pending_batches[key] = [message]
+        # The flush runs as its own task: other senders' calls already returned once they joined
+        # the batch, so cancelling the sender that opened it must not drop their messages
+        await asyncio.shield(asyncio.ensure_future(self.flush_batch(key, group, batch)))
+
+    async def flush_batch(self, key, group, batch):
+        try:
+            await asyncio.sleep(self.batch_window)
+        finally:
+            # Whatever happens, later sends must not join a batch nobody flushes
+            self.pending_batches.pop(key, None)
+        if len(batch) == 1:
+            await super().group_send(group, batch[0])
+        else:
+            await super().group_send(group, {'type': BATCH_MESSAGE_TYPE, 'messages': batch})
+
+    async def receive(self, channel):
+        unpacked = self.unpacked_messages.get(channel)
+        if unpacked:
+            message = unpacked.popleft()
+            if not unpacked:
+                del self.unpacked_messages[channel]
+            return message
+
+        message = await super().receive(channel)
+        if message.get('type') != BATCH_MESSAGE_TYPE:
+            return message
+        first, *rest = message['messages']
+        if rest:
+            self.unpacked_messages[channel].extend(rest)
+        return first
+
+class BatchedInMemoryChannelLayer(GroupSendBatchingMixin, InMemoryChannelLayer):
+    pass
+
+if RedisChannelLayer is not None:
+    class BatchedRedisChannelLayer(GroupSendBatchingMixin, RedisChannelLayer):
+        pass
+
+# In-process stand-in for a Redis server: every LocalChannelLayer created with the same
+# server name shares channels and groups, the way separate worker processes share Redis.
+# Lets multi-worker fan-out be tested on a single box without running Redis.
+class LocalChannelServer:
+    servers = {}
+
+    def __init__(self):
+        self.channels = {}
+        self.groups = {}
+
+    @classmethod
+    def get(cls, name):
+        if name not in cls.servers:
+            cls.servers[name] = cls()
+        return cls.servers[name]
+
+class LocalChannelLayer(BatchedInMemoryChannelLayer):
+    def __init__(self, server='default', **kwargs):
+        super().__init__(**kwargs)
+        self.server = LocalChannelServer.get(server)
+        self.channels = self.server.channels
+        self.groups = self.server.groups
+
+    async def flush(self):
+        # Clear in place so the other layers attached to the server see it too
+        self.channels.clear()
+        self.groups.clear()
+        self.pending_batches.clear()
+        self.unpacked_messages.clear()
@@ -0,0 +1,25 @@
+import threading
+from collections import Counter
+
+# Process-local counters for caches and queues (hits, misses, drops, ...) and gauges (queue lengths)
+# Every worker process keeps its own numbers, read them with snapshot() or GET api/metrics
+_counters = Counter()
+_lock = threading.Lock()
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+def gauge(name, value):
+    """Set a counter that measures a current level (e.g. a queue length) rather than a total."""
+    with _lock:
+        _counters[name] = value
+
+def snapshot(prefix=''):
+    """Return the current counters whose name starts with prefix."""
+    with _lock:
+        return {name: value for name, value in sorted(_counters.items()) if name.startswith(prefix)}
+
+def reset():
+    with _lock:
+        _counters.clear()
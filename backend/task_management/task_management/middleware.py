@@ -0,0 +1,26 @@
+from urllib.parse import parse_qs
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from authentication.jwt import CachedJWTAuthentication
+from task_management.db import database_sync_to_async
+
+# Resolve the user of a socket from the access token in its query string (?token=<access token>)
+# Browsers cannot set an Authorization header on WebSocket connections
+def get_socket_user(scope):
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return AnonymousUser()
+    authentication = CachedJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+# Authenticates WebSocket connections once, at connect time, and puts the user in scope['user']
+# Consumers then never look the user up again for the lifetime of the socket
+# Never shed: a refused handshake only makes the client reconnect and try again at once
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, user=await database_sync_to_async(get_socket_user, shed=False)(scope))
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,84 @@
+from django.db.models import Case, CharField, F, PositiveIntegerField, Value, When
+from task_management.ranking import rank_between, evenly_spaced_ranks
+
+# Set-based ordering operations shared by cards and lists
+# Every function here issues a fixed number of statements, whatever the size of the container
+
+def shift_positions(queryset, delta):
+    """Move every item of the queryset by delta positions with a single UPDATE."""
+    return queryset.update(position=F('position') + delta)
+
+def close_gap(queryset, position):
+    """Pull back the items after a removed position."""
+    return shift_positions(queryset.filter(position__gt=position), -1)
+
+def open_gap(queryset, position):
+    """Push back the items at and after a position to make room for an insert."""
+    return shift_positions(queryset.filter(position__gte=position), 1)
+
+def shift_between(queryset, old_position, new_position):
+    """Make room for an item moving from old_position to new_position inside the same container."""
+    if new_position > old_position:
+        return shift_positions(queryset.filter(position__gt=old_position, position__lte=new_position), -1)
+    if new_position < old_position:
+        return shift_positions(queryset.filter(position__gte=new_position, position__lt=old_position), 1)
+    return 0
+
+def rank_for_position(siblings, position):
+    """
+    Return the rank that puts an item at the 1-based position among siblings
+    (the other items of the target container), reading at most two neighbour keys.
+    """
+    return place_at_position(siblings, position)[0]
+
+def place_at_position(siblings, position):
+    """
+    rank_for_position(), also returning the new ranks of the siblings ({id: rank}) when
+    they had to be respaced to make room, or None. Clients sort by rank, so a move
+    that respaced its siblings must send them along.
+    """
+    ranks = siblings.order_by('rank').values_list('rank', flat=True)
+    if position <= 1:
+        before, after = None, ranks.first()
+    else:
+        window = list(ranks[position - 2:position])
+        if not window:
+            # Past the end of the container
+            before, after = siblings.order_by('-rank').values_list('rank', flat=True).first(), None
+        else:
+            before, after = window[0], (window[1] if len(window) > 1 else None)
+
+    try:
+        return rank_between(before, after), None
+    except ValueError:
+        # Two siblings share a key (e.g. concurrent inserts into the same gap), respace and retry
+        respaced = rebalance(siblings)
+        return rank_for_position(siblings, position), respaced
+
+def reorder(queryset, ids):
+    """
+    Put the items of one container in the order of ids, rewriting positions and
+    rank keys in a single UPDATE. ids must list every item of the container.
+    Returns the new rank of each id.
+    """
+    ids = [int(item_id) for item_id in ids]
+    if len(set(ids)) != len(ids) or set(queryset.values_list('id', flat=True)) != set(ids):
+        raise ValueError('Reorder must list every item of the container exactly once')
+
+    ranks = dict(zip(ids, evenly_spaced_ranks(len(ids))))
+    if ids:
+        queryset.filter(id__in=ids).update(
+            position=Case(
+                *[When(id=item_id, then=Value(position)) for position, item_id in enumerate(ids, start=1)],
+                output_field=PositiveIntegerField(),
+            ),
+            rank=Case(
+                *[When(id=item_id, then=Value(rank)) for item_id, rank in ranks.items()],
+                output_field=CharField(),
+            ),
+        )
+    return ranks
+
+def rebalance(queryset):
+    """Respace the rank keys of one container without changing its order, returns the new ranks."""
+    return reorder(queryset, queryset.order_by('rank', 'id').values_list('id', flat=True))
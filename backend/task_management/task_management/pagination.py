@@ -0,0 +1,51 @@
+import base64
+from datetime import datetime
+from django.db.models import Q
+
+# Keyset ("seek") pagination for newest-first feeds
+# A page is read with WHERE (created_at, id) < cursor ORDER BY created_at DESC, id DESC LIMIT n,
+# so it costs the same on page 100 as on page 1 and rows inserted meanwhile never shift it.
+# The cursor of the next page is sent in the X-Next-Cursor header so response bodies stay plain lists.
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+def encode_cursor(created_at, pk):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+
+def decode_cursor(cursor):
+    """Return (created_at, pk) for a cursor, raises ValueError if it is malformed."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError as e:
+        # Covers bad base64, bad UTF-8, a missing separator and bad values
+        raise ValueError('Invalid cursor') from e
+
+def get_page_size(value):
+    """Parse the limit query parameter, raises ValueError if it is not a positive number."""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    size = int(value)
+    if size < 1:
+        raise ValueError('limit must be positive')
+    return min(size, MAX_PAGE_SIZE)
+
+def keyset_page(queryset, before=None, limit=None):
+    """
+    Return (items, next_cursor) for the page of queryset ending just before the cursor,
+    newest first. next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor or limit.
+    """
+    size = get_page_size(limit)
+    queryset = queryset.order_by('-created_at', '-id')
+    if before:
+        created_at, pk = decode_cursor(before)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # Fetch one extra row to know whether there is a next page
+    items = list(queryset[:size + 1])
+    if len(items) <= size:
+        return items, None
+    items = items[:size]
+    return items, encode_cursor(items[-1].created_at, items[-1].id)
@@ -0,0 +1,77 @@
+from django.conf import settings
+
+# Rank keys are base-36 fractions ("0.<key>") compared as plain strings, so an item can be
+# moved between two neighbours by writing a single key that sorts between theirs.
+# Only digits and lowercase letters are used so every database collation orders them the same way.
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+def rank_between(before, after):
+    """
+    Return a key that sorts strictly between before and after.
+    None means the start (for before) or the end (for after) of the container.
+    """
+    before = before or ''
+    if after is not None and before >= after:
+        raise ValueError(f'Cannot rank between {before!r} and {after!r}')
+    # Appending and prepending step by one digit instead of halving the remaining space,
+    # otherwise a list built by adding cards at the end grows its keys every few cards
+    if after is None and before:
+        return _increment(before)
+    if not before and after is not None:
+        return _decrement(after)
+    return _midpoint(before, after)
+
+def _increment(key):
+    # Bump the last digit that is not already the highest one, e.g. 'az' -> 'b', 'zz' -> 'zz1'
+    stripped = key.rstrip(DIGITS[-1])
+    if stripped:
+        return stripped[:-1] + DIGITS[DIGITS.index(stripped[-1]) + 1]
+    return key + DIGITS[1]
+
+def _decrement(key):
+    # Mirror of _increment, e.g. 'b' -> 'a', 'a1' -> 'a', '1' -> '0z'
+    digit = DIGITS.index(key[-1])
+    if digit > 1:
+        return key[:-1] + DIGITS[digit - 1]
+    if key[:-1] and key[-2] != DIGITS[0]:
+        return key[:-1]
+    return key[:-1] + DIGITS[0] + DIGITS[-1]
+
+def _midpoint(before, after):
+    # Keys never end with '0', so there is always room to insert before any key
+    if after is not None:
+        # Keep the common prefix and find a midpoint in the remaining digits
+        n = 0
+        while n < len(after) and (before[n] if n < len(before) else '0') == after[n]:
+            n += 1
+        if n > 0:
+            return after[:n] + _midpoint(before[n:], after[n:])
+
+    digit_before = DIGITS.index(before[0]) if before else 0
+    digit_after = DIGITS.index(after[0]) if after is not None else BASE
+    if digit_after - digit_before > 1:
+        return DIGITS[(digit_before + digit_after + 1) // 2]
+
+    # Consecutive digits: extend the key by one digit
+    if after is not None and len(after) > 1:
+        return after[0]
+    return DIGITS[digit_before] + _midpoint(before[1:], None)
+
+def evenly_spaced_ranks(count):
+    """Return count short, increasing keys spread over the whole key space."""
+    width = 1
+    while BASE ** width <= count * 2:
+        width += 1
+    ranks = []
+    for index in range(1, count + 1):
+        value = index * BASE ** width // (count + 1)
+        digits = ''
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits = DIGITS[digit] + digits
+        ranks.append(digits.rstrip('0'))
+    return ranks
+
+def needs_rebalance(rank):
+    return len(rank) > settings.RANK_REBALANCE_LENGTH
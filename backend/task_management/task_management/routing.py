@@ -1,13 +1,16 @@
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.urls import path
-from task_management.consumers import DispatcherConsumer
+from task_management.consumers import DispatcherConsumer, NotificationConsumer
+from task_management.middleware import JWTAuthMiddleware
 
 websocket_urlpatterns = [
     path('ws/board/', DispatcherConsumer.as_asgi()),
+    path('ws/notifications/', NotificationConsumer.as_asgi()),
 ]
 
 application = ProtocolTypeRouter({
-    'websocket': URLRouter(
+    # Sockets authenticate once, with ?token=<access token>
+    'websocket': JWTAuthMiddleware(URLRouter(
         websocket_urlpatterns
-    ),
+    )),
 })
\ No newline at end of file
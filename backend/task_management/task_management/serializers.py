@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+# Lists and cards are ordered by rank keys and their stored positions are only a hint,
+# so serialize the actual 1-based index as the position
+class PositionedListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        representation = super().to_representation(data)
+        for position, item in enumerate(representation, start=1):
+            item['position'] = position
+        return representation
@@ -77,6 +77,12 @@ CORS_ALLOW_HEADERS = [
     'Authorization', 
     'Content-Type',
     'x-csrftoken',
+    'If-None-Match',
+]
+# Lets the frontend read the board version it already has and the next page cursor of feeds
+CORS_EXPOSE_HEADERS = [
+    'ETag',
+    'X-Next-Cursor',
 ]
 CORS_ALLOWED_ORIGINS = [
     'https://www.taskrize.com',
@@ -116,14 +122,103 @@ INSTALLED_APPS = [
 
 ASGI_APPLICATION = 'task_management.asgi.application'
 
-CHANNEL_LAYERS = {
-'default': {
-'BACKEND': 'channels.layers.InMemoryChannelLayer',
-# 'CONFIG': {
-# 'hosts': [('127.0.0.1', 6379)],
-# }
-}
-}
+# Channel layer
+# With REDIS_URL set (Heroku Redis add-on) every uvicorn worker and dyno shares groups through Redis.
+# Without it the layer lives in a single process, so only run one worker.
+# CHANNEL_LAYER_BACKEND=local uses the in-process fake Redis server to exercise several workers in one process.
+REDIS_URL = os.getenv('REDIS_TLS_URL') or os.getenv('REDIS_URL')
+CHANNEL_LAYER_BACKEND = os.getenv('CHANNEL_LAYER_BACKEND', 'redis' if REDIS_URL else 'memory')
+# Group sends made within this many seconds are delivered to a group as one message
+CHANNEL_LAYER_BATCH_WINDOW = float(os.getenv('CHANNEL_LAYER_BATCH_WINDOW', '0.005'))
+
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'task_management.layers.BatchedRedisChannelLayer',
+            'CONFIG': {
+                # Heroku Redis uses self-signed certificates on its TLS endpoint
+                'hosts': [{'address': REDIS_URL, 'ssl_cert_reqs': None} if REDIS_URL.startswith('rediss://') else REDIS_URL],
+                'capacity': int(os.getenv('CHANNEL_LAYER_CAPACITY', '1500')),
+                'expiry': 10,
+                'group_expiry': 86400,
+                'batch_window': CHANNEL_LAYER_BATCH_WINDOW,
+            },
+        }
+    }
+elif CHANNEL_LAYER_BACKEND == 'local':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'task_management.layers.LocalChannelLayer',
+            'CONFIG': {
+                'server': os.getenv('CHANNEL_LAYER_SERVER', 'default'),
+                'batch_window': CHANNEL_LAYER_BATCH_WINDOW,
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'task_management.layers.BatchedInMemoryChannelLayer',
+            'CONFIG': {
+                'batch_window': CHANNEL_LAYER_BATCH_WINDOW,
+            },
+        }
+    }
+
+# Cache
+# Shared through Redis when REDIS_URL is set, otherwise per process (same single-worker caveat as the channel layer)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'ssl_cert_reqs': None} if REDIS_URL.startswith('rediss://') else {},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Seconds a board version and its serialized payload stay cached
+BOARD_CACHE_TIMEOUT = int(os.getenv('BOARD_CACHE_TIMEOUT', '3600'))
+
+# Seconds card moves wait on the socket so a newer move of the same card can replace them, 0 writes every move
+BOARD_MOVE_COALESCE_WINDOW = float(os.getenv('BOARD_MOVE_COALESCE_WINDOW', '0.05'))
+
+# Actions a board socket may have waiting or running at once, further ones are answered with 'busy'
+BOARD_SOCKET_QUEUE_SIZE = int(os.getenv('BOARD_SOCKET_QUEUE_SIZE', '64'))
+
+# Board event journal (boards.models.BoardEvent)
+# A client further behind than BOARD_REPLAY_LIMIT versions gets a snapshot instead of a replay
+BOARD_REPLAY_LIMIT = int(os.getenv('BOARD_REPLAY_LIMIT', '200'))
+# Versions and days of history kept per board by the compact_board_journal command
+BOARD_JOURNAL_LENGTH = int(os.getenv('BOARD_JOURNAL_LENGTH', '1000'))
+BOARD_JOURNAL_MAX_AGE_DAYS = int(os.getenv('BOARD_JOURNAL_MAX_AGE_DAYS', '7'))
+
+# Authentication
+# Users resolved from access tokens are cached for this many seconds, in an LRU of this many users per process
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+
+# Seconds browsers may reuse the image catalog before revalidating it with its ETag
+IMAGE_CATALOG_MAX_AGE = int(os.getenv('IMAGE_CATALOG_MAX_AGE', '86400'))
+
+# Profile search
+# Results returned by api/user/profiles/ when the client does not ask for a limit, and the most it may ask for
+PROFILE_SEARCH_LIMIT = int(os.getenv('PROFILE_SEARCH_LIMIT', '20'))
+PROFILE_SEARCH_MAX_LIMIT = int(os.getenv('PROFILE_SEARCH_MAX_LIMIT', '50'))
+# Candidates kept per user for the next keystroke of the same search, broader queries are not cached
+PROFILE_SEARCH_CACHE_ROWS = int(os.getenv('PROFILE_SEARCH_CACHE_ROWS', '200'))
+PROFILE_SEARCH_CACHE_TTL = int(os.getenv('PROFILE_SEARCH_CACHE_TTL', '60'))
+
+# Board ordering
+# Lists whose rank keys grow longer than this are respaced in the background
+RANK_REBALANCE_LENGTH = int(os.getenv('RANK_REBALANCE_LENGTH', '32'))
+# Keep the integer position column contiguous on moves and deletes (set-based shifts, one UPDATE each)
+# Off by default: ordering comes from the rank keys and positions are only a hint for clients
+BOARD_DENSE_POSITIONS = os.getenv('BOARD_DENSE_POSITIONS', 'false').lower() == 'true'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -142,7 +237,7 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.jwt.CachedJWTAuthentication',
     )
 }
 
@@ -174,6 +269,17 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ['DATABASE_URL'])
 }
 
+# Database connections one worker process may open, shared by HTTP requests and sockets
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', '10'))
+# Threads (and so connections) running the ORM calls of WebSocket consumers, half the budget by default
+# SQLite allows a single writer, more threads would only wait on its lock
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    REALTIME_DB_POOL_SIZE = 1
+else:
+    REALTIME_DB_POOL_SIZE = int(os.getenv('REALTIME_DB_POOL_SIZE', max(1, DB_CONNECTION_BUDGET // 2)))
+# Seconds a socket ORM call may wait for a thread before new ones are refused with 'busy', 0 never refuses
+REALTIME_DB_SHED_WAIT = float(os.getenv('REALTIME_DB_SHED_WAIT', '2'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -218,6 +324,31 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Uploaded files (attachments)
+# Not served as static files: downloads go through the attachment views, which check board access
+MEDIA_URL = 'media/'
+
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Largest attachment accepted, in bytes
+ATTACHMENT_MAX_UPLOAD_SIZE = int(os.getenv('ATTACHMENT_MAX_UPLOAD_SIZE', str(25 * 1024 * 1024)))
+# Largest chunk accepted by one upload request, clients send files in chunks of this size
+ATTACHMENT_CHUNK_SIZE = int(os.getenv('ATTACHMENT_CHUNK_SIZE', str(5 * 1024 * 1024)))
+# Local directory for unfinished uploads
+ATTACHMENT_UPLOAD_DIR = os.getenv('ATTACHMENT_UPLOAD_DIR', os.path.join(MEDIA_ROOT, 'uploads'))
+# Hours an upload may go without a chunk before the discard_stale_uploads command deletes it
+ATTACHMENT_UPLOAD_EXPIRY_HOURS = int(os.getenv('ATTACHMENT_UPLOAD_EXPIRY_HOURS', '24'))
+
+# Board image thumbnails, name -> bounding box in pixels, see images.thumbnails
+THUMBNAIL_SIZES = {
+    'small': (400, 225),
+    'large': (1920, 1080),
+}
+THUMBNAIL_DEFAULT_SIZE = 'small'
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '82'))
+# Threads resizing uploads in the background, 0 resizes during the request
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -0,0 +1,36 @@
+import json
+from urllib.parse import urlparse
+from asgiref.testing import ApplicationCommunicator
+
+# Minimal WebSocket test client
+# channels.testing pulls in daphne for its live server, which the project does not install
+class WebsocketCommunicator(ApplicationCommunicator):
+    def __init__(self, application, path, headers=None):
+        parsed = urlparse(path)
+        scope = {
+            'type': 'websocket',
+            'path': parsed.path,
+            'query_string': parsed.query.encode('utf-8'),
+            'headers': headers or [],
+            'subprotocols': [],
+        }
+        super().__init__(application, scope)
+
+    async def connect(self, timeout=1):
+        await self.send_input({'type': 'websocket.connect'})
+        response = await self.receive_output(timeout)
+        if response['type'] == 'websocket.close':
+            return False, response.get('code', 1000)
+        return True, response.get('subprotocol')
+
+    async def send_json_to(self, data):
+        await self.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def receive_json_from(self, timeout=1):
+        response = await self.receive_output(timeout)
+        assert response['type'] == 'websocket.send', f"Expected 'websocket.send', got '{response['type']}'"
+        return json.loads(response['text'])
+
+    async def disconnect(self, code=1000, timeout=1):
+        await self.send_input({'type': 'websocket.disconnect', 'code': code})
+        await self.wait(timeout)
@@ -0,0 +1,88 @@
+import asyncio
+from django.test import SimpleTestCase
+from task_management.layers import LocalChannelLayer, LocalChannelServer, BATCH_MESSAGE_TYPE
+from task_management.ranking import rank_between, evenly_spaced_ranks
+
+class LocalChannelLayerTests(SimpleTestCase):
+    def tearDown(self):
+        LocalChannelServer.servers.pop('test', None)
+
+    async def test_group_send_reaches_channels_of_other_workers(self):
+        # Two layers on the same server behave like two worker processes sharing Redis
+        worker_a = LocalChannelLayer(server='test')
+        worker_b = LocalChannelLayer(server='test')
+        channel = await worker_b.new_channel()
+        await worker_b.group_add('board_1', channel)
+
+        await worker_a.group_send('board_1', {'type': 'board.event', 'event': 1})
+        await worker_a.group_send('board_1', {'type': 'board.event', 'event': 2})
+
+        first = await worker_b.receive(channel)
+        second = await worker_b.receive(channel)
+        self.assertEqual([first['event'], second['event']], [1, 2])
+
+    async def test_group_sends_are_batched(self):
+        layer = LocalChannelLayer(server='test', batch_window=0.01)
+        channel = await layer.new_channel()
+        await layer.group_add('board_1', channel)
+        await asyncio.gather(*[
+            layer.group_send('board_1', {'type': 'board.event', 'event': event}) for event in range(3)
+        ])
+
+        # The three sends travel as a single layer message
+        self.assertEqual(layer.channels[channel].qsize(), 1)
+        _, raw = layer.channels[channel]._queue[0]
+        self.assertEqual(raw['type'], BATCH_MESSAGE_TYPE)
+        received = [await layer.receive(channel) for _ in range(3)]
+        self.assertEqual([message['event'] for message in received], [0, 1, 2])
+
+    async def test_cancelling_the_first_sender_still_flushes_the_batch(self):
+        layer = LocalChannelLayer(server='test', batch_window=0.05)
+        channel = await layer.new_channel()
+        await layer.group_add('board_1', channel)
+        leader = asyncio.ensure_future(layer.group_send('board_1', {'type': 'board.event', 'event': 0}))
+        await asyncio.sleep(0)
+        # Joins the open batch and returns at once, as if delivered
+        await layer.group_send('board_1', {'type': 'board.event', 'event': 1})
+        leader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+        received = [await asyncio.wait_for(layer.receive(channel), timeout=1) for _ in range(2)]
+        self.assertEqual([message['event'] for message in received], [0, 1])
+        self.assertEqual(layer.pending_batches, {})
+
+        # The next send opens a new batch
+        await layer.group_send('board_1', {'type': 'board.event', 'event': 2})
+        message = await asyncio.wait_for(layer.receive(channel), timeout=1)
+        self.assertEqual(message['event'], 2)
+
+class RankingTests(SimpleTestCase):
+    def test_rank_between_keeps_order(self):
+        ranks = []
+        # Insert at the front, the back and in the middle repeatedly
+        for index in range(300):
+            position = (0, len(ranks), len(ranks) // 2)[index % 3]
+            before = ranks[position - 1] if position > 0 else None
+            after = ranks[position] if position < len(ranks) else None
+            rank = rank_between(before, after)
+            self.assertFalse(rank.endswith('0'))
+            ranks.insert(position, rank)
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual(len(set(ranks)), len(ranks))
+
+    def test_appending_grows_keys_slowly(self):
+        rank = None
+        for _ in range(500):
+            rank = rank_between(rank, None)
+        self.assertLessEqual(len(rank), 16)
+
+    def test_rank_between_rejects_unordered_neighbours(self):
+        with self.assertRaises(ValueError):
+            rank_between('b', 'a')
+
+    def test_evenly_spaced_ranks(self):
+        ranks = evenly_spaced_ranks(1000)
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual(len(set(ranks)), 1000)
+        self.assertTrue(all(len(rank) <= 3 for rank in ranks))
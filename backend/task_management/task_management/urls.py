@@ -19,11 +19,14 @@ from django.urls import path, re_path
 from authentication.views import register_user, login_user, logout_user, reset_password_request, reset_password_confirm, get_profile, update_profile, delete_account, update_user_email, update_user_password, search_profiles
 from django.views.generic import RedirectView
 from workspaces.views import create_workspace, get_workspaces, update_workspace, delete_workspace, get_workspace_boards, invite_members, accept_invitation, reject_invitation, leave_workspace
-from boards.views import get_boards, create_board, update_board, toggle_favorite_board, delete_board, get_board_and_lists
+from boards.views import get_boards, create_board, update_board, toggle_favorite_board, delete_board, get_board_and_lists, get_board_events
 # from lists.views import create_list, update_list, delete_list
 # from cards.views import create_card
-from notifications.views import send_notification, get_notifications, read_notification
-from images.views import create_image, get_sample_images, get_all_images
+from notifications.views import send_notification, get_notifications, get_unread_count, read_notification, read_all_notifications
+from task_management.views import get_metrics
+from attachments.views import create_upload, upload_chunk, get_card_attachments, download_attachment, delete_attachment
+from comments.views import get_comments, create_comment, update_comment
+from images.views import create_image, get_sample_images, get_all_images, get_thumbnail
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 
 urlpatterns = [
@@ -59,6 +62,7 @@ urlpatterns = [
     # Boards
     path('api/boards/', get_boards, name='board-list'),
     path('api/boards/<int:board_id>', get_board_and_lists, name='board-get'),
+    path('api/boards/<int:board_id>/events', get_board_events, name='board-events'),
     path('api/boards/create', create_board, name='board-create'),
     path('api/boards/update', update_board, name='board-update'),
     path('api/boards/toggle-favorite', toggle_favorite_board, name='toggle-favorite-board'),
@@ -73,8 +77,23 @@ urlpatterns = [
     path('api/notifications', get_notifications, name='notifications'),
     path('api/notifications/send', send_notification, name='notification-send'),
     path('api/notifications/read', read_notification, name='notification-read'),
+    path('api/notifications/read-all', read_all_notifications, name='notification-read-all'),
+    path('api/notifications/unread-count', get_unread_count, name='notification-unread-count'),
+    # Attachments
+    path('api/attachments/uploads', create_upload, name='attachment-upload-create'),
+    path('api/attachments/uploads/<uuid:upload_id>', upload_chunk, name='attachment-upload'),
+    path('api/attachments/<int:attachment_id>', download_attachment, name='attachment-download'),
+    path('api/attachments/<int:attachment_id>/delete', delete_attachment, name='attachment-delete'),
+    path('api/cards/<int:card_id>/attachments', get_card_attachments, name='card-attachments'),
+    # Comments
+    path('api/cards/<int:card_id>/comments', get_comments, name='card-comments'),
+    path('api/comments/create', create_comment, name='comment-create'),
+    path('api/comments/<int:comment_id>', update_comment, name='comment-update'),
     # Images
     path('api/images/create', create_image, name='image-create'),
     path('api/images/sample', get_sample_images, name='image-sample'),
     path('api/images/all', get_all_images, name='image-all'),
+    path('api/images/thumbnails/<str:name>', get_thumbnail, name='image-thumbnail'),
+    # Metrics
+    path('api/metrics', get_metrics, name='metrics'),
 ]
\ No newline at end of file
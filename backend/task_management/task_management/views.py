@@ -0,0 +1,13 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAdminUser
+from authentication.jwt import CachedJWTAuthentication
+from task_management import metrics
+
+# Counters of this worker process, staff only
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAdminUser])
+def get_metrics(request):
+    return Response(metrics.snapshot(request.query_params.get('prefix', '')), status=status.HTTP_200_OK)
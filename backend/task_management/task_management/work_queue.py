@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from task_management import metrics
+
+logger = logging.getLogger(__name__)
+
+# Work queue of one board socket
+# Actions are queued per board and each board has its own worker task, so actions on a board
+# run in the order they were received while a slow write on one board does not hold up the others.
+# At most max_size actions may be waiting or running at once; submit() refuses the rest so the
+# socket can tell the client it is busy instead of buffering without limit.
+class BoardWorkQueue:
+    def __init__(self, handler, max_size):
+        self.handler = handler  # async callable running one action
+        self.max_size = max_size
+        self.queues = {}  # board_id -> asyncio.Queue
+        self.workers = {}  # board_id -> worker task
+        self.size = 0
+
+    def submit(self, board_id, content):
+        """Queue an action of a board, returns False if the queue is full."""
+        if self.size >= self.max_size:
+            metrics.incr('board.socket.busy')
+            return False
+        self.size += 1
+        if board_id not in self.queues:
+            self.queues[board_id] = asyncio.Queue()
+            self.workers[board_id] = asyncio.ensure_future(self.work(self.queues[board_id]))
+        self.queues[board_id].put_nowait(content)
+        return True
+
+    async def work(self, queue):
+        while True:
+            content = await queue.get()
+            try:
+                await self.handler(content)
+            except Exception:
+                # Keep serving the board, the client only misses the answer to this action
+                logger.exception('Board socket action %s failed', content.get('action'))
+            finally:
+                self.size -= 1
+                queue.task_done()
+
+    async def close(self):
+        """Finish the queued actions, then stop the workers."""
+        for queue in list(self.queues.values()):
+            await queue.join()
+        for worker in self.workers.values():
+            worker.cancel()
+        self.queues.clear()
+        self.workers.clear()
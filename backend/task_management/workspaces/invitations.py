@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from workspaces.models import Workspace, Invitation
+from notifications.models import Notifications
+from notifications.push import push_notifications
+
+# Per-recipient outcomes of invite_to_workspace
+INVITED = 'invited'
+ALREADY_INVITED = 'already_invited'
+ALREADY_MEMBER = 'already_member'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+def invitation_content(profile, workspace):
+    # "Name (nickname)", "Name" or the email, depending on what the sender filled in
+    if profile.name:
+        sender_name = f'{profile.name} ({profile.nickname})' if profile.nickname else profile.name
+    else:
+        sender_name = profile.email
+    return f'{sender_name} has invited you to their workspace {workspace.name}.'
+
+def invite_to_workspace(sender, profile, workspace, user_ids):
+    """
+    Invite users to a workspace with a fixed number of queries, whatever the number of users:
+    recipients, members and pending invitations are each resolved in one query, then the
+    invitations and their notifications are inserted with one bulk_create each.
+    Returns one {'user_id', 'status'} result per requested id, in request order.
+    """
+    results = []
+    requested = []
+    for user_id in user_ids:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            results.append({'user_id': user_id, 'status': INVALID})
+            continue
+        if user_id not in requested:
+            requested.append(user_id)
+
+    with transaction.atomic():
+        # Lock the workspace so concurrent requests cannot invite the same user twice
+        Workspace.objects.select_for_update().filter(id=workspace.id).exists()
+
+        existing = set(get_user_model().objects.filter(id__in=requested).values_list('id', flat=True))
+        members = set(workspace.members.filter(id__in=requested).values_list('id', flat=True))
+        members.add(workspace.owner_id)
+        pending = set(
+            Invitation.objects.filter(workspace=workspace, recipient_id__in=requested, status='pending')
+            .values_list('recipient_id', flat=True)
+        )
+
+        invitations = []
+        for user_id in requested:
+            if user_id not in existing:
+                outcome = NOT_FOUND
+            elif user_id in members:
+                outcome = ALREADY_MEMBER
+            elif user_id in pending:
+                outcome = ALREADY_INVITED
+            else:
+                outcome = INVITED
+                invitations.append(Invitation(sender=sender, recipient_id=user_id, workspace=workspace, status='pending'))
+            results.append({'user_id': user_id, 'status': outcome})
+
+        if invitations:
+            invitations = Invitation.objects.bulk_create(invitations)
+            content = invitation_content(profile, workspace)
+            notifications = Notifications.objects.bulk_notify([
+                Notifications(
+                    notification_type='invitation',
+                    recipient_id=invitation.recipient_id,
+                    sender=sender,
+                    content=content,
+                    workspace=workspace,
+                    invitation=invitation,
+                )
+                for invitation in invitations
+            ])
+            # Sent once the transaction commits
+            push_notifications(notifications)
+
+    return results
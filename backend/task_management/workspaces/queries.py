@@ -0,0 +1,16 @@
+from django.db.models import Prefetch
+from django.contrib.auth import get_user_model
+from workspaces.models import Workspace
+
+# Read paths for workspaces
+# Members and their profiles come in one batched query for all the workspaces of a response,
+# WorkspaceSerializer.get_members then only reads the prefetched roster
+
+def members_prefetch():
+    return Prefetch(
+        'members',
+        queryset=get_user_model().objects.select_related('userprofile').order_by('userprofile__id'),
+    )
+
+def workspaces_with_members():
+    return Workspace.objects.prefetch_related(members_prefetch())
@@ -10,14 +10,20 @@ class WorkspaceSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'owner', 'members']
 
     def get_members(self, obj):
-        # Get the user profiles of all members
-        member_profiles = UserProfile.objects.filter(user__in=obj.members.all())
-        
-        # Extract information for each member
+        # Use the roster prefetched by workspaces.queries when there is one
+        if 'members' in getattr(obj, '_prefetched_objects_cache', {}):
+            members = obj.members.all()
+        else:
+            members = obj.members.select_related('userprofile').order_by('userprofile__id')
+
+        # Extract information for each member that has a profile
         members_data = []
-        for profile in member_profiles:
+        for member in members:
+            profile = getattr(member, 'userprofile', None)
+            if profile is None:
+                continue
             member_info = {
-                'email': profile.user.email,
+                'email': member.email,
                 'name': profile.name if profile.name else None,
                 'nickname': profile.nickname if profile.nickname else None,
             }
@@ -1,4 +1,6 @@
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.test import APITestCase, APIClient
@@ -6,6 +8,8 @@ from rest_framework import status
 from workspaces.models import Workspace, Invitation
 from boards.models import Board
 from authentication.models import CustomUser
+from notifications.models import Notifications
+from authentication.jwt import user_cache
 
 class WorkspaceAPITestCase(APITestCase):
     def setUp(self):
@@ -41,6 +45,33 @@ class WorkspaceAPITestCase(APITestCase):
         # Check that the response contains the created workspaces
         self.assertEqual(len(response.data), 3)
 
+    def test_get_workspaces_query_count_is_flat(self):
+        def add_workspaces(count, members_per_workspace):
+            for index in range(count):
+                workspace = Workspace.objects.create(name=f'Workspace {index}', owner=self.user)
+                workspace.members.add(self.user)
+                for member_index in range(members_per_workspace):
+                    email = f'member{Workspace.objects.count()}-{member_index}@test.com'
+                    workspace.members.add(CustomUser.objects.create_user(email=email, password='password'))
+
+        def count_queries():
+            user_cache.invalidate(self.user.id)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('workspace-list'), HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries), response
+
+        add_workspaces(1, 1)
+        small, _ = count_queries()
+        add_workspaces(5, 8)
+        large, response = count_queries()
+        # Members and their profiles are fetched in one batch for all workspaces
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(sum(len(workspace['members']) for workspace in response.data), 2 + 5 * 9)
+        member = {'email': self.user.email, 'name': None, 'nickname': None}
+        self.assertEqual(sum(member in workspace['members'] for workspace in response.data), 6)
+
     def test_create_workspace(self):
         # Send a POST request to create a workspace
         data = {'name': 'New Workspace'}
@@ -140,6 +171,31 @@ class WorkspaceAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['message'], 'Invitation sent successfully')
 
+    def test_invite_members_reports_each_recipient(self):
+        member = CustomUser.objects.create_user(email='member@test.com', password='password123')
+        self.workspace.members.add(member)
+        already_invited = CustomUser.objects.create_user(email='invited@test.com', password='password123')
+        Invitation.objects.create(sender=self.user, recipient=already_invited, workspace=self.workspace, status='pending')
+        new_users = [CustomUser.objects.create_user(email=f'new{index}@test.com', password='password123') for index in range(30)]
+
+        selected_user_ids = [member.id, already_invited.id, 999999] + [user.id for user in new_users] + [new_users[0].id]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('workspace-invite'), {'workspace_id': self.workspace.id, 'selected_user_ids': selected_user_ids}, format='json', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # A fixed handful of queries, not a few per invited user
+        self.assertLess(len(queries), 20)
+
+        outcomes = {result['user_id']: result['status'] for result in response.data['results']}
+        self.assertEqual(len(response.data['results']), 33)
+        self.assertEqual(outcomes[member.id], 'already_member')
+        self.assertEqual(outcomes[already_invited.id], 'already_invited')
+        self.assertEqual(outcomes[999999], 'not_found')
+        self.assertTrue(all(outcomes[user.id] == 'invited' for user in new_users))
+        self.assertEqual(Invitation.objects.filter(workspace=self.workspace, status='pending').count(), 31)
+        notifications = Notifications.objects.filter(workspace=self.workspace, notification_type='invitation')
+        self.assertEqual(notifications.count(), 30)
+        self.assertFalse(notifications.filter(invitation__isnull=True).exists())
+
     def test_only_owner_can_invite(self):
         # create a workspace
         workspace = Workspace.objects.create(name='Test Workspace', owner=self.user)
@@ -1,27 +1,29 @@
 from rest_framework.decorators import api_view, authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.jwt import CachedJWTAuthentication
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from django.contrib.auth import get_user_model
 from workspaces.models import Workspace, Invitation
 from boards.models import Board
 from workspaces.serializers import WorkspaceSerializer
+from workspaces.queries import workspaces_with_members
+from boards.queries import boards_for_display
 from boards.serializers import BoardSerializer
 from authentication.models import UserProfile
 from notifications.models import Notifications
+from workspaces.invitations import invite_to_workspace
 
 # Get the workspaces for the user
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_workspaces(request):
     # Access the authenticated user
     user = request.user
     # Query the database for relevant workspaces
     # Include workspaces where the user is the owner or a member
-    owned_workspaces = Workspace.objects.filter(owner=user)
-    member_workspaces = Workspace.objects.filter(members=user)
+    owned_workspaces = workspaces_with_members().filter(owner=user)
+    member_workspaces = workspaces_with_members().filter(members=user)
     # Combine the querysets into a single list of unique workspaces
     workspaces = owned_workspaces | member_workspaces
     # Serialize the list of workspaces into JSON format, allowing multiple instances
@@ -30,7 +32,7 @@ def get_workspaces(request):
 
 # Get boards associated with a workspace
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def get_workspace_boards(request, workspace_id):
     # Retrieve the workspace instance from the database using the provided workspace_id
     workspace = get_object_or_404(Workspace, id=workspace_id)
@@ -40,7 +42,7 @@ def get_workspace_boards(request, workspace_id):
         return Response({'error': 'You do not have permission to view this workspace'}, status=status.HTTP_403_FORBIDDEN)
 
     # Retrieve all boards associated with the workspace
-    boards = Board.objects.filter(workspace=workspace)
+    boards = boards_for_display().filter(workspace=workspace)
 
     # Serialize the list of boards using BoardSerializer
     serializer = BoardSerializer(boards, many=True, context={'request': request})
@@ -50,7 +52,7 @@ def get_workspace_boards(request, workspace_id):
 
 # Create a new workspace
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def create_workspace(request):
     # Access the authenticated user
     user = request.user
@@ -72,7 +74,7 @@ def create_workspace(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def update_workspace(request):
     # Retrieve the data from the request
     workspace_id = request.data.get('workspace_id')
@@ -104,7 +106,7 @@ def update_workspace(request):
     
 # Delete workspace
 @api_view(['DELETE'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def delete_workspace(request):
     user = request.user
     # Retrieve the workspace ID from the request
@@ -125,7 +127,7 @@ def delete_workspace(request):
 
 # Invite members to workspace
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def invite_members(request):
     # Get the data from the request payload
     data = request.data
@@ -138,6 +140,8 @@ def invite_members(request):
         return Response({'error': 'Workspace ID required'}, status=status.HTTP_400_BAD_REQUEST)
     if not selected_user_ids:
         return Response({'error': 'At least 1 selected user ID required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(selected_user_ids, list):
+        return Response({'error': 'selected_user_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
 
     
     # Get the sender (authenticated user) from the request
@@ -146,7 +150,7 @@ def invite_members(request):
         # Get their name from UserProfile
         profile = UserProfile.objects.get(email=sender.email)
     except UserProfile.DoesNotExist:
-        return Response({'error': 'User Profile not found'}, status=status.HTTP404_NOT_FOUND)
+        return Response({'error': 'User Profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
     try:
         # Get the workspace based on the provided ID
@@ -156,52 +160,15 @@ def invite_members(request):
         if sender != workspace.owner:
             return Response({'error': 'Only the workspace owner can invite members'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Create a list to hold the invitation objects
-        invitations = []
-
-        # Iterate over the selected user IDs
-        for user_id in selected_user_ids:
-            try:
-                # Get the recipient (user being invited) based on the ID
-                recipient = get_user_model().objects.get(id=user_id)
-            except Exception as e:
-                return Response({'error': f'User with {user_id} not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Check if an invitation already exists for the same sender, recipient, and workspace
-            existing_invitation = Invitation.objects.filter(sender=sender, recipient=recipient, workspace=workspace, status='pending').first()
-            if existing_invitation:
-                # If an invitation already exists and is pending, skip creating a new one
-                continue
-            
-            # Create an Invitation object with sender, recipient and workspace
-            invitation = Invitation(sender=sender, recipient=recipient, workspace=workspace, status='pending')
-            # Add the invitation to the list
-            invitations.append(invitation)
-            try:
-                # Bulk create all invitations in the list and return the response
-                Invitation.objects.bulk_create(invitations)
-            except Exception as e:
-                return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            try:
-                # Create a Notification object for the recipient
-                notification = Notifications(
-                    notification_type='invitation',
-                    recipient=recipient,
-                    content = f"{(profile.name + ' (' + profile.nickname + ')' if profile.nickname else profile.name) if profile.name else profile.email} has invited you to their workspace {workspace.name}.",
-                    workspace_id=workspace_id,
-                    invitation_id=invitation.id
-                )
-                notification.save()
-            except Exception as e:
-                return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Invite every selected user at once and report what happened to each of them
+        results = invite_to_workspace(sender, profile, workspace, selected_user_ids)
         
-        return Response({'message': 'Invitation sent successfully'}, status=status.HTTP_200_OK)
+        return Response({'message': 'Invitation sent successfully', 'results': results}, status=status.HTTP_200_OK)
     except Workspace.DoesNotExist:
         return Response({'error': 'Workspace not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def accept_invitation(request):
     # Extract the invitation ID from the request payload
     invitation_id = request.data.get('invitation_id')
@@ -225,8 +192,7 @@ def accept_invitation(request):
         try:
             notification = Notifications.objects.get(id=notification_id)       
             # Set the 'read' field of the notification to True
-            notification.read = True
-            notification.save()
+            Notifications.objects.filter(id=notification.id).mark_read()
         except Notifications.DoesNotExist:
             return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -237,7 +203,7 @@ def accept_invitation(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def reject_invitation(request):
     # Extract the invitation ID from the request
     invitation_id = request.data.get('invitation_id')
@@ -258,8 +224,7 @@ def reject_invitation(request):
         try:
             notification = Notifications.objects.get(id=notification_id)       
             # Set the 'read' field of the notification to True
-            notification.read = True
-            notification.save()
+            Notifications.objects.filter(id=notification.id).mark_read()
         except Notifications.DoesNotExist:
             return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -270,7 +235,7 @@ def reject_invitation(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 @api_view(['PUT'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 def leave_workspace(request):
     user = request.user
     # Retrieve the workspace ID from the request
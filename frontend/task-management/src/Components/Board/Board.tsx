@@ -10,6 +10,7 @@ interface BoardProps {
     description: string;
     favorite: boolean;
     default_image: Image;
+    thumbnail?: string | null;
     workspace: number;
     workspace_name: string;
     starFilled: boolean;
@@ -21,6 +22,7 @@ const Board: React.FC<BoardProps> = ({
     id,
     title,
     default_image,
+    thumbnail,
     workspace_name,
     toggleStar,
     starFilled,
@@ -35,7 +37,8 @@ const Board: React.FC<BoardProps> = ({
     return (
         <div className="board-wrapper" onClick={navigateToBoardPage}>
             <div className="board">
-                <img src={default_image.url} alt="Board image" className="board-img" />
+                {/* Uploaded backgrounds come with a small resized copy for the grid */}
+                <img src={thumbnail || default_image?.url} alt="Board image" className="board-img" />
                 <div className="board-title">{title}</div>
                 {showWorkspaceName && (
                     <div className="workspace-name">In Workspace {workspace_name}</div>
@@ -1,4 +1,4 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useMemo } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
 import { RootState } from '../../redux/store';
 import { Member } from '../../redux/reducers/workspaceSlice';
@@ -9,6 +9,7 @@ import { verifyAccessToken } from '../../utils/apiUtils';
 import Cookies from 'js-cookie';
 import axios from 'axios';
 import { Button } from 'react-bootstrap';
+import debounce from 'lodash.debounce';
 
 interface UserQueryDropdownProps {
     searchResults?: Member[];
@@ -33,7 +34,7 @@ const UserQueryDropdown: React.FC<UserQueryDropdownProps> = ({ id }) => {
 
             // Send a GET request to search for users
             const response = await axios.get(
-                `https://taskrize-2e3dd97a0d3e.herokuapp.com/api/user/profiles/?search=${inputValue}&workspace_id=${id}`,
+                `https://taskrize-2e3dd97a0d3e.herokuapp.com/api/user/profiles/?q=${encodeURIComponent(inputValue)}&workspace_id=${id}`,
                 {
                     headers: {
                         Authorization: `Bearer ${accessToken}`,
@@ -61,6 +62,18 @@ const UserQueryDropdown: React.FC<UserQueryDropdownProps> = ({ id }) => {
         }
     };
 
+    // Only search once typing pauses, the server reuses the previous results for longer queries
+    const debouncedLoadOptions = useMemo(
+        () =>
+            debounce(
+                (inputValue: string, callback: (options: any[]) => void) => {
+                    loadOptions(inputValue).then(callback);
+                },
+                250,
+            ),
+        [id],
+    );
+
     const handleChange = (selectedOptions: any) => {
         const selectedUsers = selectedOptions.map((option: any) => ({
             id: option.value.id,
@@ -107,7 +120,7 @@ const UserQueryDropdown: React.FC<UserQueryDropdownProps> = ({ id }) => {
     return (
         <div>
             <AsyncSelect
-                loadOptions={loadOptions}
+                loadOptions={debouncedLoadOptions}
                 isMulti
                 isClearable
                 isSearchable
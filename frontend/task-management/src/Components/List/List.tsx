@@ -1,6 +1,7 @@
 import React, { useEffect, useRef } from 'react';
 import {
     List as ListType,
+    compareByRank,
     setActiveListId,
     setIsCreatingList,
     setListFormData,
@@ -238,10 +239,7 @@ const List: React.FC<ListProps> = ({ list, socket, boardId }) => {
                         }}
                     >
                         {[...list.cards]
-                            .sort(
-                                (a: CardType, b: CardType) =>
-                                    a.position - b.position,
-                            )
+                            .sort(compareByRank)
                             .map((card: CardType, index: number) => (
                                 <Draggable
                                     key={card.id}
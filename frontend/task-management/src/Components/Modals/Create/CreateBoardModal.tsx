@@ -10,6 +10,7 @@ import {
     resetModalStates,
     setErrorWorkspaceMessage,
     setImages,
+    appendImages,
     setShowImageModal,
     setSampleImages,
 } from '../../../redux/reducers/modalSlice';
@@ -32,6 +33,9 @@ import { FaArrowRight } from 'react-icons/fa';
 
 const CreateBoardModal: React.FC = () => {
     const [formValid, setFormValid] = useState(false);
+    // Cursor of the next catalog page, undefined once the last one is loaded
+    const [nextImagesCursor, setNextImagesCursor] = useState<string | undefined>(undefined);
+    const [isLoadingImages, setIsLoadingImages] = useState(false);
 
     // Redux state management
     const createBoardShow: boolean = useSelector(
@@ -118,7 +122,9 @@ const CreateBoardModal: React.FC = () => {
         }
     };
 
-    const fetchImages = async () => {
+    // Load one page of the catalog, the first one when cursor is undefined
+    const fetchImages = async (cursor?: string) => {
+        setIsLoadingImages(true);
         try {
             await verifyAccessToken();
             const accessToken = Cookies.get('access_token');
@@ -129,11 +135,19 @@ const CreateBoardModal: React.FC = () => {
                     headers: {
                         Authorization: `Bearer ${accessToken}`,
                     },
+                    params: { limit: 30, after: cursor },
                 },
             );
-            dispatch(setImages(response.data.images));
+            dispatch(
+                cursor
+                    ? appendImages(response.data.images)
+                    : setImages(response.data.images),
+            );
+            setNextImagesCursor(response.headers['x-next-cursor']);
         } catch (error) {
             console.error('Error fetching images:', error);
+        } finally {
+            setIsLoadingImages(false);
         }
     };
 
@@ -303,6 +317,23 @@ const CreateBoardModal: React.FC = () => {
                                             );
                                         })}
                                     </div>
+                                    {nextImagesCursor && (
+                                        <div style={{ textAlign: 'center' }}>
+                                            <Button
+                                                variant="secondary"
+                                                disabled={isLoadingImages}
+                                                onClick={() =>
+                                                    fetchImages(
+                                                        nextImagesCursor,
+                                                    )
+                                                }
+                                            >
+                                                {isLoadingImages
+                                                    ? 'Loading...'
+                                                    : 'Load more images'}
+                                            </Button>
+                                        </div>
+                                    )}
                                     <div style={{ textAlign: 'right' }}>
                                         <Button
                                             variant="secondary"
@@ -186,20 +186,32 @@ const PrivateNavbar: React.FC = () => {
 
     // Fetch notifications for the user
     const fetchNotifications = async (accessToken: string): Promise<void> => {
+        const headers = { Authorization: `Bearer ${accessToken}` };
         try {
-            const response = await axios.get(
-                'https://taskrize-2e3dd97a0d3e.herokuapp.com/api/notifications',
-                {
-                    headers: {
-                        Authorization: `Bearer ${accessToken}`,
-                    },
-                },
-            );
-            const unreadNotifications = response.data.filter(
-                (notification: any) => !notification.read,
+            // The badge comes from the unread counter, not from the rows loaded below
+            const countRequest = axios.get(
+                'https://taskrize-2e3dd97a0d3e.herokuapp.com/api/notifications/unread-count',
+                { headers },
             );
+
+            // The feed is paginated newest first, follow the cursor through the unread ones
+            const unreadNotifications: any[] = [];
+            let cursor: string | undefined;
+            do {
+                const response = await axios.get(
+                    'https://taskrize-2e3dd97a0d3e.herokuapp.com/api/notifications',
+                    {
+                        headers,
+                        params: { unread: 'true', limit: 100, before: cursor },
+                    },
+                );
+                unreadNotifications.push(...response.data);
+                cursor = response.headers['x-next-cursor'];
+            } while (cursor);
+
             // Update the state based on unread notifications
-            dispatch(setNewNotifications(unreadNotifications.length > 0));
+            const countResponse = await countRequest;
+            dispatch(setNewNotifications(countResponse.data.unread_count > 0));
 
             // Update state with notifications
             dispatch(setNotifications(unreadNotifications));
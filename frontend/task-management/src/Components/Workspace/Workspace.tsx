@@ -368,6 +368,7 @@ const Workspace: React.FC<WorkspaceProps> = ({
                             description={board.description}
                             favorite={board.favorite}
                             default_image={board.default_image}
+                            thumbnail={board.thumbnail}
                             workspace={board.workspace}
                             workspace_name={board.workspace_name}
                             starFilled={board.starFilled}
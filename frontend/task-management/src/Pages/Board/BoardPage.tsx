@@ -1,7 +1,7 @@
 import React, { useEffect, useRef, useState } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import Cookies from 'js-cookie';
-import axios from 'axios';
+import axios, { AxiosError } from 'axios';
 import { useDispatch, useSelector } from 'react-redux';
 import { RootState } from '../../redux/store';
 import { setBoard } from '../../redux/reducers/boardSlice';
@@ -16,6 +16,7 @@ import {
     setLists,
     setNewListName,
     sortListsByPosition,
+    compareByRank,
 } from '../../redux/reducers/listSlice';
 import BoardNavbar from '../../Components/Navbar/BoardNavbar';
 import { DragDropContext, Draggable, Droppable } from 'react-beautiful-dnd';
@@ -49,7 +50,7 @@ const BoardPage: React.FC = () => {
     const navigate = useNavigate();
 
     useEffect(() => {
-        // Sort the lists by position after they are rehydrated from storage
+        // Sort the lists by rank after they are rehydrated from storage
         dispatch(sortListsByPosition());
     }, []);
 
@@ -62,56 +63,175 @@ const BoardPage: React.FC = () => {
         boardRef.current = board;
     }, [board]);
 
-    // Function to establish the WebSocket connection and set up the event handlers
-    // Create a new WebSocket connection outside of the useEffect hook
-    let socket = new WebSocket(
-        'wss://taskrize-2e3dd97a0d3e.herokuapp.com/ws/board/',
-    );
-
-    socket.onopen = () => {
-        console.log('WebSocket connection opened');
+    // The socket authenticates once, with the access token in its URL
+    const boardSocketUrl = () =>
+        `wss://taskrize-2e3dd97a0d3e.herokuapp.com/ws/board/?token=${Cookies.get('access_token')}`;
+
+    // Opened once per board page and replaced when it drops
+    const [socket, setSocket] = useState<WebSocket | null>(null);
+    // Version of the board the lists in the store reflect, null until the board is loaded
+    const boardVersionRef = useRef<number | null>(null);
+    // A sync_board request is waiting for its answer
+    const syncingRef = useRef(false);
+
+    // Ask the server for what changed since our version: it answers with the missed
+    // patches, board_in_sync, or a full snapshot when it cannot replay the gap
+    const requestSync = (ws: WebSocket) => {
+        if (syncingRef.current || ws.readyState !== WebSocket.OPEN) {
+            return;
+        }
+        syncingRef.current = true;
+        ws.send(
+            JSON.stringify({
+                action: 'sync_board',
+                board_id: Number(id),
+                board_version: boardVersionRef.current ?? undefined,
+            }),
+        );
     };
 
-    socket.onmessage = event => {
-        const data = JSON.parse(event.data);
-
-        if (data && data.card) {
-            // Dispatch a specific action for WebSocket card updates
-            dispatch({
-                type: 'WEBSOCKET_CARD_UPDATE',
-                payload: { card: data.card },
-            });
+    // Patches must be applied one version after another, anything else means we missed some
+    const applyPatch = (ws: WebSocket, patch: any) => {
+        const version = boardVersionRef.current;
+        if (version !== null && patch.board_version <= version) {
+            // Already part of the lists we have
+            return;
         }
-
-        if (data && data.list) {
-            // Dispatch a specific action for WebSocket list updates
-            dispatch({
-                type: 'WEBSOCKET_LIST_UPDATE',
-                payload: { lists: data.list },
-            });
+        if (version === null || patch.board_version !== version + 1) {
+            requestSync(ws);
+            return;
+        }
+        boardVersionRef.current = patch.board_version;
+        if (patch.action === 'board_updated') {
+            // Title, background, ... changed: reload the board itself
+            fetchBoard();
+        } else {
+            dispatch({ type: 'WEBSOCKET_BOARD_EVENT', payload: patch });
         }
     };
 
-    socket.onerror = error => {
-        socket = new WebSocket(
-            'wss://taskrize-2e3dd97a0d3e.herokuapp.com/ws/board/',
-        );
-    };
+    const handleSocketMessage = (ws: WebSocket, data: any) => {
+        if (!data) {
+            return;
+        }
+        if (data.error) {
+            console.error('Board socket error:', data.error);
+            syncingRef.current = false;
+            return;
+        }
+        if (data.board_id !== undefined && Number(data.board_id) !== Number(id)) {
+            return;
+        }
 
-    socket.onclose = () => {
-        socket = new WebSocket(
-            'wss://taskrize-2e3dd97a0d3e.herokuapp.com/ws/board/',
-        );
+        switch (data.action) {
+            case 'board_snapshot':
+                syncingRef.current = false;
+                boardVersionRef.current = data.board_version;
+                dispatch({ type: 'WEBSOCKET_BOARD_SNAPSHOT', payload: data });
+                break;
+            case 'board_in_sync':
+                syncingRef.current = false;
+                boardVersionRef.current = data.board_version;
+                break;
+            case 'board_events':
+                syncingRef.current = false;
+                data.events.forEach((patch: any) => applyPatch(ws, patch));
+                break;
+            case 'busy':
+                // The server did not apply the action, nothing changed
+                console.warn(`Board is busy, ${data.rejected_action} was not applied`);
+                break;
+            default:
+                if (data.board_version !== undefined) {
+                    applyPatch(ws, data);
+                }
+        }
     };
 
     useEffect(() => {
-        // Clean up function to close the socket when the component unmounts
-        return () => {
-            if (socket) {
-                socket.close();
+        let unmounted = false;
+        let current: WebSocket;
+        let retryTimer: ReturnType<typeof setTimeout> | undefined;
+        // Reconnects since the socket was last open, for the backoff
+        let attempts = 0;
+        // The server closed the last socket because of its token (code 4401)
+        let rejected = false;
+
+        const connect = () => {
+            const ws = new WebSocket(boardSocketUrl());
+            ws.onopen = () => {
+                attempts = 0;
+                rejected = false;
+                // Join the board group so changes made by collaborators reach this socket,
+                // subscribing also answers like sync_board with what changed while it was down
+                syncingRef.current = true;
+                ws.send(
+                    JSON.stringify({
+                        action: 'subscribe',
+                        board_id: Number(id),
+                        board_version: boardVersionRef.current ?? undefined,
+                    }),
+                );
+            };
+            ws.onmessage = event => {
+                handleSocketMessage(ws, JSON.parse(event.data));
+            };
+            // An error is always followed by close
+            ws.onclose = event => {
+                if (unmounted) {
+                    return;
+                }
+                if (event.code === 4401) {
+                    if (rejected) {
+                        // Refused again with a freshly verified token, retrying will not help
+                        console.error('Board socket rejected the access token');
+                        return;
+                    }
+                    rejected = true;
+                }
+                scheduleReconnect();
+            };
+            current = ws;
+            setSocket(ws);
+        };
+
+        // Wait 1s, 2s, 4s, ... up to 30s between attempts
+        const scheduleReconnect = () => {
+            const delay = Math.min(1000 * 2 ** attempts, 30000);
+            attempts += 1;
+            retryTimer = setTimeout(reconnect, delay);
+        };
+
+        // The access token in the URL may have expired while the socket was open
+        const reconnect = async () => {
+            try {
+                await verifyAccessToken();
+            } catch (error) {
+                const response = (error as AxiosError).response;
+                if (response && response.status === 401) {
+                    // The refresh token is no longer valid either, the user has to log in again
+                    console.error('Error refreshing the board socket token:', error);
+                    return;
+                }
+                // Offline or the API is unreachable, try again later
+                if (!unmounted) {
+                    scheduleReconnect();
+                }
+                return;
+            }
+            if (!unmounted) {
+                connect();
             }
         };
-    }, []);
+
+        connect();
+        // Close the socket when the component unmounts
+        return () => {
+            unmounted = true;
+            clearTimeout(retryTimer);
+            current.close();
+        };
+    }, [id]);
 
     const fetchBoard = async (): Promise<void> => {
         try {
@@ -127,7 +247,15 @@ const BoardPage: React.FC = () => {
                 },
             );
             dispatch(setBoard(response.data));
-            dispatch(setLists(response.data.lists));
+            // The socket may already have brought the lists further than this response
+            const version = response.data.version;
+            if (
+                boardVersionRef.current === null ||
+                version > boardVersionRef.current
+            ) {
+                boardVersionRef.current = version;
+                dispatch(setLists(response.data.lists));
+            }
             setUpdateNeeded(false);
         } catch (error) {
             console.error('Error fetching board: ', error);
@@ -156,7 +284,7 @@ const BoardPage: React.FC = () => {
     };
 
     const handleCreateList = async (newListName: string) => {
-        if (socket.readyState === WebSocket.OPEN) {
+        if (socket && socket.readyState === WebSocket.OPEN) {
             try {
                 socket.send(
                     JSON.stringify({
@@ -219,7 +347,7 @@ const BoardPage: React.FC = () => {
             const cardId = draggableId.split('-')[1];
 
             // Check WebSocket readyState
-            if (socket.readyState === WebSocket.OPEN) {
+            if (socket && socket.readyState === WebSocket.OPEN) {
                 try {
                     // Send a message over the WebSocket connection
                     socket.send(
@@ -244,7 +372,7 @@ const BoardPage: React.FC = () => {
                 const listId = draggableId.split('-')[1];
 
                 // Check WebSocket readyState
-                if (socket.readyState === WebSocket.OPEN) {
+                if (socket && socket.readyState === WebSocket.OPEN) {
                     try {
                         // Send a message over the WebSocket connection
                         socket.send(
@@ -288,7 +416,7 @@ const BoardPage: React.FC = () => {
             <div
                 className="board-container"
                 style={{
-                    backgroundImage: `url(${board ? board.default_image.url : ''})`,
+                    backgroundImage: `url(${board ? board.thumbnail || board.default_image?.url : ''})`,
                 }}
             >
                 <div className="board-content">
@@ -309,7 +437,7 @@ const BoardPage: React.FC = () => {
                             Unsplash
                         </p>
 
-                        {isLoading ? (
+                        {isLoading || !socket ? (
                             <div>Loading...</div>
                         ) : (
                             <DragDropContext onDragEnd={handleOnDragEnd}>
@@ -333,11 +461,7 @@ const BoardPage: React.FC = () => {
                                                 {lists &&
                                                     lists.length > 0 &&
                                                     [...lists]
-                                                        .sort(
-                                                            (a: any, b: any) =>
-                                                                a.position -
-                                                                b.position,
-                                                        )
+                                                        .sort(compareByRank)
                                                         .map(
                                                             (
                                                                 list: any,
@@ -107,6 +107,7 @@ const Home: React.FC = () => {
                                     description={board.description}
                                     favorite={board.favorite}
                                     default_image={board.default_image}
+                                    thumbnail={board.thumbnail}
                                     workspace={board.workspace}
                                     workspace_name={board.workspace_name}
                                     starFilled={favoriteBoards.some(
@@ -133,6 +134,7 @@ const Home: React.FC = () => {
                                     description={board.description}
                                     favorite={board.favorite}
                                     default_image={board.default_image}
+                                    thumbnail={board.thumbnail}
                                     workspace={board.workspace}
                                     workspace_name={board.workspace_name}
                                     starFilled={favoriteBoards.some(
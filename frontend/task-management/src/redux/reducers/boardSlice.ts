@@ -14,10 +14,13 @@ export interface Board {
     description: string;
     favorite: number[];
     default_image: Image;
+    thumbnail?: string | null;
     workspace: number;
     workspace_name: string;
     starFilled: any;
     lists?: List[];
+    // Incremented by every change to the board, its lists or its cards
+    version?: number;
 }
 
 export interface BoardState {
@@ -9,6 +9,9 @@ export interface Card {
     attachment: string;
     label: string;
     list: number;
+    rank: string;
+    attachment_count?: number;
+    comment_count?: number;
 }
 
 interface CardState {
@@ -5,6 +5,7 @@ export interface List {
     id: number;
     title: string;
     position: number;
+    rank: string;
     description: string;
     created_at: Date;
     updated_at: Date;
@@ -42,6 +43,37 @@ const initialState: ListState = {
     },
 };
 
+// Lists and cards are ordered by their rank keys, the way the server orders them (rank, then id)
+// A move only sends the rank of the moved item, so positions are recomputed from the ranks
+export const compareByRank = (
+    a: { rank: string; id: number },
+    b: { rank: string; id: number },
+) => {
+    if (a.rank !== b.rank) {
+        return a.rank < b.rank ? -1 : 1;
+    }
+    return a.id - b.id;
+};
+
+const sortByRank = (items: { rank: string; id: number; position: number }[]) => {
+    items.sort(compareByRank);
+    items.forEach((item, index) => {
+        item.position = index + 1;
+    });
+};
+
+const setRanks = (
+    items: { rank: string; id: number; position: number }[],
+    ranks: { [id: string]: string },
+) => {
+    items.forEach(item => {
+        if (ranks[item.id] !== undefined) {
+            item.rank = ranks[item.id];
+        }
+    });
+    sortByRank(items);
+};
+
 const listSlice = createSlice({
     name: 'list',
     initialState,
@@ -49,6 +81,8 @@ const listSlice = createSlice({
         setLists: (state, action: PayloadAction<List[]>) => {
             if (Array.isArray(action.payload)) {
                 state.lists = action.payload;
+                sortByRank(state.lists);
+                state.lists.forEach(list => sortByRank(list.cards));
                 state.isLoading = false;
             } else {
                 console.error('Invalid payload for setLists:', action.payload);
@@ -73,7 +107,122 @@ const listSlice = createSlice({
             state.listFormData = action.payload;
         },
         sortListsByPosition: (state) => {
-            state.lists.sort((a, b) => a.position - b.position);
+            sortByRank(state.lists);
+            state.lists.forEach(list => sortByRank(list.cards));
+        },
+        // Apply one patch sent over the board socket, see BoardPage for the versioning
+        applyBoardEvent: (state, action: PayloadAction<any>) => {
+            const event = action.payload;
+            const findList = (listId: number) =>
+                state.lists.find(list => list.id === Number(listId));
+            const findCard = (cardId: number) => {
+                for (const list of state.lists) {
+                    const card = list.cards.find(card => card.id === Number(cardId));
+                    if (card) {
+                        return { list, card };
+                    }
+                }
+                return null;
+            };
+
+            switch (event.action) {
+                case 'list_created':
+                case 'list_updated': {
+                    const existing = findList(event.list.id);
+                    if (existing) {
+                        Object.assign(existing, event.list);
+                    } else {
+                        state.lists.push(event.list);
+                    }
+                    sortByRank(state.lists);
+                    break;
+                }
+                case 'list_deleted':
+                    state.lists = state.lists.filter(list => list.id !== Number(event.id));
+                    sortByRank(state.lists);
+                    break;
+                case 'list_moved': {
+                    const moved = findList(event.id);
+                    if (moved) {
+                        moved.rank = event.rank;
+                    }
+                    // The other lists were respaced to make room for it
+                    setRanks(state.lists, event.ranks || {});
+                    break;
+                }
+                case 'lists_rebalanced':
+                case 'lists_reordered':
+                    setRanks(state.lists, event.ranks);
+                    break;
+                case 'card_created':
+                case 'card_updated': {
+                    const found = findCard(event.card.id);
+                    if (found) {
+                        found.list.cards = found.list.cards.filter(card => card.id !== found.card.id);
+                        sortByRank(found.list.cards);
+                    }
+                    const list = findList(event.card.list);
+                    if (list) {
+                        list.cards.push({ ...found?.card, ...event.card });
+                        sortByRank(list.cards);
+                    }
+                    break;
+                }
+                case 'card_deleted': {
+                    const found = findCard(event.id);
+                    if (found) {
+                        found.list.cards = found.list.cards.filter(card => card.id !== found.card.id);
+                        sortByRank(found.list.cards);
+                    }
+                    break;
+                }
+                case 'card_moved': {
+                    // A card coming from another board carries its data, one leaving has no target list here
+                    const found = findCard(event.id);
+                    const target = findList(event.to_list);
+                    const card = found ? found.card : event.card;
+                    if (found) {
+                        found.list.cards = found.list.cards.filter(card => card.id !== found.card.id);
+                        sortByRank(found.list.cards);
+                    }
+                    if (target && card) {
+                        target.cards.push({ ...card, list: target.id, rank: event.rank });
+                        // The other cards of the list were respaced to make room for it
+                        setRanks(target.cards, event.ranks || {});
+                    }
+                    break;
+                }
+                case 'cards_rebalanced':
+                case 'cards_reordered': {
+                    const list = findList(event.list_id);
+                    if (list) {
+                        setRanks(list.cards, event.ranks);
+                    }
+                    break;
+                }
+                case 'comment_added':
+                case 'comment_deleted': {
+                    const found = findCard(event.card_id);
+                    if (found) {
+                        found.card.comment_count = event.comment_count;
+                    }
+                    break;
+                }
+                case 'attachment_added':
+                case 'attachment_deleted': {
+                    const found = findCard(event.card_id);
+                    if (found) {
+                        found.card.attachment_count = Math.max(
+                            0,
+                            (found.card.attachment_count || 0) +
+                                (event.action === 'attachment_added' ? 1 : -1),
+                        );
+                    }
+                    break;
+                }
+                default:
+                    break;
+            }
         },
         moveList: (state, action: PayloadAction<{ listId: number; newPosition: number }>) => {
             const { listId, newPosition } = action.payload;
@@ -101,5 +250,6 @@ export const {
     setListFormData,
     sortListsByPosition,
     moveList,
+    applyBoardEvent,
 } = listSlice.actions;
 export default listSlice.reducer;
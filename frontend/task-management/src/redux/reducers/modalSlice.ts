@@ -117,6 +117,9 @@ const modalSlice = createSlice({
         setImages(state, action: PayloadAction<Image[]>) {
             state.images = action.payload;
         },
+        appendImages(state, action: PayloadAction<Image[]>) {
+            state.images.push(...action.payload);
+        },
         setShowImageModal(state, action: PayloadAction<boolean>) {
             state.showImageModal = action.payload;
         },
@@ -151,6 +154,7 @@ export const {
     resetModalStates,
     setSampleImages,
     setImages,
+    appendImages,
     setShowImageModal,
     setShowCardModal,
     setWorkspaceIdToDelete,
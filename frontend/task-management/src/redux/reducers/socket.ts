@@ -1,26 +1,34 @@
 import { configureStore } from '@reduxjs/toolkit';
 import { rootReducer } from '../store';
 import { updateSelectedCard } from './cardSlice';
-import { setLists } from './listSlice';
+import { applyBoardEvent, setLists } from './listSlice';
 
 // Redux middleware to handle WebSocket messages
 export const socketMiddleware =
     (store: any) => (next: any) => (action: any) => {
         const response = action.payload;
-        if (
-            action.type === 'WEBSOCKET_CARD_UPDATE' &&
-            response &&
-            response.card
-        ) {
-            store.dispatch(updateSelectedCard(response.card));
+        // A patch describing one change, applied by id and rank
+        if (action.type === 'WEBSOCKET_BOARD_EVENT' && response) {
+            store.dispatch(applyBoardEvent(response));
+
+            // Keep the card open in the card modal up to date
+            const selectedCard = store.getState().card.selectedCard;
+            if (
+                response.card &&
+                selectedCard &&
+                selectedCard.id === response.card.id
+            ) {
+                store.dispatch(updateSelectedCard(response.card));
+            }
         }
 
+        // The whole board, sent when the client was too far behind for patches
         if (
-            action.type === 'WEBSOCKET_LIST_UPDATE' &&
+            action.type === 'WEBSOCKET_BOARD_SNAPSHOT' &&
             response &&
-            response.lists
+            Array.isArray(response.list)
         ) {
-            store.dispatch(setLists(response.lists));
+            store.dispatch(setLists(response.list));
         }
 
         return next(action);